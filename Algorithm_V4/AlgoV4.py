@@ -1,37 +1,363 @@
 import os
 import sys
+import copy
+import argparse
+import atexit
 import time
-import cv2
-import numpy as np
-import torch
+import importlib
 import json
 import threading
+import multiprocessing
+from multiprocessing import shared_memory
+import concurrent.futures
 import queue
-import tensorflow as tf
-from ultralytics import YOLO
-from collections import deque, Counter
+import subprocess
+import wave
+import bisect
+import http.server
+from collections import deque, OrderedDict
 from pathlib import Path
 
 import re
-from sklearn.preprocessing import LabelEncoder
-import sounddevice as sd
-import vosk
-import pyttsx3
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.sequence import pad_sequences
+import functools
+import hashlib
+import tempfile
+import shutil
+import itertools
+
+# --- Lazy Imports ---
+# Heavy frameworks are only imported when their subsystem is first used (or
+# preloaded in the background ahead of their stage, see `preload_modules`), so
+# the input source can be chosen while they load. Every import is timed for
+# `print_import_report`; settings that must precede a framework's first
+# operation are applied through `on_import` instead of importing it early.
+PROCESS_START_TIME = time.perf_counter()
+IMPORT_TIMES = OrderedDict()  # Module -> {'seconds', 'thread', 'finished_at'}
+IMPORT_HOOKS = {}  # Module -> callbacks waiting for its import (see `on_import`)
+IMPORT_HOOKS_LOCK = threading.RLock()
+
+def timed_import(name):
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    end = time.perf_counter()
+    IMPORT_TIMES[name] = {
+        'seconds': end - start,
+        'thread': threading.current_thread().name,
+        'finished_at': end - PROCESS_START_TIME
+    }
+    run_import_hooks()
+    return module
+
+def on_import(name, hook):
+    """Calls `hook(module)` once module `name` is imported (right away if it already is).
+
+    Hooks run in the importing thread before the LazyModule hands the module
+    out, so they precede its first use.
+    """
+    with IMPORT_HOOKS_LOCK:
+        IMPORT_HOOKS.setdefault(name, []).append(hook)
+    run_import_hooks()
+
+def run_import_hooks():
+    # Every pending module is checked: frameworks are also imported indirectly (ultralytics imports torch)
+    with IMPORT_HOOKS_LOCK:
+        for name in list(IMPORT_HOOKS):
+            module = sys.modules.get(name)
+            if module is None or getattr(getattr(module, '__spec__', None), '_initializing', False):
+                continue  # Not imported, or still being imported by another thread
+            for hook in IMPORT_HOOKS.pop(name):
+                hook(module)
+
+class LazyModule:
+    """Stands in for a module (or one of its attributes) until it is first used.
+
+    Attribute access or a call imports the target; concurrent first uses wait
+    for the same import. `attribute` is a dotted path inside the module (e.g.
+    'YOLO' in 'ultralytics').
+    """
+    def __init__(self, name, attribute=None):
+        self._name = name
+        self._attribute = attribute
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    target = timed_import(self._name)
+                    for part in (self._attribute.split('.') if self._attribute else []):
+                        target = getattr(target, part)
+                    self._target = target
+        return self._target
+
+    def is_loaded(self):
+        return self._target is not None
+
+    def __getattr__(self, item):
+        if item in ('_name', '_attribute', '_target', '_lock'):  # Not initialized (e.g. while copying)
+            raise AttributeError(item)
+        return getattr(self._load(), item)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        state = 'loaded' if self.is_loaded() else 'not loaded'
+        return f"<LazyModule {self._name}{'.' + self._attribute if self._attribute else ''} ({state})>"
+
+def preload_modules(*modules, stage='preload'):
+    """Imports the lazy modules of one stage one after another in a background thread (in the order given)."""
+    def load_all():
+        for module in modules:
+            try:
+                module._load()
+            except Exception as e:
+                print(f"⚠️ Preloading {module._name} failed: {e}")
+    thread = threading.Thread(target=load_all, name=f'preload-{stage}', daemon=True)
+    thread.start()
+    return thread
+
+def print_import_report():
+    """Prints the cost of every import so far, most expensive first."""
+    print("--- Import Report ---")
+    for name, timing in sorted(IMPORT_TIMES.items(), key=lambda item: -item[1]['seconds']):
+        print(f"{name:>44}: {timing['seconds']:7.2f}s (done at {timing['finished_at']:6.2f}s, "
+              f"{timing['thread']})")
+
+np = timed_import('numpy')
+cv2 = timed_import('cv2')
+torch = LazyModule('torch')
+tf = LazyModule('tensorflow')
+YOLO = LazyModule('ultralytics', 'YOLO')
+load_model = LazyModule('tensorflow', 'keras.models.load_model')
+sd = LazyModule('sounddevice')
+vosk = LazyModule('vosk')
+pyttsx3 = LazyModule('pyttsx3')
+onnx = LazyModule('onnx')  # Only needed to build INT8 YOLO models
+ort_quantization = LazyModule('onnxruntime.quantization')
 
 # --- MoViNet Integration ---
-try:
-    from official.projects.movinet.modeling import movinet
-    from official.projects.movinet.modeling import movinet_model
-except ImportError:
-    print("="*60)
-    print("WARNING: Could not import MoViNet components.")
-    print("Action recognition will be disabled.")
-    print("="*60)
+# tf-models-official; if it is missing, loading the action model fails and the registry reports it
+movinet = LazyModule('official.projects.movinet.modeling.movinet')
+movinet_model = LazyModule('official.projects.movinet.modeling.movinet_model')
+
+def tf_format_frame(frame, resolution):
+    """Reference MoViNet preprocessing: BGR uint8 frame -> letterboxed RGB float32 in [0, 1]."""
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    frame = tf.image.convert_image_dtype(frame_rgb, tf.float32)
+    frame = tf.image.resize_with_pad(frame, resolution, resolution)
+    return frame.numpy()
+
+class FramePreprocessor:
+    """Allocation-free NumPy/OpenCV equivalent of `tf_format_frame`.
+
+    The letterbox geometry, `convert_image_dtype` scaling and half-pixel
+    bilinear interpolation follow TensorFlow's float32 arithmetic step by
+    step. The four bilinear taps are gathered directly from the BGR uint8
+    frame (the BGR->RGB swap is folded into the gather indices), so no
+    full-size float copy of the frame is made. Results are written into a
+    ring of preallocated buffers: a returned array stays valid for the next
+    `num_buffers - 1` calls, which covers one frame queued for inference
+    plus one being processed. `buffers` can supply caller-owned output
+    arrays instead (e.g. the slots of a shared-memory ring); `last_buffer`
+    is the index of the buffer written by the latest call.
+    """
+    def __init__(self, resolution, num_buffers=3, buffers=None):
+        self.resolution = resolution
+        if buffers is None:
+            buffers = [np.zeros((resolution, resolution, 3), dtype=np.float32) for _ in range(num_buffers)]
+        self.buffers = list(buffers)
+        self.num_buffers = len(self.buffers)
+        self.next_buffer = 0
+        self.last_buffer = None
+        self.input_shape = None
+
+    def _prepare(self, input_shape):
+        """Precomputes gather indices and interpolation weights for one input size."""
+        height, width = input_shape[:2]
+        f_height, f_width = np.float32(height), np.float32(width)
+        f_target = np.float32(self.resolution)
+
+        # Output size and padding exactly as tf.image.resize_with_pad computes them (float32)
+        ratio = max(f_width / f_target, f_height / f_target)
+        resized_height_float = f_height / ratio
+        resized_width_float = f_width / ratio
+        resized_height = int(np.floor(resized_height_float))
+        resized_width = int(np.floor(resized_width_float))
+        pad_top = max(0, int(np.floor((f_target - resized_height_float) / np.float32(2))))
+        pad_left = max(0, int(np.floor((f_target - resized_width_float) / np.float32(2))))
+
+        def interpolation(in_size, out_size):
+            # Half-pixel-center bilinear weights as in TensorFlow's resize_bilinear kernel
+            scale = np.float32(in_size) / np.float32(out_size)
+            positions = (np.arange(out_size, dtype=np.float32) + np.float32(0.5)) * scale - np.float32(0.5)
+            floors = np.floor(positions)
+            lower = np.maximum(floors.astype(np.int64), 0)
+            upper = np.minimum(np.ceil(positions).astype(np.int64), in_size - 1)
+            return lower, upper, (positions - floors).astype(np.float32)
+
+        y_lower, y_upper, y_lerp = interpolation(height, resized_height)
+        x_lower, x_upper, x_lerp = interpolation(width, resized_width)
+
+        channels = np.array([2, 1, 0], dtype=np.int64)  # BGR -> RGB
+        def tap_indices(rows, cols):
+            return (rows[:, None, None] * width + cols[None, :, None]) * 3 + channels[None, None, :]
+
+        self.tap_indices = [
+            tap_indices(y_lower, x_lower), tap_indices(y_lower, x_upper),
+            tap_indices(y_upper, x_lower), tap_indices(y_upper, x_upper)
+        ]
+        self.x_lerp = x_lerp[None, :, None]
+        self.y_lerp = y_lerp[:, None, None]
+        self.content = (slice(pad_top, pad_top + resized_height), slice(pad_left, pad_left + resized_width))
+
+        tap_shape = (resized_height, resized_width, 3)
+        self.tap_uint8 = np.empty(tap_shape, dtype=np.uint8)
+        self.taps = [np.empty(tap_shape, dtype=np.float32) for _ in range(4)]
+        self.scratch = np.empty(tap_shape, dtype=np.float32)
+        for buffer in self.buffers:
+            buffer.fill(0.0)
+        self.input_shape = input_shape
+
+    def __call__(self, frame):
+        if frame.shape != self.input_shape:
+            self._prepare(frame.shape)
+        flat_frame = np.ascontiguousarray(frame).reshape(-1)
+
+        # Gather the four bilinear taps and scale them like tf.image.convert_image_dtype
+        for indices, tap in zip(self.tap_indices, self.taps):
+            np.take(flat_frame, indices, out=self.tap_uint8)
+            np.multiply(self.tap_uint8, np.float32(1.0 / 255), out=tap, dtype=np.float32)
+        top_left, top_right, bottom_left, bottom_right = self.taps
+
+        # top = tl + (tr - tl) * x_lerp ; bottom = bl + (br - bl) * x_lerp
+        np.subtract(top_right, top_left, out=self.scratch)
+        np.multiply(self.scratch, self.x_lerp, out=self.scratch)
+        np.add(top_left, self.scratch, out=top_left)
+        np.subtract(bottom_right, bottom_left, out=self.scratch)
+        np.multiply(self.scratch, self.x_lerp, out=self.scratch)
+        np.add(bottom_left, self.scratch, out=bottom_left)
+
+        # out = top + (bottom - top) * y_lerp, written straight into the padded buffer
+        output = self.buffers[self.next_buffer]
+        self.last_buffer = self.next_buffer
+        self.next_buffer = (self.next_buffer + 1) % self.num_buffers
+        np.subtract(bottom_left, top_left, out=self.scratch)
+        np.multiply(self.scratch, self.y_lerp, out=self.scratch)
+        np.add(top_left, self.scratch, out=output[self.content])
+        return output
+
+def check_preprocessing_parity(frames, resolution=240):
+    """Returns the largest absolute difference between `FramePreprocessor` and `tf_format_frame`."""
+    preprocessor = FramePreprocessor(resolution)
+    max_difference = 0.0
+    for frame in frames:
+        reference = tf_format_frame(frame, resolution)
+        candidate = preprocessor(frame)
+        max_difference = max(max_difference, float(np.max(np.abs(reference - candidate))))
+    return max_difference
+
+def benchmark_preprocessing(frames, resolution=240, num_runs=200):
+    """Times `tf_format_frame` against `FramePreprocessor` on the given frames."""
+    preprocessor = FramePreprocessor(resolution)
+    results = {}
+    for name, fn in (('tensorflow', lambda f: tf_format_frame(f, resolution)),
+                     ('numpy', preprocessor)):
+        fn(frames[0])  # Warm-up
+        start = time.perf_counter()
+        for i in range(num_runs):
+            fn(frames[i % len(frames)])
+        results[name] = (time.perf_counter() - start) / num_runs * 1000.0
+    max_difference = check_preprocessing_parity(frames, resolution)
+
+    print("--- MoViNet Preprocessing Benchmark ---")
+    print(f"TensorFlow path: {results['tensorflow']:.3f} ms/frame")
+    print(f"NumPy path:      {results['numpy']:.3f} ms/frame "
+          f"({results['tensorflow'] / results['numpy']:.1f}x faster)")
+    print(f"Max abs difference: {max_difference:.3g}")
+    results['max_abs_difference'] = max_difference
+    return results
+
+class PredictionSmoother:
+    """Smooths per-frame action predictions with constant work per frame.
+
+    'vote' keeps the last `window` class ids in a fixed ring buffer with running
+    per-class counts and returns the majority class; on a tie the previous winner
+    is kept so the label does not flicker. 'ema' keeps an exponential moving
+    average of the probability vector and returns its arg-max.
+
+    The running counts are updated in several steps without a lock, so a
+    smoother must only be used by one thread: the one that runs
+    `predict_frame` (ActionThreadWorker routes resets and rollbacks there).
+    """
+    def __init__(self, num_classes, window=15, mode='vote', ema_alpha=None):
+        if mode not in ('vote', 'ema'):
+            raise ValueError(f"Unknown smoothing mode: {mode}")
+        self.num_classes = num_classes
+        self.window = window
+        self.mode = mode
+        self.ema_alpha = ema_alpha if ema_alpha is not None else 2.0 / (window + 1)
+        self.history = np.zeros(window, dtype=np.int64)
+        self.counts = np.zeros(num_classes, dtype=np.int64)
+        self.ema = np.zeros(num_classes, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self.counts.fill(0)
+        self.ema.fill(0.0)
+        self.position = 0
+        self.size = 0
+        self.smoothed_class = None
+
+    def update(self, class_id, probabilities):
+        """Adds one prediction and returns the smoothed class id."""
+        if self.mode == 'ema':
+            if self.size == 0:
+                self.ema[:] = probabilities
+                self.size = 1
+            else:
+                self.ema += self.ema_alpha * (probabilities - self.ema)
+            self.smoothed_class = int(np.argmax(self.ema))
+            return self.smoothed_class
+
+        if self.size == self.window:
+            self.counts[self.history[self.position]] -= 1  # Oldest prediction leaves the window
+        else:
+            self.size += 1
+        self.history[self.position] = class_id
+        self.counts[class_id] += 1
+        self.position = (self.position + 1) % self.window
+
+        best_class = int(np.argmax(self.counts))
+        if self.smoothed_class is not None and self.counts[self.smoothed_class] == self.counts[best_class]:
+            best_class = self.smoothed_class
+        self.smoothed_class = best_class
+        return best_class
+
+    def snapshot(self):
+        """Returns a copy of the smoothing state, for `restore`."""
+        return (self.history.copy(), self.counts.copy(), self.ema.copy(),
+                self.position, self.size, self.smoothed_class)
+
+    def restore(self, snapshot):
+        history, counts, ema, self.position, self.size, self.smoothed_class = snapshot
+        self.history[:] = history
+        self.counts[:] = counts
+        self.ema[:] = ema
 
 class RealTimeActionRecognizer:
-    def __init__(self, weights_path, config_path):
+    """Streaming MoViNet classifier that keeps its temporal state between frames.
+
+    The zero state is computed once and every reset starts from a shallow
+    copy of it (state tensors are immutable, each step returns new ones).
+    The states (and the smoother) after the last `num_checkpoints` steps are
+    kept under their `state_id` (also returned with each prediction), so
+    `rollback` can return to a known-good state instead of discarding all
+    temporal context.
+    """
+    def __init__(self, weights_path, config_path, use_compiled=True,
+                 smoothing_window=15, smoothing_mode='vote', num_checkpoints=32):
         self.weights_path = weights_path
         self.config_path = config_path
         
@@ -47,7 +373,13 @@ class RealTimeActionRecognizer:
         # Initialize model and states
         self.model = None
         self.states = None
-        self.prediction_history = deque(maxlen=15)
+        self.initial_states = None
+        self.state_id = 0  # Number of streaming steps run (never reset, so ids stay unique)
+        self.checkpoints = deque(maxlen=num_checkpoints)  # (state_id, states, smoother snapshot) after each step
+        self.use_compiled = use_compiled
+        self.compiled_step = None
+        self.smoother = PredictionSmoother(self.num_classes, smoothing_window, smoothing_mode)
+        self.preprocessor = FramePreprocessor(self.resolution)
         self.load_model()
         
     def load_model(self):
@@ -69,66 +401,198 @@ class RealTimeActionRecognizer:
             self.model.build([1, 1, self.resolution, self.resolution, 3])
             self.model.load_weights(self.weights_path)
             print("✅ MoViNet model loaded successfully")
+            self.initial_states = self.model.init_states(
+                tf.TensorShape([1, 1, self.resolution, self.resolution, 3]))
             self.reset_states()
+            if self.use_compiled:
+                self.compiled_step = self.build_compiled_step()
             return True
         except Exception as e:
             print(f"❌ Error loading MoViNet: {e}")
             return False
         
+    def build_compiled_step(self):
+        """Traces one streaming step with fixed input specs for the frame and every state tensor.
+
+        Returns None (and `predict_frame` keeps using `predict_on_batch`) if tracing fails.
+        """
+        try:
+            frame_spec = tf.TensorSpec([1, 1, self.resolution, self.resolution, 3], tf.float32)
+            state_specs = {name: tf.TensorSpec(state.shape, state.dtype) for name, state in self.states.items()}
+            model = self.model
+
+            @tf.function(input_signature=[frame_spec, state_specs])
+            def streaming_step(image, states):
+                logits, new_states = model((image, states), training=False)
+                return tf.nn.softmax(logits), new_states
+
+            streaming_step.get_concrete_function()
+            print("✅ MoViNet streaming step compiled")
+            return streaming_step
+        except Exception as e:
+            print(f"⚠️ Could not compile MoViNet streaming step, using predict_on_batch: {e}")
+            return None
+
+    def fork(self):
+        """Returns a recognizer sharing this model's weights with its own streaming state."""
+        clone = copy.copy(self)
+        clone.smoother = PredictionSmoother(self.num_classes, self.smoother.window,
+                                            self.smoother.mode, self.smoother.ema_alpha)
+        clone.preprocessor = FramePreprocessor(self.resolution)
+        clone.checkpoints = deque(maxlen=self.checkpoints.maxlen)
+        clone.reset_states()
+        return clone
+
     def reset_states(self):
         """Reset model states."""
-        dummy_frame_shape = [1, 1, self.resolution, self.resolution, 3]
-        self.states = self.model.init_states(tf.TensorShape(dummy_frame_shape))
-        self.prediction_history.clear()
+        self.states = dict(self.initial_states)
+        self.checkpoints.clear()
+        self.smoother.reset()
         print("MoViNet states reset")
+
+    def rollback(self, state_id):
+        """Restores the states and smoother saved after step `state_id`; resets if it is no longer kept.
+
+        Later checkpoints are discarded. Returns True if the state was restored.
+        """
+        checkpoints = list(self.checkpoints)
+        for index in range(len(checkpoints) - 1, -1, -1):
+            if checkpoints[index][0] == state_id:
+                self.states = dict(checkpoints[index][1])
+                self.smoother.restore(checkpoints[index][2])
+                self.checkpoints = deque(checkpoints[:index + 1], maxlen=self.checkpoints.maxlen)
+                print(f"MoViNet states rolled back to #{state_id}")
+                return True
+        self.reset_states()
+        return False
         
     def format_frame(self, frame):
-        """Format frame for model input."""
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = tf.image.convert_image_dtype(frame_rgb, tf.float32)
-        frame = tf.image.resize_with_pad(frame, self.resolution, self.resolution)
-        return frame.numpy()
-    
-    def predict_frame(self, frame):
-        """Predict action for a single formatted frame."""
+        """Format frame for model input.
+
+        The returned array is a reused buffer (see `FramePreprocessor`).
+        """
+        return self.preprocessor(frame)
+    
+    def predict_frame(self, frame, return_probabilities=False):
+        """Predict action for a single formatted frame.
+
+        The full probability vector is only included when `return_probabilities` is set.
+        """
         try:
-            input_frame = frame[tf.newaxis, tf.newaxis, ...]
-            logits, self.states = self.model.predict_on_batch((input_frame, self.states))
-            
-            probabilities = tf.nn.softmax(logits).numpy()[0]
-            predicted_class_id = np.argmax(probabilities)
+            input_frame = frame[np.newaxis, np.newaxis, ...]
+            if self.compiled_step is not None:
+                probabilities, self.states = self.compiled_step(input_frame, self.states)
+                probabilities = probabilities.numpy()[0]
+            else:
+                logits, self.states = self.model.predict_on_batch((input_frame, self.states))
+                probabilities = tf.nn.softmax(logits).numpy()[0]
+            self.state_id += 1
+            predicted_class_id = int(np.argmax(probabilities))
             confidence = probabilities[predicted_class_id]
             predicted_class_name = self.class_names[predicted_class_id]
             
-            self.prediction_history.append(predicted_class_name)
-            smoothed_prediction = Counter(self.prediction_history).most_common(1)[0][0]
+            smoothed_class_id = self.smoother.update(predicted_class_id, probabilities)
+            self.checkpoints.append((self.state_id, self.states, self.smoother.snapshot()))
             
-            return {
+            prediction = {
                 'class_name': predicted_class_name,
                 'confidence': float(confidence),
-                'smoothed_prediction': smoothed_prediction,
-                'all_probabilities': probabilities.tolist()
+                'smoothed_prediction': self.class_names[smoothed_class_id],
+                'state_id': self.state_id
             }
+            if return_probabilities:
+                prediction['all_probabilities'] = probabilities.tolist()
+            return prediction
         except Exception as e:
             print(f"Prediction error: {e}")
             return None
 
+def benchmark_streaming_inference(recognizer, frames, num_runs=100):
+    """Compares per-frame latency of the compiled streaming step and `predict_on_batch`."""
+    formatted_frames = [np.copy(recognizer.format_frame(frame)) for frame in frames]
+    compiled_step = recognizer.compiled_step or recognizer.build_compiled_step()
+    modes = [('predict_on_batch', None)]
+    if compiled_step is not None:
+        modes.append(('compiled', compiled_step))
+
+    results = {}
+    for name, step in modes:
+        recognizer.compiled_step = step
+        recognizer.reset_states()
+        recognizer.predict_frame(formatted_frames[0])  # Warm-up
+        latencies = []
+        for i in range(num_runs):
+            start = time.perf_counter()
+            recognizer.predict_frame(formatted_frames[i % len(formatted_frames)])
+            latencies.append((time.perf_counter() - start) * 1000.0)
+        results[name] = {'mean_ms': float(np.mean(latencies)), 'p95_ms': float(np.percentile(latencies, 95))}
+    recognizer.compiled_step = compiled_step
+    recognizer.reset_states()
+
+    print("--- MoViNet Streaming Inference Benchmark ---")
+    for name, stats in results.items():
+        print(f"{name:>16}: {stats['mean_ms']:.2f} ms/frame (p95 {stats['p95_ms']:.2f} ms)")
+    return results
+
 # --- Application Constants ---
 FLAT_TIRE_CLASS_NAME = "Flat_tire"
 REQUIRED_TOOLS_CLASSES = {"Car_Jack", "Wheel_Wrench"}
 VALIDATION_DURATION_SEC = 5.0
 GRACE_PERIOD_DURATION_SEC = 2.5
 TOOLS_CONFIDENCE_THRESHOLD = 0.6
+# YOLO confidence used live: weaker detections are never observed, logged or recorded, so
+# replays cannot evaluate a TOOLS_CONFIDENCE_THRESHOLD below it
+DETECTION_CONFIDENCE_FLOOR = TOOLS_CONFIDENCE_THRESHOLD
+
 
+# --- Model Paths ---
+FLAT_TIRE_MODEL_PATH = r"flatV2.pt"
+TOOLS_MODEL_PATH = r"toolsV2.pt"
+ACTION_WEIGHTS_PATH = r'Streaming\streaming_movinet_weights.h5'
+ACTION_CONFIG_PATH = r'Streaming\streaming_model_config.json'
+DETECTOR_WEIGHTS = {'flat_tire': FLAT_TIRE_MODEL_PATH, 'tools': TOOLS_MODEL_PATH}
+
+# --- YOLO Backend Configuration ---
+YOLO_BACKEND = 'pytorch'  # 'pytorch', 'onnx', 'onnx-int8' or 'openvino'
+YOLO_BACKENDS = ('pytorch', 'onnx', 'onnx-int8', 'openvino')
+YOLO_IMGSZ = 640  # Inference resolution (longest side, multiple of 32)
+YOLO_EXPORT_DIR = "exported_models"  # Exported/quantized models, rebuilt when the .pt file changes
+CALIBRATION_TOLERANCE = 0.05  # Max. loss in detection agreement with the PyTorch reference
+CALIBRATION_IOU_THRESHOLD = 0.5  # IoU for a detection to count as matching the reference
 
 # --- Intent Classifier Configuration ---
 VOSK_MODEL_PATH = "vosk-model-small-en-us-0.15"  # Update this path
 TF_MODEL_DIR = "intent_model_bilstm_tf"
 FAQ_FILE = "faq.json"
+INTENT_CACHE_SIZE = 256  # Number of normalized utterances whose intent is memoized
+INTENT_MIN_CONFIDENCE = 0.5  # Below this, a matching FAQ question is preferred over the intent answer
+FAQ_RETRIEVAL = True  # Match utterances against the individual faq.json questions (TF-IDF)
+FAQ_MATCH_MIN_SIMILARITY = 0.5  # Cosine similarity needed to use a question's specific answer
+FAQ_FAST_PATH_SIMILARITY = 0.9  # Near-verbatim questions are answered without running the BiLSTM
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_BLOCK_SIZE = 1600  # Samples per microphone block (0.1 s)
+VAD_ENABLED = True  # Skip silent blocks instead of feeding them to Vosk
+VAD_MARGIN_DB = 10.0  # Speech must be this much louder than the noise floor
+VAD_MIN_DB = -50.0  # ...and louder than this absolute level (dBFS)
+VAD_HANGOVER_SEC = 0.6  # Audio still fed after the last voiced block, so Vosk can finalize
+VAD_PREROLL_SEC = 0.3  # Audio kept from before the speech onset
+VAD_NOISE_WINDOW_SEC = 3.0  # Noise floor: quietest block of this window, so it follows louder steady noise
+VAD_NOISE_FLOOR_DB = -80.0  # Lowest noise floor (digital silence must not make all noise count as speech)
+SPECULATIVE_INTENT = True  # Answer from a stable partial result before Vosk finalizes
+PARTIAL_STABLE_SEC = 0.4  # How long a partial result must stay unchanged
+PARTIAL_MIN_WORDS = 3
+SPECULATIVE_MIN_CONFIDENCE = 0.85  # Intent probability needed to answer from a partial result (FAQ matches need FAQ_FAST_PATH_SIMILARITY)
+ASSISTANT_GREETING = "Hello! I'm your tire change assistant. How can I help?"
+FALLBACK_ANSWER = "I'm not sure how to answer that. Please ask about tire changing steps."
+TTS_CACHE_DIR = "tts_cache"  # Pre-rendered answer audio (None disables the cache)
 
 ACTION_VALIDATION_FRAMES = 15
 ACTION_CONFIDENCE_THRESHOLD = 0.6
 ACTION_CONFIDENCE_RESET_THRESHOLD = 0.3  # Reset when confidence drops below this
+ACTION_SMOOTHING_WINDOW = 15
+ACTION_SMOOTHING_MODE = 'vote'  # 'vote' (majority over the window) or 'ema' (moving average of probabilities)
+ACTION_STATE_CHECKPOINTS = 32  # Streaming states kept for rollback (one per MoViNet step)
+ACTION_STATE_ROLLBACK = True  # On a confidence dip, restore the last confident state instead of resetting
 
 # --- Application States ---
 STATE_DETECTING_FLAT_TIRE = "DETECTING_FLAT_TIRE"
@@ -153,15 +617,17 @@ ACTION_STEPS = [
 Y_OFFSET_STEP_TITLE = 40
 Y_OFFSET_MAIN_INSTRUCTION = 75
 Y_OFFSET_STATUS_VALIDATION = 110
-Y_OFFSET_CONFIRMATION_MSG = 110
 Y_OFFSET_COLLECTED_LIST = 145
 Y_OFFSET_NEEDED_LIST = 180
 Y_OFFSET_ACTION_PROGRESS = 215
 Y_OFFSET_ACTION_STEP = 250
+Y_OFFSET_CONFIRMATION_MSG = 285  # Own row: banners stay up while the status lines keep updating
 
-def display_message(frame, message, y_offset=50, color=(255, 255, 0), 
-                   font_scale=0.7, thickness=2, bg_color=(0, 0, 0)):
-    """Displays a message on the frame with a background."""
+OVERLAY_CACHE_SIZE = 256  # Rendered message patches kept by the overlay compositor
+
+def message_layout(frame_shape, message, y_offset, font_scale, thickness):
+    """Returns the background box (x, y, width, height), the text origin and the text width."""
+    frame_width = frame_shape[1]
     (text_width, text_height), baseline = cv2.getTextSize(
         message, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness
     )
@@ -178,209 +644,2506 @@ def display_message(frame, message, y_offset=50, color=(255, 255, 0),
         rect_y = 0
         y_offset = text_height + padding_y 
 
-    if rect_x + rect_width > frame.shape[1] - 10:
-        rect_width = frame.shape[1] - 10 - rect_x
-        
+    if rect_x + rect_width > frame_width - 10:
+        rect_width = frame_width - 10 - rect_x
+    return (rect_x, rect_y, rect_width, rect_height), (rect_x + padding_x, y_offset), text_width, baseline
+
+def draw_message_direct(frame, message, y_offset, color, font_scale, thickness, bg_color):
+    """Draws a message box straight onto the frame with cv2.rectangle/cv2.putText."""
+    (rect_x, rect_y, rect_width, rect_height), text_origin, _, _ = message_layout(
+        frame.shape, message, y_offset, font_scale, thickness)
+    
     # Draw background
     cv2.rectangle(frame, (rect_x, rect_y), 
                  (rect_x + rect_width, rect_y + rect_height), 
                  bg_color, cv2.FILLED)
     
     # Draw text
-    cv2.putText(frame, message, (rect_x + padding_x, y_offset), 
+    cv2.putText(frame, message, text_origin, 
                cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
 
-def inference_thread(recognizer, input_queue, output_queue):
-    """Worker thread for running model inference."""
-    while True:
-        frame = input_queue.get()
-        if frame is None:  # Termination signal
-            break
-            
-        # Run prediction
-        prediction = recognizer.predict_frame(frame)
-        output_queue.put(prediction)
+class OverlayCompositor:
+    """Draws `display_message` overlays from cached, pre-rendered patches.
 
-# --- Intent Classifier ---
-class TTSThread(threading.Thread):
+    The first time a (message, position, style) combination is drawn, its
+    layout is computed and the background box and text are rendered into a
+    small patch plus a coverage mask. Later frames only blend the patch onto
+    the frame with one masked copy. Static strings (step titles, "Needed:"
+    lists) are therefore rendered once, while countdowns and confidences are
+    re-rendered only when their text changes. Text that does not fit into
+    its box (long lines cut at the right frame edge, large font scales) is
+    always drawn directly: where its glyphs run over the frame content
+    instead of the box, OpenCV's output depends on the pixels underneath,
+    which a cached patch cannot reproduce. Everything else is pixel-identical
+    to `draw_message_direct`.
+    """
+    DIRECT = 'direct'  # Cache entry of messages that are always drawn directly
+
+    def __init__(self, max_entries=OVERLAY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.patches = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, frame_shape, message, y_offset, color, font_scale, thickness, bg_color):
+        frame_height, frame_width = frame_shape[:2]
+        (rect_x, rect_y, rect_width, rect_height), (text_x, text_y), text_width, baseline = message_layout(
+            frame_shape, message, y_offset, font_scale, thickness)
+        if text_x + text_width > rect_x + rect_width or text_x + text_width > frame_width:
+            return self.DIRECT
+        
+        # Patch bounds: the box plus a margin for glyph strokes, clipped to the frame
+        margin = thickness + int(10 * font_scale) + 2
+        x0 = max(0, min(rect_x, text_x) - margin)
+        y0 = max(0, rect_y - margin)
+        x1 = min(frame_width, max(rect_x + rect_width, text_x + text_width) + margin + 1)
+        y1 = min(frame_height, max(rect_y + rect_height, text_y + baseline) + margin + 1)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        
+        patch = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        coverage = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        for canvas, box_color, text_color in ((patch, bg_color, color), (coverage, 255, 255)):
+            cv2.rectangle(canvas, (rect_x - x0, rect_y - y0), 
+                         (rect_x + rect_width - x0, rect_y + rect_height - y0), 
+                         box_color, cv2.FILLED)
+            cv2.putText(canvas, message, (text_x - x0, text_y - y0), 
+                       cv2.FONT_HERSHEY_SIMPLEX, font_scale, text_color, thickness)
+        return (slice(y0, y1), slice(x0, x1)), patch, coverage.astype(bool)[:, :, np.newaxis]
+
+    def draw(self, frame, message, y_offset, color, font_scale, thickness, bg_color):
+        key = (message, y_offset, color, font_scale, thickness, bg_color, frame.shape)
+        entry = self.patches.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = self.render(frame.shape, message, y_offset, color, font_scale, thickness, bg_color)
+            self.patches[key] = entry
+            if len(self.patches) > self.max_entries:
+                self.patches.popitem(last=False)
+        else:
+            self.hits += 1
+            self.patches.move_to_end(key)
+        if entry is self.DIRECT:
+            draw_message_direct(frame, message, y_offset, color, font_scale, thickness, bg_color)
+        elif entry is not None:
+            region, patch, coverage = entry
+            np.copyto(frame[region], patch, where=coverage)
+
+OVERLAY_COMPOSITOR = OverlayCompositor()
+
+def display_message(frame, message, y_offset=50, color=(255, 255, 0), 
+                   font_scale=0.7, thickness=2, bg_color=(0, 0, 0)):
+    """Displays a message on the frame with a background."""
+    OVERLAY_COMPOSITOR.draw(frame, message, y_offset, tuple(color), font_scale, thickness, tuple(bg_color))
+
+# --- Metrics ---
+METRICS_PREFIX = "tire_assistant"
+METRICS_EXPORT_INTERVAL_SEC = 10.0
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds), Prometheus-style cumulative on export."""
     def __init__(self):
-        super().__init__()
-        self.queue = queue.Queue()
-        self.running = True
-        self.engine = pyttsx3.init()
-        print("✅ TTS Engine initialized successfully.")
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.count = 0
 
-    def run(self):
-        while self.running:
-            try:
-                text = self.queue.get(timeout=1.0)
-                self.engine.say(text)
-                self.engine.runAndWait()
-            except queue.Empty:
-                pass
+    def observe(self, value_ms):
+        self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)] += 1
+        self.total_ms += value_ms
+        self.count += 1
 
-    def stop(self):
-        self.running = False
-        self.engine.stop()
+class MetricsSpan:
+    """Context manager that records the time spent in a named stage."""
+    __slots__ = ('metrics', 'name', 'start')
 
-class IntentClassifier:
-    def __init__(self, tts_queue):
-        self.tts_queue = tts_queue
-        self.stopped = threading.Event()
-        self.audio_queue = queue.Queue()
-        
-        # Load FAQ data
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.metrics.observe(self.name, (time.perf_counter() - self.start) * 1000.0)
+        return False
+
+class Metrics:
+    """Process-wide stage latency histograms, counters and gauges.
+
+    Recording costs a `perf_counter()` pair and one locked bucket update per
+    span, so it stays on in production. `start_exporter` periodically writes
+    the Prometheus text format to a file and/or serves it on localhost.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.http_server = None
+
+    def span(self, name):
+        return MetricsSpan(self, name)
+
+    def observe(self, name, value_ms):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.observe(value_ms)
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def render_prometheus(self):
+        lines = []
+        with self.lock:
+            metric = f"{METRICS_PREFIX}_stage_latency_ms"
+            lines.append(f"# TYPE {metric} histogram")
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS_MS, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.total_ms:.3f}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {histogram.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {METRICS_PREFIX}_{name}_total counter")
+                lines.append(f"{METRICS_PREFIX}_{name}_total {value}")
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+                lines.append(f"{METRICS_PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, path)  # Readers never see a partially written file
+
+    def start_exporter(self, path=None, port=None, interval=METRICS_EXPORT_INTERVAL_SEC):
+        """Exports metrics every `interval` seconds to `path` and/or on http://127.0.0.1:`port`/metrics."""
+        if path:
+            def export_loop():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.write_file(path)
+                    except OSError as e:
+                        print(f"⚠️ Could not write metrics file: {e}")
+                    except Exception as e:  # Keep exporting after a bad render
+                        print(f"⚠️ Could not render metrics: {e}")
+            threading.Thread(target=export_loop, daemon=True).start()
+            print(f"INFO: Writing metrics to {path} every {interval:.0f}s")
+        if port:
+            metrics = self
+
+            class MetricsHandler(http.server.BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = metrics.render_prometheus().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self.http_server = http.server.ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+            threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+            print(f"INFO: Serving metrics on http://127.0.0.1:{port}/metrics")
+
+METRICS = Metrics()
+
+# --- Resource Profiles ---
+# Thread budgets for the frameworks sharing the CPU. Keys (all optional):
+# tf_intra_op_threads, tf_inter_op_threads, torch_threads, torch_interop_threads,
+# cv2_threads and affinity ({role: [cpu, ...]} for the roles main, capture, movinet, intent, tts).
+# Affinity pins threads, and framework thread pools inherit the CPUs of the thread that ran the
+# framework's first operation. In-process, TensorFlow and PyTorch pools therefore run on the 'main'
+# CPUs; 'movinet' only takes effect in the process worker (--action-worker process), whose TensorFlow
+# pools are created after it pinned itself. 'intent' pins the speech thread (Vosk decodes on it), the
+# intent classifier's TensorFlow ops run in the process pool.
+RESOURCE_PROFILES = {
+    'edge4': {  # 4-core fanless box: YOLO, capture and UI on cores 0-1; MoViNet and speech on 2-3
+        'tf_intra_op_threads': 2,
+        'tf_inter_op_threads': 1,
+        'torch_threads': 2,
+        'cv2_threads': 1,
+        'affinity': {'main': [0, 1], 'capture': [0, 1], 'movinet': [2, 3], 'intent': [2, 3], 'tts': [3]}
+    }
+}
+ACTIVE_RESOURCE_PROFILE = {}  # Profile applied to this process (see apply_resource_profile)
+
+def load_resource_profile(spec):
+    """Returns a profile from a built-in name, a JSON file or an inline JSON object."""
+    if spec in RESOURCE_PROFILES:
+        return {'name': spec, **RESOURCE_PROFILES[spec]}
+    if os.path.exists(spec):
+        with open(spec, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    try:
+        return json.loads(spec)
+    except json.JSONDecodeError:
+        raise ValueError(f"Unknown resource profile '{spec}' (built-in: {', '.join(RESOURCE_PROFILES)})")
+
+def apply_resource_profile(profile, role='main'):
+    """Sets the framework thread budgets of this process and pins the calling thread to `role`.
+
+    TensorFlow and PyTorch are not imported here: their budgets are applied
+    when they are first imported (see `on_import`), before their first
+    operation. Thread pools created by the frameworks inherit the affinity of
+    the thread that creates them.
+    """
+    ACTIVE_RESOURCE_PROFILE.clear()
+    ACTIVE_RESOURCE_PROFILE.update(profile)
+    if 'cv2_threads' in profile:
+        cv2.setNumThreads(profile['cv2_threads'])
+    if profile.get('affinity') and not hasattr(os, 'sched_setaffinity'):
+        print("⚠️ CPU affinity is not supported on this platform, ignoring it")
+    pin_current_thread(role)
+    on_import('tensorflow', apply_tensorflow_threads)
+    on_import('torch', apply_torch_threads)
+    print(f"INFO: Resource profile '{profile.get('name', 'custom')}': "
+          f"TF {profile.get('tf_intra_op_threads', 'default')}/"
+          f"{profile.get('tf_inter_op_threads', 'default')} (intra/inter), "
+          f"torch {profile.get('torch_threads', 'default')}, OpenCV {cv2.getNumThreads()}")
+
+def apply_tensorflow_threads(tensorflow):
+    profile = ACTIVE_RESOURCE_PROFILE
+    try:
+        if 'tf_intra_op_threads' in profile:
+            tensorflow.config.threading.set_intra_op_parallelism_threads(profile['tf_intra_op_threads'])
+        if 'tf_inter_op_threads' in profile:
+            tensorflow.config.threading.set_inter_op_parallelism_threads(profile['tf_inter_op_threads'])
+    except RuntimeError as e:
+        print(f"⚠️ TensorFlow thread settings not applied (already initialized): {e}")
+
+def apply_torch_threads(torch_module):
+    profile = ACTIVE_RESOURCE_PROFILE
+    if 'torch_threads' in profile:
+        torch_module.set_num_threads(profile['torch_threads'])
+    if 'torch_interop_threads' in profile:
         try:
-            with open(FAQ_FILE, 'r', encoding='utf-8') as f:
-                faq_data = json.load(f)
-            self.intent_to_answer_map = {item['intent']: item['answer'] for item in faq_data}
-        except FileNotFoundError:
-            print(f"Error: '{FAQ_FILE}' not found.")
-            return
+            torch_module.set_num_interop_threads(profile['torch_interop_threads'])
+        except RuntimeError as e:
+            print(f"⚠️ PyTorch inter-op threads not applied: {e}")
 
-        # Initialize predictor
+def pin_current_thread(role):
+    """Restricts the calling thread to the CPUs the active profile assigns to `role` (Linux)."""
+    cpus = ACTIVE_RESOURCE_PROFILE.get('affinity', {}).get(role)
+    if not cpus or not hasattr(os, 'sched_setaffinity'):
+        return
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        print(f"⚠️ Could not pin the {role} thread to CPUs {cpus}: {e}")
+
+def inference_thread(recognizer, input_queue, output_queue, return_probabilities=False, frame_queued=None):
+    """Worker thread for running model inference.
+
+    State resets and rollbacks come through the same queue as the frames, so
+    only this thread ever touches the recognizer's states and smoother. A
+    frame is run `count` times (capture below the target rate) and only the
+    last prediction is passed on. `frame_queued` is cleared once a queued
+    frame has been taken.
+    """
+    while True:
+        with METRICS.span('movinet_queue_wait'):
+            message = input_queue.get()
+        if message is None:  # Termination signal
+            break
+        if message[0] == 'reset':
+            recognizer.reset_states()
+        elif message[0] == 'rollback':
+            recognizer.rollback(message[1])
+        elif message[0] == 'frame':
+            if frame_queued is not None:
+                frame_queued.clear()
+            # Run prediction
+            for _ in range(message[2]):
+                with METRICS.span('movinet_predict'):
+                    prediction = recognizer.predict_frame(message[1], return_probabilities)
+            output_queue.put(prediction)
+
+# --- Action Workers ---
+ACTION_WORKER = 'thread'  # 'thread' (in-process daemon thread) or 'process' (separate process, shared memory)
+ACTION_WORKER_SLOTS = 3  # Frames in the shared-memory ring of the process worker
+ACTION_TARGET_FPS = None  # MoViNet input rate on capture time (None: every frame the worker can take)
+ACTION_MAX_BACKLOG = 2  # Model frames that may fall due at once (frames duplicated to fill capture gaps)
+ACTION_RATE_WINDOW_SEC = 5.0  # Window of the reported achieved MoViNet rate
+
+class ActionThreadWorker:
+    """Runs MoViNet in a daemon thread of this process (see `inference_thread`).
+
+    Frames, state resets and rollbacks are queued to the thread in order, like
+    the pipe of ActionProcessWorker; at most one frame waits in the queue.
+    Its TensorFlow ops run in the process-wide pools, so the 'movinet' CPU
+    affinity of a resource profile does not apply (see RESOURCE_PROFILES).
+    """
+    def __init__(self, recognizer, return_probabilities=False):
+        self.recognizer = recognizer
+        self.class_names = recognizer.class_names
+        self.input_queue = queue.Queue()  # Unbounded so commands are never dropped; frames are gated by can_submit
+        self.output_queue = queue.Queue(maxsize=1)
+        self.frame_queued = threading.Event()
+        self.thread = threading.Thread(
+            target=inference_thread,
+            args=(recognizer, self.input_queue, self.output_queue, return_probabilities, self.frame_queued)
+        )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def pending(self):
+        return self.input_queue.qsize()
+
+    def can_submit(self):
+        return not self.frame_queued.is_set()
+
+    def submit(self, frame, count=1):
+        """Preprocesses a BGR frame and hands it to the worker to run `count` times; returns False if it was busy."""
+        if not self.can_submit():
+            return False
+        with METRICS.span('format_frame'):
+            formatted_frame = self.recognizer.format_frame(frame)
+        self.frame_queued.set()
+        self.input_queue.put(('frame', formatted_frame, count))
+        return True
+
+    def poll(self):
+        """Returns the newest prediction, or None if none is ready yet."""
         try:
-            self.predictor = self.load_predictor(TF_MODEL_DIR)
-        except FileNotFoundError as e:
-            print(f"Error initializing predictor: {e}")
-            return
+            return self.output_queue.get_nowait()
+        except queue.Empty:
+            return None
 
-        # Initialize Vosk model
+    def reset(self):
+        self.input_queue.put(('reset',))
+
+    def rollback(self, state_id):
+        self.input_queue.put(('rollback', state_id))
+
+    def close(self):
+        if self.thread.is_alive():
+            self.input_queue.put(None)
+            self.thread.join(timeout=2.0)
+
+def action_worker_main(shm_name, num_slots, resolution, connection, weights_path, config_path,
+                       return_probabilities, resource_profile=None):
+    """Entry point of the MoViNet worker process (see ActionProcessWorker)."""
+    if resource_profile:
+        # Pinned before the first TensorFlow op, so the worker's TF pools run on the 'movinet' CPUs
+        apply_resource_profile(resource_profile, role='movinet')
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((num_slots, resolution, resolution, 3), dtype=np.float32, buffer=shm.buf)
+    try:
         try:
-            self.vosk_model = vosk.Model(VOSK_MODEL_PATH)
+            recognizer = load_action_recognizer(weights_path, config_path)
+            warmup_action_recognizer(recognizer)
         except Exception as e:
-            print(f"Error loading Vosk model: {e}")
+            connection.send(('error', str(e)))
             return
-            
-        self.recognizer = vosk.KaldiRecognizer(self.vosk_model, 16000)
+        connection.send(('ready', None))
         
-    def load_predictor(self, model_dir):
-        if not os.path.exists(model_dir):
-            raise FileNotFoundError(f"Model directory not found at '{model_dir}'")
-            
-        tokenizer_path = os.path.join(model_dir, 'tokenizer.json')
-        with open(tokenizer_path, 'r', encoding='utf-8') as f:
-            tokenizer = tf.keras.preprocessing.text.tokenizer_from_json(f.read())
+        while True:
+            message = connection.recv()
+            if message is None:  # Termination signal
+                break
+            if message[0] == 'reset':
+                recognizer.reset_states()
+            elif message[0] == 'rollback':
+                recognizer.rollback(message[1])
+            elif message[0] == 'frame':
+                for _ in range(message[2]):  # Repeated when capture runs below the target rate
+                    prediction = recognizer.predict_frame(slots[message[1]], return_probabilities)
+                connection.send(('prediction', prediction))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        connection.close()
+        slots = None  # Drop the view first, the shared buffer cannot be closed while it is exported
+        shm.close()
 
-        label_encoder_path = os.path.join(model_dir, 'label_encoder.json')
-        with open(label_encoder_path, 'r', encoding='utf-8') as f:
-            classes = json.load(f)
-        label_encoder = LabelEncoder()
-        label_encoder.classes_ = np.array(classes)
+class ActionProcessWorker:
+    """Runs MoViNet in its own process, fed through a shared-memory frame ring.
 
-        model_path = os.path.join(model_dir, 'model.h5')
-        model = load_model(model_path)
-        max_len = model.input_shape[1]
+    Frames are preprocessed in this process straight into a slot of the ring
+    (a FramePreprocessor over the shared buffers), so only the slot index
+    goes through the pipe; the worker answers with the prediction dicts and
+    also accepts state reset and rollback commands. At most one frame is in flight, so a
+    slot is never rewritten while the worker reads it. The worker loads its
+    own copy of the model in the background; frames are only accepted once
+    it reported ready. The process is spawned, so it re-imports this module
+    and receives the resource profile as an argument.
+    """
+    def __init__(self, weights_path, config_path, return_probabilities=False, num_slots=ACTION_WORKER_SLOTS):
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        self.class_names = config['class_names']
+        resolution = config['resolution']
         
-        print("✅ TensorFlow Intent Predictor initialized")
+        self.shm = shared_memory.SharedMemory(create=True, size=num_slots * resolution * resolution * 3 * 4)
+        self.slots = np.ndarray((num_slots, resolution, resolution, 3), dtype=np.float32, buffer=self.shm.buf)
+        self.preprocessor = FramePreprocessor(resolution, buffers=self.slots)
+        try:
+            # Spawned, not forked: a fork would copy this process's TensorFlow runtime and its thread locks
+            ctx = multiprocessing.get_context('spawn')
+            self.connection, worker_connection = ctx.Pipe()
+            try:
+                self.process = ctx.Process(
+                    target=action_worker_main,
+                    args=(self.shm.name, num_slots, resolution, worker_connection, weights_path, config_path,
+                          return_probabilities, dict(ACTIVE_RESOURCE_PROFILE)),
+                    daemon=True
+                )
+                self.process.start()
+            finally:
+                worker_connection.close()
+        except BaseException:
+            # Nobody will call close(), so the segment would otherwise stay in /dev/shm
+            if hasattr(self, 'connection'):
+                self.connection.close()
+            del self.slots
+            self.preprocessor = None
+            self.shm.close()
+            self.shm.unlink()
+            raise
+        self.ready = False
+        self.failed = False
+        self.in_flight = 0
+        self.submit_time = None
+
+    def pending(self):
+        return self.in_flight
+
+    def can_submit(self):
+        return self.ready and self.in_flight == 0
+
+    def submit(self, frame, count=1):
+        with METRICS.span('format_frame'):
+            self.preprocessor(frame)
+        self.connection.send(('frame', self.preprocessor.last_buffer, count))
+        self.in_flight += 1
+        self.submit_time = time.perf_counter()
+        return True
+
+    def poll(self):
+        """Returns the newest prediction received from the worker, or None."""
+        prediction = None
+        try:
+            while self.connection.poll():
+                kind, payload = self.connection.recv()
+                if kind == 'prediction':
+                    self.in_flight -= 1
+                    METRICS.observe('movinet_roundtrip', (time.perf_counter() - self.submit_time) * 1000.0)
+                    prediction = payload
+                elif kind == 'ready':
+                    self.ready = True
+                    print("✅ MoViNet worker process ready")
+                elif kind == 'error':
+                    self.failed = True
+                    print(f"❌ MoViNet worker process failed: {payload}")
+        except (EOFError, OSError):
+            if not self.failed:
+                self.failed = True
+                print("❌ MoViNet worker process exited")
+        return prediction
+
+    def reset(self):
+        if not self.failed:
+            self.connection.send(('reset',))
+
+    def rollback(self, state_id):
+        if not self.failed:
+            self.connection.send(('rollback', state_id))
+
+    def close(self):
+        try:
+            self.connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+        del self.slots
+        self.preprocessor = None
+        self.shm.close()
+        self.shm.unlink()
+
+class ActionFrameScheduler:
+    """Decides how many model frames each captured frame stands for, on capture timestamps.
+
+    Model frames fall due every 1/target_fps seconds of capture time: a
+    captured frame is dropped when none fell due since the previous one and
+    fed several times when the capture rate is below the target. At most
+    `max_backlog` frames can be owed, so a stall (or a busy worker) does
+    not cause a burst of stale frames afterwards.
+    """
+    def __init__(self, target_fps, max_backlog=ACTION_MAX_BACKLOG, window_sec=ACTION_RATE_WINDOW_SEC):
+        self.target_fps = target_fps
+        self.period = 1.0 / target_fps
+        self.max_backlog = max_backlog
+        self.window_sec = window_sec
+        self.reset()
+
+    def reset(self):
+        self.next_due = None
+        self.owed = 0
+        self.fed_timestamps = deque()
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.frames_fed = 0
+        self.frames_dropped = 0
+        self.frames_duplicated = 0
+
+    def due(self, timestamp):
+        """Returns how many model frames are owed once the frame captured at `timestamp` arrived."""
+        if self.next_due is None:
+            self.next_due = timestamp
+        if timestamp >= self.next_due:
+            elapsed_periods = int((timestamp - self.next_due) // self.period) + 1
+            self.next_due += elapsed_periods * self.period
+            self.owed = min(self.owed + elapsed_periods, self.max_backlog)
+        return self.owed
+
+    def feed(self, timestamp, count):
+        """Records that the frame captured at `timestamp` was fed `count` times (0: dropped)."""
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        if count == 0:
+            self.frames_dropped += 1
+            METRICS.increment('movinet_frames_dropped')
+            return
+        self.owed = max(self.owed - count, 0)
+        self.frames_fed += count
+        if count > 1:
+            self.frames_duplicated += count - 1
+            METRICS.increment('movinet_frames_duplicated', count - 1)
+        self.fed_timestamps.extend([timestamp] * count)
+        while self.fed_timestamps and timestamp - self.fed_timestamps[0] > self.window_sec:
+            self.fed_timestamps.popleft()
+        METRICS.set_gauge('movinet_achieved_fps', self.achieved_fps())
+
+    def achieved_fps(self):
+        """Model frames per second of capture time over the last `window_sec`."""
+        if len(self.fed_timestamps) < 2:
+            return 0.0
+        span = self.fed_timestamps[-1] - self.fed_timestamps[0]
+        return (len(self.fed_timestamps) - 1) / span if span > 0 else 0.0
+
+    def stats(self):
+        duration = (self.last_timestamp - self.first_timestamp) if self.first_timestamp is not None else 0.0
         return {
-            'model': model,
-            'tokenizer': tokenizer,
-            'label_encoder': label_encoder,
-            'max_len': max_len
+            'target_fps': self.target_fps,
+            'achieved_fps': self.frames_fed / duration if duration > 0 else 0.0,
+            'frames_fed': self.frames_fed,
+            'frames_dropped': self.frames_dropped,
+            'frames_duplicated': self.frames_duplicated
         }
 
-    def audio_callback(self, indata, frames, time, status):
-        if status:
-            print(status, flush=True)
-        self.audio_queue.put(bytes(indata))
-        
-    def preprocess_text(self, text):
-        if not isinstance(text, str):
-            return ""
-        text = text.lower()
-        text = re.sub(r"([?.!,¿])", r" \1 ", text)
-        text = re.sub(r'[" "]+', " ", text)
-        text = re.sub(r"[^a-zA-Z?.!,¿]+", " ", text)
-        return text.strip()
+# --- Frame Capture ---
+class LatestFrameReader:
+    """Reads a live source in a background thread and keeps only the newest frame.
 
-    def predict_intent(self, text):
-        predictor = self.predictor
-        processed_text = self.preprocess_text(text)
-        sequence = predictor['tokenizer'].texts_to_sequences([processed_text])
-        padded_sequence = pad_sequences(sequence, maxlen=predictor['max_len'], padding='post', truncating='post')
-        
-        prediction = predictor['model'].predict(padded_sequence, verbose=0)
-        predicted_idx = np.argmax(prediction, axis=1)[0]
-        predicted_intent = predictor['label_encoder'].inverse_transform([predicted_idx])[0]
-        return predicted_intent, prediction[0][predicted_idx]
-        
-    def start_listening(self):
-        print("\n🎤 Assistant is now listening...")
-        self.tts_queue.put("Hello! I'm your tire change assistant. How can I help?")
-        
-        with sd.RawInputStream(samplerate=16000, blocksize=8000, dtype='int16',
-                               channels=1, callback=self.audio_callback):
-            while not self.stopped.is_set():
-                try:
-                    data = self.audio_queue.get(timeout=1.0)
-                    if self.recognizer.AcceptWaveform(data):
-                        result = self.recognizer.Result()
-                        text = json.loads(result).get("text", "")
-                        
-                        if text and text.strip() != "":
-                            print(f"\nRecognized: '{text}'")
-                            
-                            intent, probability = self.predict_intent(text)
-                            answer = self.intent_to_answer_map.get(intent, 
-                                          "I'm not sure how to answer that. Please ask about tire changing steps.")
-                            
-                            print(f"   -> Intent: '{intent}' ({probability*100:.2f}% confidence)")
-                            print(f"   -> Response: {answer}")
-                            
-                            # Send response to TTS
-                            self.tts_queue.put(answer)
-                            
-                except queue.Empty:
-                    pass
-                    
-    def stop(self):
-        self.stopped.set()
+    Webcams and IP cameras buffer frames in the driver while the main loop is
+    busy with inference, so reading synchronously shows stale frames. This
+    reader drains the source continuously; `read()` returns the most recent
+    decoded frame with its capture time and counts every frame that was
+    overwritten unread.
+    """
+    def __init__(self, cap, read_timeout=5.0):
+        self.cap = cap
+        self.read_timeout = read_timeout
+        self.condition = threading.Condition()
+        self.frame = None
+        self.timestamp = None
+        self.frame_id = 0
+        self.last_read_id = 0
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.ended = False
+        self.running = False
+        self.thread = None
 
-def main_orchestrator():
-    """Main function to run the integrated tire change assistant."""
-    # --- GPU Verification ---
-    print("--- Verifying Processing Devices ---")
-    # PyTorch GPU check
-    if torch.cuda.is_available():
-        print("✅ PyTorch: CUDA (GPU) available")
-        torch_device = "cuda"
-    else:
-        print("⚠️ PyTorch: Using CPU")
-        torch_device = "cpu"
-    
-    # TensorFlow GPU check
-    gpus = tf.config.list_physical_devices('GPU')
-    if gpus:
-        try:
-            for gpu in gpus:
-                tf.config.experimental.set_memory_growth(gpu, True)
-            print("✅ TensorFlow: GPU available")
-        except RuntimeError as e:
-            print(f"⚠️ TensorFlow GPU config error: {e}")
-    else:
-        print("⚠️ TensorFlow: No GPU found, using CPU")
-    
-    print("----------------------------------")
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._update, daemon=True)
+        self.thread.start()
+        return self
+
+    def _update(self):
+        pin_current_thread('capture')
+        while self.running:
+            ret, frame = self.cap.read()
+            capture_time = time.time()
+            with self.condition:
+                if not ret or frame is None:
+                    self.ended = True
+                    self.condition.notify_all()
+                    break
+                if self.frame_id > self.last_read_id:
+                    self.frames_dropped += 1  # Previous frame was never consumed
+                self.frame = frame
+                self.timestamp = capture_time
+                self.frame_id += 1
+                self.frames_captured += 1
+                self.condition.notify_all()
+
+    def read(self, timeout=None):
+        """Returns (ret, frame, timestamp) for the newest frame not yet returned.
+
+        The timestamp is read under the same lock as the frame, so it always
+        belongs to it. Waits up to `timeout` seconds (default `read_timeout`);
+        `timeout=0` polls. A timeout also returns (False, None, None), but
+        leaves `ended` unset: only a failed read of the source ends it.
+        """
+        with self.condition:
+            has_new_frame = self.condition.wait_for(
+                lambda: self.frame_id > self.last_read_id or self.ended,
+                timeout=self.read_timeout if timeout is None else timeout
+            )
+            if not has_new_frame or self.frame_id == self.last_read_id:
+                return False, None, None
+            self.last_read_id = self.frame_id
+            return True, self.frame, self.timestamp
+
+    def stats(self):
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_dropped': self.frames_dropped,
+            'last_timestamp': self.timestamp
+        }
+
+    def release(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        self.cap.release()
+
+class SequentialFrameReader:
+    """Reads every frame of a video file in order (no frames are dropped).
+
+    With `use_video_time` the timestamp is the frame's position in the video
+    instead of the wall-clock time it was read.
+    """
+    def __init__(self, cap, use_video_time=False):
+        self.cap = cap
+        self.use_video_time = use_video_time
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.timestamp = None
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.ended = False
+
+    def start(self):
+        return self
+
+    def read(self, timeout=None):
+        """Returns (ret, frame, timestamp) for the next frame."""
+        ret, frame = self.cap.read()
+        if not ret or frame is None:
+            self.ended = True
+            return False, None, None
+        self.frames_captured += 1
+        self.timestamp = self.video_time() if self.use_video_time else time.time()
+        return ret, frame, self.timestamp
+
+    def video_time(self):
+        position_sec = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if position_sec <= 0 and self.frames_captured > 1:
+            # Some backends do not report positions; fall back to the nominal frame rate
+            position_sec = (self.frames_captured - 1) / self.fps
+        return position_sec
+
+    def stats(self):
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_dropped': self.frames_dropped,
+            'last_timestamp': self.timestamp
+        }
+
+    def release(self):
+        self.cap.release()
+
+# --- Model Registry ---
+class ModelRegistry:
+    """Loads and warms up every model once, in a background thread, at startup.
+
+    Models are loaded in registration order, so the model needed first should
+    be registered first. `get()` blocks only if that model is still loading.
+    """
+    def __init__(self):
+        self.loaders = []
+        self.models = {}
+        self.errors = {}
+        self.timings = {}
+        self.ready_events = {}
+        self.thread = None
+
+    def register(self, name, load_fn, warmup_fn=None):
+        self.loaders.append((name, load_fn, warmup_fn))
+        self.ready_events[name] = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._load_all, daemon=True)
+        self.thread.start()
+        return self
+
+    def _load_all(self):
+        for name, load_fn, warmup_fn in self.loaders:
+            try:
+                load_start = time.perf_counter()
+                model = load_fn()
+                load_time = time.perf_counter() - load_start
+
+                warmup_start = time.perf_counter()
+                if warmup_fn is not None:
+                    warmup_fn(model)
+                warmup_time = time.perf_counter() - warmup_start
+
+                self.models[name] = model
+                self.timings[name] = {'load_sec': load_time, 'warmup_sec': warmup_time}
+                print(f"✅ Registry: '{name}' loaded in {load_time:.2f}s, warmed up in {warmup_time:.2f}s")
+            except Exception as e:
+                self.errors[name] = e
+                print(f"❌ Registry: failed to load '{name}': {e}")
+            finally:
+                self.ready_events[name].set()
+
+    def get(self, name, timeout=None):
+        """Returns a loaded model, waiting for it if it is still loading."""
+        if not self.ready_events[name].wait(timeout):
+            raise TimeoutError(f"Model '{name}' is still loading")
+        if name in self.errors:
+            raise RuntimeError(f"Model '{name}' failed to load: {self.errors[name]}")
+        return self.models[name]
+
+    def is_ready(self, name):
+        return self.ready_events[name].is_set()
+
+    def report(self):
+        return {name: dict(timing) for name, timing in self.timings.items()}
+
+# --- YOLO Backends ---
+# Per-detector settings ({'backend': ..., 'imgsz': ...}), keyed like DETECTOR_WEIGHTS
+ACTIVE_DETECTOR_CONFIG = {name: {'backend': YOLO_BACKEND, 'imgsz': YOLO_IMGSZ} for name in DETECTOR_WEIGHTS}
+
+class YOLODetector:
+    """A YOLO model on one backend, always called at the resolution it was exported for."""
+    def __init__(self, model, backend, imgsz):
+        self.model = model
+        self.backend = backend
+        self.imgsz = imgsz
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def __call__(self, source, **kwargs):
+        kwargs.setdefault('imgsz', self.imgsz)
+        return self.model(source, **kwargs)
+
+    def __repr__(self):
+        return f"YOLODetector({self.backend}, imgsz={self.imgsz})"
+
+def load_detector_config(spec, imgsz=None):
+    """Returns per-detector settings from a backend name, a calibration JSON file or inline JSON.
+
+    `imgsz` overrides the inference resolution of every detector.
+    """
+    if spec in YOLO_BACKENDS or spec is None:
+        config = {name: {'backend': spec or YOLO_BACKEND, 'imgsz': YOLO_IMGSZ} for name in DETECTOR_WEIGHTS}
+    elif os.path.exists(spec):
+        with open(spec, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    else:
+        try:
+            config = json.loads(spec)
+        except json.JSONDecodeError:
+            raise ValueError(f"Unknown YOLO backend '{spec}' (available: {', '.join(YOLO_BACKENDS)})")
+    for name, settings in config.items():
+        if name not in DETECTOR_WEIGHTS or settings.get('backend') not in YOLO_BACKENDS:
+            raise ValueError(f"Invalid YOLO backend settings for '{name}': {settings}")
+        if imgsz:
+            settings['imgsz'] = imgsz
+    return config
+
+def configure_detectors(config):
+    for name, settings in config.items():
+        ACTIVE_DETECTOR_CONFIG[name] = {'backend': settings['backend'], 'imgsz': int(settings['imgsz'])}
+    print("INFO: YOLO backends: " + ", ".join(
+        f"{name}={settings['backend']}@{settings['imgsz']}" for name, settings in ACTIVE_DETECTOR_CONFIG.items()))
+
+def is_up_to_date(path, source_path):
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source_path)
+
+def export_yolo(weights_path, backend, imgsz):
+    """Returns the model path for a backend, exporting/quantizing the .pt weights first if needed.
+
+    Exports use dynamic input shapes so that multi-stream batches work; the
+    INT8 model is the ONNX export with dynamically quantized weights.
+    """
+    if backend == 'pytorch':
+        return weights_path
+    os.makedirs(YOLO_EXPORT_DIR, exist_ok=True)
+    stem = f"{Path(weights_path).stem}_{imgsz}"
+    
+    if backend == 'openvino':
+        export_path = os.path.join(YOLO_EXPORT_DIR, f"{stem}_openvino_model")
+        if not is_up_to_date(export_path, weights_path):
+            exported = YOLO(weights_path, task='detect').export(format='openvino', imgsz=imgsz, dynamic=True)
+            shutil.rmtree(export_path, ignore_errors=True)
+            shutil.move(exported, export_path)
+        return export_path
+    
+    onnx_path = os.path.join(YOLO_EXPORT_DIR, f"{stem}.onnx")
+    if not is_up_to_date(onnx_path, weights_path):
+        exported = YOLO(weights_path, task='detect').export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+        os.replace(exported, onnx_path)
+    if backend == 'onnx':
+        return onnx_path
+    
+    int8_path = os.path.join(YOLO_EXPORT_DIR, f"{stem}_int8.onnx")
+    if not is_up_to_date(int8_path, onnx_path):
+        ort_quantization.quantize_dynamic(onnx_path, int8_path, weight_type=ort_quantization.QuantType.QUInt8)
+        # Keep the Ultralytics metadata (class names, stride, imgsz) of the float model
+        float_model, quantized_model = onnx.load(onnx_path), onnx.load(int8_path)
+        del quantized_model.metadata_props[:]
+        quantized_model.metadata_props.extend(float_model.metadata_props)
+        onnx.save(quantized_model, int8_path)
+    return int8_path
+
+def load_yolo(weights_path, backend=YOLO_BACKEND, imgsz=YOLO_IMGSZ):
+    return YOLODetector(YOLO(export_yolo(weights_path, backend, imgsz), task='detect'), backend, imgsz)
+
+def load_detector(name):
+    """Loads a detector ('flat_tire' or 'tools') with its configured backend and resolution."""
+    settings = ACTIVE_DETECTOR_CONFIG[name]
+    return load_yolo(DETECTOR_WEIGHTS[name], settings['backend'], settings['imgsz'])
+
+def warmup_yolo(model, device, num_runs=2):
+    """Runs a YOLO model on blank frames so the first real frame is not slow."""
+    dummy_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    for _ in range(num_runs):
+        model(dummy_frame, verbose=False, conf=TOOLS_CONFIDENCE_THRESHOLD, device=device)
+
+def load_action_recognizer(weights_path, config_path):
+    recognizer = RealTimeActionRecognizer(weights_path, config_path,
+                                          smoothing_window=ACTION_SMOOTHING_WINDOW,
+                                          smoothing_mode=ACTION_SMOOTHING_MODE,
+                                          num_checkpoints=ACTION_STATE_CHECKPOINTS)
+    if recognizer.states is None:
+        raise RuntimeError("MoViNet weights could not be loaded")
+    return recognizer
+
+def warmup_action_recognizer(recognizer, num_runs=2):
+    """Runs the streaming model on blank frames, then clears the warm-up states."""
+    dummy_frame = recognizer.format_frame(np.zeros((480, 640, 3), dtype=np.uint8))
+    for _ in range(num_runs):
+        recognizer.predict_frame(dummy_frame)
+    recognizer.reset_states()
+
+# --- Detection Post-processing ---
+EMPTY_DETECTIONS = (
+    np.empty(0, dtype=np.int32),
+    np.empty(0, dtype=np.float32),
+    np.empty((0, 4), dtype=np.int32)
+)
+
+def extract_detections(results):
+    """Converts YOLO boxes into (class_ids, confidences, xyxy) NumPy arrays.
+
+    The whole box tensor is copied to the host once per frame instead of
+    calling `.item()` / `.cpu()` on every box.
+    """
+    if not results or results[0].boxes is None or len(results[0].boxes) == 0:
+        return EMPTY_DETECTIONS
+    data = results[0].boxes.data.cpu().numpy()  # Columns: x1, y1, x2, y2, conf, cls
+    class_ids = data[:, -1].astype(np.int32)
+    confidences = data[:, 4].astype(np.float32)
+    xyxy = data[:, :4].astype(np.int32)
+    return class_ids, confidences, xyxy
+
+def class_ids_for_names(labels, class_names):
+    """Maps class names to the model's class ids, ignoring names the model lacks."""
+    return np.array(sorted(class_id for class_id, name in labels.items() if name in class_names),
+                    dtype=np.int32)
+
+def filter_detections(detections, class_ids):
+    """Keeps only the detections whose class id is in `class_ids`."""
+    detected_class_ids, confidences, xyxy = detections
+    mask = np.isin(detected_class_ids, class_ids)
+    return detected_class_ids[mask], confidences[mask], xyxy[mask]
+
+# --- Keyframe Detection ---
+ADAPTIVE_DETECTION = False  # Run YOLO on keyframes only and track boxes in between
+KEYFRAME_MIN_INTERVAL = 2  # Frames between YOLO runs under fast motion
+KEYFRAME_MAX_INTERVAL = 10  # Frames between YOLO runs on a still scene
+KEYFRAME_FAST_MOTION_PX = 6.0  # Median point motion per frame that halves the interval
+KEYFRAME_SLOW_MOTION_PX = 1.5  # Median point motion per frame that lengthens the interval
+TRACKING_MIN_CONFIDENCE = 0.5  # Force a keyframe when fewer tracked points survive
+TRACKING_MIN_BOX_POINTS = 3
+
+class KeyframeTracker:
+    """Propagates YOLO detections between keyframes with sparse optical flow.
+
+    On a keyframe, corners are picked over the whole frame (plus a small grid
+    inside every box). On the following frames they are tracked with
+    pyramidal Lucas-Kanade and each box is shifted by the median displacement
+    of its own points; class ids and confidences are kept from the keyframe.
+    A new keyframe is needed once the interval elapsed or when too few points
+    survive tracking. The interval adapts to the measured motion: it is halved
+    under fast motion and grows by one frame per still keyframe.
+    """
+    LK_PARAMS = dict(winSize=(21, 21), maxLevel=2,
+                     criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+    def __init__(self, min_interval=KEYFRAME_MIN_INTERVAL, max_interval=KEYFRAME_MAX_INTERVAL,
+                 max_corners=200):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_corners = max_corners
+        self.interval = min_interval
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets the tracked boxes (model switch); the next frame is a keyframe."""
+        self.prev_gray = None
+        self.detections = EMPTY_DETECTIONS
+        self.points = None  # (N, 1, 2) float32, tracked from the previous frame
+        self.box_members = None  # (num_boxes, N) bool, which points belong to which box
+        self.initial_points = 0
+        self.frames_since_keyframe = 0
+        self.tracking_confidence = 1.0
+        self.motion_px = 0.0
+
+    def needs_keyframe(self):
+        return (self.prev_gray is None
+                or self.frames_since_keyframe >= self.interval
+                or self.tracking_confidence < TRACKING_MIN_CONFIDENCE)
+
+    def keyframe(self, frame, detections):
+        """Stores fresh YOLO detections and picks the points to track from `frame`."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.prev_gray is not None and self.frames_since_keyframe > 0:
+            # Adapt the interval to the motion seen since the previous keyframe
+            if self.motion_px >= KEYFRAME_FAST_MOTION_PX:
+                self.interval = max(self.min_interval, self.interval // 2)
+            elif self.motion_px <= KEYFRAME_SLOW_MOTION_PX:
+                self.interval = min(self.max_interval, self.interval + 1)
+
+        corners = cv2.goodFeaturesToTrack(gray, self.max_corners, 0.01, 7)
+        points = [corners.reshape(-1, 2)] if corners is not None else []
+        _, _, xyxy = detections
+        for x1, y1, x2, y2 in xyxy.tolist():
+            # A 3x3 grid keeps low-texture boxes trackable
+            grid_x, grid_y = np.meshgrid(np.linspace(x1, x2, 5)[1:-1], np.linspace(y1, y2, 5)[1:-1])
+            points.append(np.stack([grid_x.ravel(), grid_y.ravel()], axis=1))
+        points = np.concatenate(points).astype(np.float32) if points else np.empty((0, 2), np.float32)
+
+        boxes = xyxy.astype(np.float32)
+        self.box_members = ((points[None, :, 0] >= boxes[:, None, 0]) & (points[None, :, 0] <= boxes[:, None, 2]) &
+                            (points[None, :, 1] >= boxes[:, None, 1]) & (points[None, :, 1] <= boxes[:, None, 3]))
+        self.points = points.reshape(-1, 1, 2)
+        self.initial_points = len(points)
+        self.detections = detections
+        self.prev_gray = gray
+        self.frames_since_keyframe = 0
+        self.tracking_confidence = 1.0
+        self.motion_px = 0.0
+        self.keyframes += 1
+        METRICS.increment('yolo_keyframes')
+        METRICS.set_gauge('keyframe_interval', self.interval)
+
+    def propagate(self, frame):
+        """Returns the keyframe detections with boxes moved to where they are in `frame`."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.frames_since_keyframe += 1
+        self.tracked_frames += 1
+        METRICS.increment('tracked_frames')
+        if len(self.points) == 0:
+            self.tracking_confidence = 0.0
+            self.prev_gray = gray
+            return self.detections
+
+        with METRICS.span('optical_flow'):
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None,
+                                                             **self.LK_PARAMS)
+        alive = status.ravel() == 1
+        displacement = (new_points - self.points).reshape(-1, 2)
+        if alive.any():
+            self.motion_px = max(self.motion_px, float(np.median(np.linalg.norm(displacement[alive], axis=1))))
+
+        class_ids, confidences, xyxy = self.detections
+        xyxy = xyxy.copy()
+        box_confidence = 1.0
+        for i, members in enumerate(self.box_members):
+            tracked = members & alive
+            if tracked.sum() < TRACKING_MIN_BOX_POINTS:
+                box_confidence = 0.0
+                continue
+            box_confidence = min(box_confidence, tracked.sum() / max(members.sum(), 1))
+            dx, dy = np.median(displacement[tracked], axis=0)
+            xyxy[i] += np.array([dx, dy, dx, dy]).round().astype(np.int32)
+
+        self.points = new_points[alive]
+        self.box_members = self.box_members[:, alive]
+        self.tracking_confidence = min(box_confidence, len(self.points) / max(self.initial_points, 1))
+        self.detections = (class_ids, confidences, xyxy)
+        self.prev_gray = gray
+        return self.detections
+
+    def stats(self):
+        total = self.keyframes + self.tracked_frames
+        return {
+            'keyframes': self.keyframes,
+            'tracked_frames': self.tracked_frames,
+            'keyframe_ratio': self.keyframes / total if total else 0.0,
+            'interval': self.interval
+        }
+
+# --- Intent Classifier ---
+def tts_voice_key(engine):
+    """Identifies the voice settings audio was rendered with (part of every cache key)."""
+    return f"{engine.getProperty('voice')}|{engine.getProperty('rate')}|{engine.getProperty('volume')}"
+
+def cacheable_tts_texts():
+    """The fixed texts the assistant speaks: greeting, fallback and every FAQ answer (deduplicated)."""
+    texts = [ASSISTANT_GREETING, FALLBACK_ANSWER]
+    try:
+        with open(FAQ_FILE, 'r', encoding='utf-8') as f:
+            texts.extend(item['answer'] for item in json.load(f))
+    except FileNotFoundError:
+        pass
+    return list(dict.fromkeys(texts))
+
+class TTSAudioCache:
+    """Pre-rendered speech for fixed texts, kept as raw PCM in one memory-mapped file.
+
+    `pcm.bin` holds the int16 samples of every entry back to back and
+    `index.json` maps the SHA-1 of (voice settings, text) to the entry's
+    offset, length, sample rate and channel count. Entries are only
+    appended, so views handed out earlier stay valid.
+    """
+    def __init__(self, directory, voice_key=""):
+        os.makedirs(directory, exist_ok=True)
+        self.pcm_path = os.path.join(directory, 'pcm.bin')
+        self.index_path = os.path.join(directory, 'index.json')
+        self.voice_key = voice_key
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        self.pcm = None
+        self.open_map()
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.voice_key}\n{text}".encode('utf-8')).hexdigest()
+
+    def open_map(self):
+        num_samples = os.path.getsize(self.pcm_path) // 2 if os.path.exists(self.pcm_path) else 0
+        self.pcm = np.memmap(self.pcm_path, dtype='<i2', mode='r', shape=(num_samples,)) if num_samples else None
+
+    def __contains__(self, text):
+        return self.key(text) in self.index
+
+    def get(self, text):
+        """Returns (samples, sample_rate) for a rendered text, or None."""
+        entry = self.index.get(self.key(text))
+        if entry is None or self.pcm is None or entry['offset'] + entry['samples'] > len(self.pcm):
+            return None
+        samples = self.pcm[entry['offset']:entry['offset'] + entry['samples']]
+        return samples.reshape(-1, entry['channels']), entry['sample_rate']
+
+    def render(self, engine, text):
+        """Synthesizes `text` to a temporary WAV with `engine` and appends its PCM; returns success."""
+        fd, wav_path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            engine.save_to_file(text, wav_path)
+            engine.runAndWait()
+            with wave.open(wav_path, 'rb') as wav:
+                if wav.getsampwidth() != 2:
+                    return False
+                pcm = wav.readframes(wav.getnframes())
+                sample_rate = wav.getframerate()
+                channels = wav.getnchannels()
+        except (wave.Error, EOFError, OSError) as e:
+            print(f"⚠️ TTS cache: could not render '{text[:40]}': {e}")
+            return False
+        finally:
+            try:
+                os.remove(wav_path)
+            except OSError:
+                pass
+        
+        offset = os.path.getsize(self.pcm_path) // 2 if os.path.exists(self.pcm_path) else 0
+        with open(self.pcm_path, 'ab') as f:
+            f.write(pcm)
+        self.index[self.key(text)] = {
+            'offset': offset,
+            'samples': len(pcm) // 2,
+            'sample_rate': sample_rate,
+            'channels': channels
+        }
+        temporary_path = self.index_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(temporary_path, self.index_path)
+        self.open_map()
+        return True
+
+def build_tts_cache(cache_dir=TTS_CACHE_DIR):
+    """Renders every fixed text that is not cached yet (e.g. at install time)."""
+    engine = pyttsx3.init()
+    cache = TTSAudioCache(cache_dir, tts_voice_key(engine))
+    missing = [text for text in cacheable_tts_texts() if text not in cache]
+    print(f"INFO: Rendering {len(missing)} text(s) into {cache_dir}")
+    rendered = sum(cache.render(engine, text) for text in missing)
+    print(f"✅ TTS cache: {rendered}/{len(missing)} rendered, {len(cache.index)} entries in total")
+
+class TTSThread(threading.Thread):
+    """Speaks queued texts: cached texts are played as PCM through sounddevice, others synthesized live.
+
+    Fixed texts missing from the cache are rendered one at a time while the
+    queue is idle, so the cache fills up during the first run.
+    """
+    def __init__(self, cache_dir=TTS_CACHE_DIR):
+        super().__init__()
+        self.queue = queue.Queue()
+        self.running = True
+        self.engine = pyttsx3.init()
+        self.cache = None
+        self.pending_renders = deque()
+        if cache_dir:
+            try:
+                self.cache = TTSAudioCache(cache_dir, tts_voice_key(self.engine))
+                self.pending_renders.extend(text for text in cacheable_tts_texts() if text not in self.cache)
+                print(f"✅ TTS cache: {len(self.cache.index)} cached, {len(self.pending_renders)} to render")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ TTS cache disabled: {e}")
+        print("✅ TTS Engine initialized successfully.")
+
+    def run(self):
+        pin_current_thread('tts')
+        while self.running:
+            try:
+                text = self.queue.get(timeout=1.0)
+                METRICS.set_gauge('tts_queue_depth', self.queue.qsize())
+                self.speak(text)
+            except queue.Empty:
+                if self.pending_renders and self.running:
+                    with METRICS.span('tts_render'):
+                        self.cache.render(self.engine, self.pending_renders.popleft())
+
+    def speak(self, text):
+        cached = self.cache.get(text) if self.cache is not None else None
+        if cached is not None:
+            METRICS.increment('tts_cache_hits')
+            samples, sample_rate = cached
+            with METRICS.span('tts_play_cached'):
+                sd.play(samples, sample_rate)
+                sd.wait()
+            return
+        METRICS.increment('tts_cache_misses')
+        with METRICS.span('tts_speak'):
+            self.engine.say(text)
+            self.engine.runAndWait()
+
+    def stop(self):
+        self.running = False
+        self.engine.stop()
+        if self.cache is not None:
+            sd.stop()
+
+class EnergyVAD:
+    """Energy-based voice activity detection on 16-bit PCM blocks.
+
+    The noise floor is the level of the quietest block of the last
+    `noise_window_sec` (but at least `floor_db`), so it drops with the first
+    quieter block and rises once louder steady noise (a compressor starting)
+    has lasted the whole window. A block is speech when it is `margin_db`
+    above the floor and above `min_db`. A speech segment starts
+    with `preroll_sec` of audio buffered before the onset (so the first word
+    is not clipped) and keeps `hangover_sec` of trailing audio.
+    """
+    def __init__(self, block_sec, margin_db=VAD_MARGIN_DB, min_db=VAD_MIN_DB,
+                 hangover_sec=VAD_HANGOVER_SEC, preroll_sec=VAD_PREROLL_SEC,
+                 noise_window_sec=VAD_NOISE_WINDOW_SEC, floor_db=VAD_NOISE_FLOOR_DB):
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.floor_db = floor_db
+        self.hangover_blocks = max(1, round(hangover_sec / block_sec))
+        self.preroll = deque(maxlen=max(1, round(preroll_sec / block_sec)))
+        self.noise_levels = deque(maxlen=max(1, round(noise_window_sec / block_sec)))
+        self.active = False
+        self.silent_blocks = 0
+
+    @staticmethod
+    def level_db(data):
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        rms = np.sqrt(np.mean(samples * samples)) if samples.size else 0.0
+        return 20.0 * np.log10(rms / 32768.0 + 1e-10)
+
+    @property
+    def noise_db(self):
+        return max(min(self.noise_levels), self.floor_db) if self.noise_levels else None
+
+    def process(self, data):
+        """Returns (blocks to feed to the recognizer, whether a speech segment just ended)."""
+        level = self.level_db(data)
+        self.noise_levels.append(level)
+        is_speech = level >= max(self.noise_db + self.margin_db, self.min_db)
+        
+        if is_speech:
+            self.silent_blocks = 0
+            if not self.active:
+                self.active = True
+                blocks = list(self.preroll) + [data]
+                self.preroll.clear()
+                return blocks, False
+            return [data], False
+        
+        if self.active:
+            self.silent_blocks += 1
+            if self.silent_blocks <= self.hangover_blocks:
+                return [data], False
+            self.active = False
+            self.preroll.append(data)
+            return [], True
+        self.preroll.append(data)
+        return [], False
+
+class FAQRetrievalIndex:
+    """TF-IDF index over the faq.json questions, stored as an L2-normalized NumPy matrix.
+
+    Scoring an utterance only touches the matrix columns of its words, so a
+    lookup is a small gather and dot product (well under a millisecond for
+    a few hundred questions).
+    """
+    def __init__(self, faq_data, preprocess):
+        self.preprocess = preprocess
+        self.entries = [item for item in faq_data if item.get('question')]
+        documents = [self.tokenize(item['question']) for item in self.entries]
+        
+        self.vocabulary = {}
+        for words in documents:
+            for word in words:
+                self.vocabulary.setdefault(word, len(self.vocabulary))
+        
+        counts = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, words in enumerate(documents):
+            for word in words:
+                counts[row, self.vocabulary[word]] += 1
+        document_frequency = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.matrix = self.normalize(self.weight(counts, self.idf))
+
+    def tokenize(self, text):
+        return [word for word in self.preprocess(text).split() if word.isalpha()]
+
+    @staticmethod
+    def weight(counts, idf):
+        """Sublinear term frequency times inverse document frequency (`idf` of the same columns)."""
+        weights = np.zeros_like(counts)
+        np.log(counts, out=weights, where=counts > 0)
+        weights[counts > 0] += 1
+        return weights * idf
+
+    @staticmethod
+    def normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def query(self, text):
+        """Returns (faq entry, cosine similarity) of the best-matching question, or (None, 0.0)."""
+        columns = {}
+        for word in self.tokenize(text):
+            column = self.vocabulary.get(word)
+            if column is not None:
+                columns[column] = columns.get(column, 0) + 1
+        if not columns or not self.entries:
+            return None, 0.0
+        
+        indices = np.fromiter(columns.keys(), dtype=np.intp, count=len(columns))
+        counts = np.fromiter(columns.values(), dtype=np.float32, count=len(columns))
+        query = self.normalize(self.weight(counts, self.idf[indices]))
+        scores = self.matrix[:, indices] @ query
+        best = int(np.argmax(scores))
+        return self.entries[best], float(scores[best])
+
+class IntentClassifier:
+    PUNCTUATION_PATTERN = re.compile(r"([?.!,¿])")
+    QUOTES_PATTERN = re.compile(r'[" "]+')
+    NON_LETTER_PATTERN = re.compile(r"[^a-zA-Z?.!,¿]+")
+
+    def __init__(self, tts_queue, block_size=AUDIO_BLOCK_SIZE, use_vad=VAD_ENABLED,
+                 speculative=SPECULATIVE_INTENT, retrieval=FAQ_RETRIEVAL):
+        self.tts_queue = tts_queue
+        self.stopped = threading.Event()
+        self.audio_queue = queue.Queue()
+        self.block_size = block_size
+        self.vad = EnergyVAD(block_size / AUDIO_SAMPLE_RATE) if use_vad else None
+        self.speculative = speculative
+        self.partial_text = ""
+        self.partial_since = None
+        self.speculative_answer = None  # Answer already given for the current utterance
+        self.retrieval_index = None
+        self.predict_normalized = functools.lru_cache(maxsize=INTENT_CACHE_SIZE)(self._predict_normalized)
+        
+        # Load FAQ data
+        try:
+            with open(FAQ_FILE, 'r', encoding='utf-8') as f:
+                faq_data = json.load(f)
+            self.intent_to_answer_map = {item['intent']: item['answer'] for item in faq_data}
+            if retrieval:
+                self.retrieval_index = FAQRetrievalIndex(faq_data, self.preprocess_text)
+                print(f"✅ FAQ retrieval index: {self.retrieval_index.matrix.shape[0]} questions, "
+                      f"{self.retrieval_index.matrix.shape[1]} terms")
+        except FileNotFoundError:
+            print(f"Error: '{FAQ_FILE}' not found.")
+            return
+
+        # Initialize predictor
+        try:
+            self.predictor = self.load_predictor(TF_MODEL_DIR)
+        except FileNotFoundError as e:
+            print(f"Error initializing predictor: {e}")
+            return
+
+        # Initialize Vosk model
+        try:
+            self.vosk_model = vosk.Model(VOSK_MODEL_PATH)
+        except Exception as e:
+            print(f"Error loading Vosk model: {e}")
+            return
+            
+        self.recognizer = vosk.KaldiRecognizer(self.vosk_model, AUDIO_SAMPLE_RATE)
+        
+    def load_predictor(self, model_dir):
+        if not os.path.exists(model_dir):
+            raise FileNotFoundError(f"Model directory not found at '{model_dir}'")
+            
+        tokenizer_path = os.path.join(model_dir, 'tokenizer.json')
+        with open(tokenizer_path, 'r', encoding='utf-8') as f:
+            tokenizer = tf.keras.preprocessing.text.tokenizer_from_json(f.read())
+
+        label_encoder_path = os.path.join(model_dir, 'label_encoder.json')
+        with open(label_encoder_path, 'r', encoding='utf-8') as f:
+            intents = json.load(f)  # LabelEncoder classes, i.e. index -> intent
+
+        model_path = os.path.join(model_dir, 'model.h5')
+        model = load_model(model_path)
+        max_len = model.input_shape[1]
+        
+        # Direct graph call instead of model.predict() for single utterances
+        model_fn = tf.function(lambda x: model(x, training=False),
+                               input_signature=[tf.TensorSpec([1, max_len], model.inputs[0].dtype)])
+        
+        print("✅ TensorFlow Intent Predictor initialized")
+        return {
+            'model': model,
+            'model_fn': model_fn,
+            'tokenizer': tokenizer,
+            'intents': intents,
+            'max_len': max_len,
+            'input_dtype': model.inputs[0].dtype.as_numpy_dtype,
+            **self.build_vocabulary(tokenizer)
+        }
+
+    def build_vocabulary(self, tokenizer):
+        """Precomputes the word -> token id mapping applied by `Tokenizer.texts_to_sequences`."""
+        oov_index = tokenizer.word_index.get(tokenizer.oov_token) if tokenizer.oov_token else None
+        vocabulary = {}
+        for word, index in tokenizer.word_index.items():
+            if tokenizer.num_words and index >= tokenizer.num_words:
+                index = oov_index  # Words outside num_words map to the OOV token (or are dropped)
+            if index is not None:
+                vocabulary[word] = index
+        return {
+            'vocabulary': vocabulary,
+            'oov_index': oov_index,
+            'filter_table': str.maketrans({c: tokenizer.split for c in tokenizer.filters}),
+            'split': tokenizer.split,
+            'lower': tokenizer.lower
+        }
+
+    def text_to_sequence(self, processed_text):
+        """Tokenizes and post-pads/truncates one utterance like texts_to_sequences + pad_sequences."""
+        predictor = self.predictor
+        if predictor['lower']:
+            processed_text = processed_text.lower()
+        words = processed_text.translate(predictor['filter_table']).split(predictor['split'])
+        vocabulary = predictor['vocabulary']
+        oov_index = predictor['oov_index']
+        
+        sequence = np.zeros((1, predictor['max_len']), dtype=predictor['input_dtype'])
+        length = 0
+        for word in words:
+            if not word:
+                continue
+            index = vocabulary.get(word, oov_index)
+            if index is None:
+                continue
+            sequence[0, length] = index
+            length += 1
+            if length == predictor['max_len']:
+                break
+        return sequence
+
+    def audio_callback(self, indata, frames, time, status):
+        if status:
+            print(status, flush=True)
+        self.audio_queue.put(bytes(indata))
+        
+    def preprocess_text(self, text):
+        if not isinstance(text, str):
+            return ""
+        text = text.lower()
+        text = self.PUNCTUATION_PATTERN.sub(r" \1 ", text)
+        text = self.QUOTES_PATTERN.sub(" ", text)
+        text = self.NON_LETTER_PATTERN.sub(" ", text)
+        return text.strip()
+
+    def predict_intent(self, text):
+        """Returns (intent, probability); repeated questions are answered from an LRU cache."""
+        return self.predict_normalized(self.preprocess_text(text))
+
+    def _predict_normalized(self, processed_text):
+        predictor = self.predictor
+        padded_sequence = self.text_to_sequence(processed_text)
+        
+        prediction = predictor['model_fn'](padded_sequence).numpy()
+        predicted_idx = int(np.argmax(prediction[0]))
+        predicted_intent = predictor['intents'][predicted_idx]
+        return predicted_intent, float(prediction[0][predicted_idx])
+        
+    def respond(self, text):
+        """Returns (intent, score, answer, source) for an utterance.
+
+        A near-verbatim FAQ question is answered directly ("FAQ match").
+        Otherwise the BiLSTM intent decides ("Intent"), and the matching
+        question's specific answer is used when it agrees with the intent, or
+        replaces the intent answer when the intent probability is low ("FAQ
+        fallback"). The score is the intent probability for "Intent" and the
+        TF-IDF cosine similarity for the FAQ sources.
+        """
+        match, similarity = None, 0.0
+        if self.retrieval_index is not None:
+            with METRICS.span('faq_retrieve'):
+                match, similarity = self.retrieval_index.query(text)
+            if similarity < FAQ_MATCH_MIN_SIMILARITY:
+                match = None
+        if match is not None and similarity >= FAQ_FAST_PATH_SIMILARITY:
+            METRICS.increment('faq_fast_path')
+            return match['intent'], similarity, match['answer'], "FAQ match"
+        
+        with METRICS.span('intent_predict'):
+            intent, probability = self.predict_intent(text)
+        if match is not None and match['intent'] == intent:
+            return intent, probability, match['answer'], "Intent"
+        if match is not None and probability < INTENT_MIN_CONFIDENCE:
+            METRICS.increment('faq_fallback')
+            return match['intent'], similarity, match['answer'], "FAQ fallback"
+        return intent, probability, self.intent_to_answer_map.get(intent, FALLBACK_ANSWER), "Intent"
+
+    def answer(self, intent, score, answer, source, prefix=""):
+        if source == "Intent":
+            print(f"   -> {prefix}{source}: '{intent}' ({score*100:.2f}% confidence)")
+        else:
+            print(f"   -> {prefix}{source}: '{intent}' ({score:.2f} similarity)")
+        print(f"   -> Response: {answer}")
+        
+        # Send response to TTS
+        self.tts_queue.put(answer)
+
+    def handle_final_result(self, result):
+        text = json.loads(result).get("text", "")
+        speculative_answer = self.speculative_answer
+        self.partial_text = ""
+        self.partial_since = None
+        self.speculative_answer = None
+        if not text or text.strip() == "":
+            return
+        
+        print(f"\nRecognized: '{text}'")
+        METRICS.increment('utterances')
+        intent, score, answer, source = self.respond(text)
+        if answer == speculative_answer:
+            print(f"   -> {source}: '{intent}' (already answered from the partial result)")
+            return
+        if speculative_answer is not None:
+            METRICS.increment('speculative_corrections')
+        self.answer(intent, score, answer, source, prefix="Corrected " if speculative_answer else "")
+
+    def handle_partial_result(self, now):
+        """Answers early once the partial transcript has been stable and the answer is confident."""
+        text = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        if text != self.partial_text:
+            self.partial_text = text
+            self.partial_since = now
+            return
+        if (self.speculative_answer is not None or len(text.split()) < PARTIAL_MIN_WORDS
+                or now - self.partial_since < PARTIAL_STABLE_SEC):
+            return
+        intent, score, answer, source = self.respond(text)
+        if source == "FAQ fallback":
+            return  # The intent is unsure, wait for the final result
+        min_score = FAQ_FAST_PATH_SIMILARITY if source == "FAQ match" else SPECULATIVE_MIN_CONFIDENCE
+        if score >= min_score:
+            self.speculative_answer = answer
+            METRICS.increment('speculative_answers')
+            print(f"\nRecognized (partial): '{text}'")
+            self.answer(intent, score, answer, source, prefix="Speculative ")
+
+    def process_audio(self, data):
+        """Feeds one microphone block (through the VAD, if enabled) to Vosk."""
+        if self.vad is None:
+            blocks, segment_ended = [data], False
+        else:
+            blocks, segment_ended = self.vad.process(data)
+            METRICS.increment('vad_blocks_voiced' if blocks else 'vad_blocks_skipped')
+        
+        for block in blocks:
+            with METRICS.span('vosk_accept_waveform'):
+                accepted = self.recognizer.AcceptWaveform(block)
+            if accepted:
+                self.handle_final_result(self.recognizer.Result())
+            elif self.speculative:
+                self.handle_partial_result(time.perf_counter())
+        
+        # End of speech: flush whatever Vosk has not finalized yet (empty if it already did)
+        if segment_ended:
+            self.handle_final_result(self.recognizer.FinalResult())
+
+    def start_listening(self):
+        pin_current_thread('intent')
+        print("\n🎤 Assistant is now listening...")
+        self.tts_queue.put(ASSISTANT_GREETING)
+        
+        with sd.RawInputStream(samplerate=AUDIO_SAMPLE_RATE, blocksize=self.block_size, dtype='int16',
+                               channels=1, callback=self.audio_callback):
+            while not self.stopped.is_set():
+                try:
+                    data = self.audio_queue.get(timeout=1.0)
+                    METRICS.set_gauge('audio_queue_depth', self.audio_queue.qsize())
+                    self.process_audio(data)
+                except queue.Empty:
+                    pass
+                    
+    def stop(self):
+        self.stopped.set()
+
+# --- Event Log ---
+class EventLog:
+    """Appends session events to a JSONL file (one JSON object per line)."""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, event, **context):
+        self.file.write(json.dumps({**context, **event}) + "\n")
+        self.file.flush()
+
+    def bind(self, **context):
+        """Returns an event sink that tags every event with `context` (e.g. the video path)."""
+        return lambda event: self.write(event, **context)
+
+    def close(self):
+        self.file.close()
+
+# --- Inference Recorder ---
+RECORDING_FRAME_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('model', 'u1'),  # Index into the recording's model list ('action' for MoViNet frames)
+    ('num_detections', '<u2'),
+    ('action_class', 'i1'),  # Smoothed MoViNet class, -1 when no prediction was ready
+    ('confidence', '<f4')
+])
+RECORDING_DETECTION_DTYPE = np.dtype([
+    ('class_id', '<u2'),
+    ('confidence', '<f4'),
+    ('box', '<i2', (4,))  # x1, y1, x2, y2
+])
+RECORDING_PROBABILITY_DTYPE = np.dtype('<f2')
+RECORDING_MODEL_STATES = {
+    'flat_tire': STATE_DETECTING_FLAT_TIRE,
+    'tools': STATE_COLLECTING_TOOLS,
+    'action': STATE_ACTION_RECOGNITION
+}
+
+class InferenceRecorder:
+    """Writes per-frame model outputs as fixed-dtype column files plus an index.
+
+    `frames.bin` holds one RECORDING_FRAME_DTYPE row per processed frame,
+    `detections.bin` the YOLO boxes of all frames back to back and
+    `probabilities.bin` one float16 MoViNet probability vector per action
+    prediction. `index.json` keeps the class names of every model and the
+    row counts. Files are append-only, so a recording cut short stays
+    readable with InferenceRecording.
+    """
+    def __init__(self, directory, **metadata):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.metadata = metadata
+        self.models = []  # Model names, indexed by the `model` column
+        self.labels = {}  # Model name -> class names
+        self.counts = {'frames': 0, 'detections': 0, 'probabilities': 0}
+        self.frames_file = open(os.path.join(directory, 'frames.bin'), 'wb')
+        self.detections_file = open(os.path.join(directory, 'detections.bin'), 'wb')
+        self.probabilities_file = open(os.path.join(directory, 'probabilities.bin'), 'wb')
+        self.write_index()
+
+    def write_index(self):
+        with open(os.path.join(self.directory, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': 1,
+                'metadata': self.metadata,
+                'detection_floor': DETECTION_CONFIDENCE_FLOOR,
+                'models': self.models,
+                'labels': self.labels,
+                'counts': self.counts
+            }, f, indent=2)
+
+    def model_index(self, name, class_names):
+        if name not in self.labels:
+            self.models.append(name)
+            self.labels[name] = list(class_names)
+            self.write_index()
+        return self.models.index(name)
+
+    def write_frame(self, timestamp, model, num_detections=0, action_class=-1, confidence=0.0):
+        row = np.array((timestamp, model, num_detections, action_class, confidence), dtype=RECORDING_FRAME_DTYPE)
+        self.frames_file.write(row.tobytes())
+        self.counts['frames'] += 1
+
+    def write_detections(self, timestamp, model_name, labels, detections):
+        """Records the (class_ids, confidences, xyxy) detections of one YOLO frame."""
+        class_ids, confidences, xyxy = detections
+        model = self.model_index(model_name, [labels[i] for i in sorted(labels)])
+        rows = np.empty(len(class_ids), dtype=RECORDING_DETECTION_DTYPE)
+        rows['class_id'] = class_ids
+        rows['confidence'] = confidences
+        rows['box'] = xyxy
+        self.detections_file.write(rows.tobytes())
+        self.counts['detections'] += len(rows)
+        self.write_frame(timestamp, model, num_detections=len(rows))
+
+    def write_action(self, timestamp, class_names, prediction):
+        """Records one MoViNet prediction (None if none was ready for this frame)."""
+        model = self.model_index('action', class_names)
+        if not prediction:
+            self.write_frame(timestamp, model)
+            return
+        probabilities = np.asarray(prediction.get('all_probabilities', np.full(len(class_names), np.nan)),
+                                   dtype=RECORDING_PROBABILITY_DTYPE)
+        self.probabilities_file.write(probabilities.tobytes())
+        self.counts['probabilities'] += 1
+        self.write_frame(timestamp, model, action_class=class_names.index(prediction['smoothed_prediction']),
+                         confidence=prediction['confidence'])
+
+    def close(self):
+        for f in (self.frames_file, self.detections_file, self.probabilities_file):
+            f.close()
+        self.write_index()
+
+class InferenceRecording:
+    """Reads a recording written by InferenceRecorder through memory maps (zero-copy).
+
+    `frames`, `detections` and `probabilities` are NumPy views of the column
+    files; `observations()` turns them back into the observations the state
+    machine consumes, so recordings can be replayed like observation logs.
+    """
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'index.json'), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.directory = directory
+        self.metadata = index['metadata']
+        self.detection_floor = index.get('detection_floor')  # Missing in older recordings
+        self.models = index['models']
+        self.labels = index['labels']
+        frames = self.map('frames.bin', RECORDING_FRAME_DTYPE)
+        self.detections = self.map('detections.bin', RECORDING_DETECTION_DTYPE)
+        num_classes = len(self.labels.get('action', []))
+        probabilities = self.map('probabilities.bin', RECORDING_PROBABILITY_DTYPE)
+        if num_classes:
+            self.probabilities = probabilities[:len(probabilities) // num_classes * num_classes].reshape(-1, num_classes)
+        else:
+            self.probabilities = probabilities.reshape(0, 0)
+        
+        # Row offsets of every frame into the detection and probability columns
+        self.detection_offsets = np.concatenate(([0], np.cumsum(frames['num_detections'], dtype=np.int64)))
+        self.probability_rows = np.cumsum(frames['action_class'] >= 0) - 1
+        # Drop trailing frames whose detections or probabilities never reached the disk
+        complete = ((self.detection_offsets[1:] <= len(self.detections)) &
+                    (self.probability_rows < len(self.probabilities)))
+        self.frames = frames[:len(frames) if complete.all() else int(np.argmin(complete))]
+
+    def map(self, name, dtype):
+        path = os.path.join(self.directory, name)
+        count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        if count == 0:
+            return np.empty(0, dtype=dtype)  # np.memmap cannot map empty files
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def timestamps(self):
+        return self.frames['timestamp']
+
+    def frame_detections(self, i):
+        """Returns the detection rows of frame `i` (a view into detections.bin)."""
+        return self.detections[self.detection_offsets[i]:self.detection_offsets[i + 1]]
+
+    def frame_probabilities(self, i):
+        """Returns the MoViNet probability vector of frame `i`, or None if it had no prediction."""
+        if self.frames['action_class'][i] < 0:
+            return None
+        return self.probabilities[self.probability_rows[i]]
+
+    def observations(self):
+        """Yields the frames as state machine observations (see `replay_session`)."""
+        class_ids = self.detections['class_id'].tolist()
+        confidences = self.detections['confidence'].tolist()
+        offsets = self.detection_offsets.tolist()
+        action_names = self.labels.get('action', [])
+        for i, (timestamp, model, _, action_class, confidence) in enumerate(self.frames.tolist()):
+            model_name = self.models[model]
+            observation = {'timestamp': timestamp, 'state': RECORDING_MODEL_STATES.get(model_name)}
+            if model_name == 'action':
+                observation['kind'] = 'action'
+                observation['prediction'] = None if action_class < 0 else {
+                    'smoothed_prediction': action_names[action_class],
+                    'confidence': confidence
+                }
+            else:
+                labels = self.labels[model_name]
+                observation['kind'] = 'detections'
+                observation['detection_floor'] = self.detection_floor
+                observation['detections'] = [(labels[class_id], conf) for class_id, conf in
+                                             zip(class_ids[offsets[i]:offsets[i + 1]],
+                                                 confidences[offsets[i]:offsets[i + 1]])]
+            yield observation
+
+def find_recordings(path):
+    """Returns the recording directories (those with an index.json) under `path`, sorted."""
+    if os.path.exists(os.path.join(path, 'index.json')):
+        return [path]
+    return sorted(str(index.parent) for index in Path(path).rglob('index.json'))
+
+# --- Banners ---
+BANNER_ANNOUNCE_TTS = False  # Also speak confirmation banners through the TTS queue
+
+class BannerScheduler:
+    """Shows timed confirmation messages across frames without pausing the pipeline.
+
+    A banner stays on screen until its expiry time (in the session's clock)
+    while capture and inference keep running. A new banner at the same
+    position replaces the old one. With `announce` set, banners are also
+    queued for text-to-speech.
+    """
+    def __init__(self, tts_queue=None, announce=False):
+        self.tts_queue = tts_queue
+        self.announce = announce
+        self.banners = []
+
+    def show(self, now, message, duration_sec, y_offset, **style):
+        self.banners = [banner for banner in self.banners if banner['y_offset'] != y_offset]
+        self.banners.append({
+            'message': message,
+            'y_offset': y_offset,
+            'style': style,
+            'expires_at': now + duration_sec
+        })
+        if self.announce and self.tts_queue is not None:
+            self.tts_queue.put(message.replace('_', ' '))
+
+    def draw(self, frame, now):
+        self.banners = [banner for banner in self.banners if banner['expires_at'] > now]
+        for banner in self.banners:
+            display_message(frame, banner['message'], banner['y_offset'], **banner['style'])
+
+# --- Tire Change State Machine ---
+ACTION_CONFIDENCE_DROP_RESET = 0.05  # Confidence drop for the current step that resets MoViNet states
+
+STATE_MACHINE_DEFAULTS = {
+    'VALIDATION_DURATION_SEC': VALIDATION_DURATION_SEC,
+    'GRACE_PERIOD_DURATION_SEC': GRACE_PERIOD_DURATION_SEC,
+    'TOOLS_CONFIDENCE_THRESHOLD': TOOLS_CONFIDENCE_THRESHOLD,
+    'ACTION_VALIDATION_FRAMES': ACTION_VALIDATION_FRAMES,
+    'ACTION_CONFIDENCE_THRESHOLD': ACTION_CONFIDENCE_THRESHOLD,
+    'ACTION_CONFIDENCE_DROP_RESET': ACTION_CONFIDENCE_DROP_RESET,
+    'ACTION_STATE_ROLLBACK': ACTION_STATE_ROLLBACK
+}
+
+class TireChangeStateMachine:
+    """Model-free tire change logic: flat tire -> tools -> action steps.
+
+    The machine only sees observations (the class names and confidences YOLO
+    found, or the newest MoViNet prediction) together with the timestamp
+    they were captured at, so it runs the same live (fed by TireChangeSession)
+    and in replay, where recorded observations are fed far faster than real
+    time. Thresholds are read from `config`, whose keys are those of
+    STATE_MACHINE_DEFAULTS.
+
+    After every observation, `messages` holds the status lines to draw,
+    `banners` the confirmations raised by it and `reset_requested` tells
+    whether the MoViNet streaming states should be reset. After a confidence
+    dip with ACTION_STATE_ROLLBACK, `rollback_state_id` names the last
+    confidently correct state to restore instead (None: reset from scratch).
+    """
+    def __init__(self, config=None, event_sink=None, verbose=True):
+        unknown = set(config or {}) - set(STATE_MACHINE_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown state machine parameter(s): {', '.join(sorted(unknown))}")
+        self.config = {**STATE_MACHINE_DEFAULTS, **(config or {})}
+        self.event_sink = event_sink
+        self.verbose = verbose
+        self.state = STATE_DETECTING_FLAT_TIRE
+        self.completed = False
+
+        # Flat tire detection
+        self.flat_tire_validation_start_time = None
+        self.flat_tire_lost_temporarily_time = None
+
+        # Tool collection (with simultaneous validation)
+        self.confirmed_tools = set()
+        self.tool_validation_timers = {tool: None for tool in REQUIRED_TOOLS_CLASSES}
+        self.tool_lost_timers = {tool: None for tool in REQUIRED_TOOLS_CLASSES}
+
+        # Action recognition
+        self.current_action_step = 0
+        self.action_validation_count = 0
+        self.last_prediction_confidence = 0.0
+        self.last_good_state_id = None  # MoViNet state of the last prediction that counted for the step
+
+        # Feedback of the last observation
+        self.messages = []
+        self.banners = []
+        self.reset_requested = False
+        self.rollback_state_id = None
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    def emit(self, timestamp, event, **fields):
+        if self.event_sink is not None:
+            self.event_sink({'timestamp': round(float(timestamp), 3), 'event': event, **fields})
+
+    def transition(self, timestamp, new_state):
+        self.emit(timestamp, 'state_transition', from_state=self.state, to_state=new_state)
+        self.state = new_state
+        self.log(f"INFO: Transitioned to {new_state} state")
+
+    def message(self, text, y_offset, **style):
+        self.messages.append((text, y_offset, style))
+
+    def banner(self, text, duration_sec, y_offset, **style):
+        self.banners.append((text, duration_sec, y_offset, style))
+
+    def begin_observation(self):
+        self.messages = []
+        self.banners = []
+        self.reset_requested = False
+        self.rollback_state_id = None
+
+    def observe_detections(self, now, detections):
+        """Advances the detection states with the (class_name, confidence) pairs found at `now`."""
+        self.begin_observation()
+        threshold = self.config['TOOLS_CONFIDENCE_THRESHOLD']
+        detected_names = {name for name, conf in detections if conf >= threshold}
+        if self.state == STATE_DETECTING_FLAT_TIRE:
+            self.update_flat_tire(now, FLAT_TIRE_CLASS_NAME in detected_names)
+        elif self.state == STATE_COLLECTING_TOOLS:
+            self.update_tools(now, detected_names)
+
+    def observe_action(self, now, prediction):
+        """Advances the action steps with the MoViNet prediction dict (None if none was ready)."""
+        self.begin_observation()
+        if self.state == STATE_ACTION_RECOGNITION and not self.completed:
+            self.update_action(now, prediction)
+
+    # --- STATE: DETECTING_FLAT_TIRE ---
+    def update_flat_tire(self, now, found_flat_tire):
+        validation_duration = self.config['VALIDATION_DURATION_SEC']
+        grace_period = self.config['GRACE_PERIOD_DURATION_SEC']
+        self.message("STEP 1: Find the Flat Tire", Y_OFFSET_STEP_TITLE, color=(200, 200, 200))
+
+        if found_flat_tire:
+            # Reset lost timer if re-acquired
+            if self.flat_tire_lost_temporarily_time is not None:
+                self.flat_tire_lost_temporarily_time = None
+
+            # Start validation timer if not already running
+            if self.flat_tire_validation_start_time is None:
+                self.flat_tire_validation_start_time = now
+
+            # Check validation duration
+            elapsed = now - self.flat_tire_validation_start_time
+            if elapsed >= validation_duration:
+                self.banner("Flat Tire Confirmed!", 1.5, Y_OFFSET_CONFIRMATION_MSG, color=(0, 255, 0))
+
+                # Transition to next state
+                self.transition(now, STATE_COLLECTING_TOOLS)
+                self.confirmed_tools.clear()
+
+                # Reset tool timers
+                for tool in REQUIRED_TOOLS_CLASSES:
+                    self.tool_validation_timers[tool] = None
+                    self.tool_lost_timers[tool] = None
+            else:
+                self.message(f"Confirming Flat Tire... {validation_duration - elapsed:.1f}s",
+                             Y_OFFSET_STATUS_VALIDATION, color=(0, 255, 255))
+        else:
+            # Handle temporary loss
+            if self.flat_tire_validation_start_time is not None:
+                if self.flat_tire_lost_temporarily_time is None:
+                    self.flat_tire_lost_temporarily_time = now
+
+                time_since_lost = now - self.flat_tire_lost_temporarily_time
+                if time_since_lost < grace_period:
+                    self.message(f"Searching... {grace_period - time_since_lost:.1f}s",
+                                 Y_OFFSET_STATUS_VALIDATION, color=(255, 200, 0))
+                else:
+                    self.flat_tire_validation_start_time = None
+                    self.flat_tire_lost_temporarily_time = None
+                    self.message("Point camera at the tire", Y_OFFSET_MAIN_INSTRUCTION)
+            else:
+                self.message("Point camera at the tire", Y_OFFSET_MAIN_INSTRUCTION)
+
+    # --- STATE: COLLECTING_TOOLS (SIMULTANEOUS VALIDATION) ---
+    def update_tools(self, now, detected_tools_in_frame_names):
+        validation_duration = self.config['VALIDATION_DURATION_SEC']
+        grace_period = self.config['GRACE_PERIOD_DURATION_SEC']
+        self.message("STEP 2: Collect Required Tools", Y_OFFSET_STEP_TITLE, color=(200, 200, 200))
+
+        # Check if all tools are collected
+        if self.confirmed_tools == REQUIRED_TOOLS_CLASSES:
+            self.transition(now, STATE_ACTION_RECOGNITION)
+            return
+
+        # Simultaneous validation for all tools
+        status_messages = []
+        for tool in REQUIRED_TOOLS_CLASSES:
+            if tool in self.confirmed_tools:
+                continue  # Skip already confirmed tools
+
+            if tool in detected_tools_in_frame_names:
+                # Tool detected in this frame
+                if self.tool_validation_timers[tool] is None:
+                    # Start validation timer
+                    self.tool_validation_timers[tool] = now
+                    self.tool_lost_timers[tool] = None
+                    status_messages.append(f"Found {tool}, validating...")
+                else:
+                    # Continue validation
+                    elapsed = now - self.tool_validation_timers[tool]
+                    if elapsed >= validation_duration:
+                        # Tool confirmed
+                        self.confirmed_tools.add(tool)
+                        self.tool_validation_timers[tool] = None
+                        self.emit(now, 'tool_confirmed', tool=tool)
+                        self.banner(f"{tool} Confirmed!", 1.0, Y_OFFSET_CONFIRMATION_MSG, color=(0, 255, 0))
+                    else:
+                        status_messages.append(f"Validating {tool}: {validation_duration - elapsed:.1f}s")
+            else:
+                # Tool not detected
+                if self.tool_validation_timers[tool] is not None:
+                    if self.tool_lost_timers[tool] is None:
+                        # Start lost timer
+                        self.tool_lost_timers[tool] = now
+                    else:
+                        # Check grace period
+                        time_since_lost = now - self.tool_lost_timers[tool]
+                        if time_since_lost >= grace_period:
+                            # Tool lost, reset validation
+                            self.tool_validation_timers[tool] = None
+                            self.tool_lost_timers[tool] = None
+                            status_messages.append(f"{tool} validation reset")
+                        else:
+                            status_messages.append(f"Searching {tool}: {grace_period - time_since_lost:.1f}s")
+
+        # Display status messages
+        if status_messages:
+            self.message(" | ".join(status_messages), Y_OFFSET_STATUS_VALIDATION, color=(0, 255, 255))
+
+        # Display collected and needed tools
+        still_needed_tools = REQUIRED_TOOLS_CLASSES - self.confirmed_tools
+        if self.confirmed_tools:
+            self.message(f"Collected: {', '.join(sorted(list(self.confirmed_tools)))}",
+                         Y_OFFSET_COLLECTED_LIST, color=(100, 200, 100))
+
+        if still_needed_tools:
+            self.message(f"Needed: {', '.join(sorted(list(still_needed_tools)))}",
+                         Y_OFFSET_NEEDED_LIST, color=(255, 180, 0))
+
+    # --- STATE: ACTION_RECOGNITION ---
+    def update_action(self, now, prediction):
+        validation_frames = self.config['ACTION_VALIDATION_FRAMES']
+        rollback = self.config['ACTION_STATE_ROLLBACK']
+
+        # Display current step
+        current_step_name = ACTION_STEPS[self.current_action_step]
+        step_title = f"STEP {self.current_action_step+3}: {current_step_name}"
+        self.message(step_title, Y_OFFSET_STEP_TITLE, color=(200, 200, 255))
+
+        # Process prediction
+        if prediction:
+            current_confidence = prediction['confidence']
+            current_action = prediction['smoothed_prediction']
+
+            # Check for a significant confidence drop for the current action
+            confidence_drop = self.last_prediction_confidence - current_confidence
+            confidence_dipped = (confidence_drop >= self.config['ACTION_CONFIDENCE_DROP_RESET'] and
+                                 current_action == current_step_name)
+
+            # Track confidence for next frame
+            self.last_prediction_confidence = current_confidence
+
+            # Display prediction info
+            pred_text = f"Action: {current_action} ({current_confidence:.2f})"
+            self.message(pred_text, Y_OFFSET_MAIN_INSTRUCTION,
+                         color=(255, 255, 0) if current_action == current_step_name else (255, 100, 100))
+
+            # Validate current step
+            if (current_action == current_step_name and
+                    current_confidence >= self.config['ACTION_CONFIDENCE_THRESHOLD']):
+                self.action_validation_count += 1
+                state_id = prediction.get('state_id')
+                if confidence_dipped and rollback and state_id is not None:
+                    # Still confident after the dip: the current state is good, nothing to undo
+                    confidence_dipped = False
+                self.last_good_state_id = state_id
+
+                # Check if step is completed
+                if self.action_validation_count >= validation_frames:
+                    self.emit(now, 'step_completed', step=current_step_name,
+                              step_index=self.current_action_step)
+                    self.banner("Step Completed!", 1.5, Y_OFFSET_CONFIRMATION_MSG, color=(0, 255, 0))
+
+                    # Move to next step
+                    self.current_action_step += 1
+                    self.action_validation_count = 0
+
+                    # Check if all steps are completed
+                    if self.current_action_step >= len(ACTION_STEPS):
+                        self.banner("ALL STEPS COMPLETED!", 3.0, Y_OFFSET_CONFIRMATION_MSG,
+                                    color=(0, 255, 0), font_scale=1.0)
+                        self.emit(now, 'session_completed')
+                        self.completed = True
+                        return
+
+                    # Reset states for new action
+                    self.reset_requested = True
+                    self.last_prediction_confidence = 0.0
+                    self.last_good_state_id = None
+                    self.log(f"Starting action validation for: {ACTION_STEPS[self.current_action_step]}")
+                    confidence_dipped = False
+            else:
+                self.action_validation_count = max(0, self.action_validation_count - 1)
+
+            if confidence_dipped:
+                self.reset_requested = True
+                self.rollback_state_id = self.last_good_state_id if rollback else None
+                if self.rollback_state_id is None:
+                    self.log(f"Reset MoViNet: Confidence dropped by {confidence_drop:.2f} for {current_action}")
+                else:
+                    self.log(f"Roll back MoViNet to state #{self.rollback_state_id}: "
+                             f"Confidence dropped by {confidence_drop:.2f} for {current_action}")
+
+        # Display validation progress
+        progress_text = f"Validation: {self.action_validation_count}/{validation_frames}"
+        self.message(progress_text, Y_OFFSET_ACTION_PROGRESS,
+                     color=(0, 255, 255) if self.action_validation_count > 0 else (255, 165, 0))
+
+# --- Tire Change Session ---
+class TireChangeSession:
+    """Runs the models for one tire change and feeds their outputs to a TireChangeStateMachine.
+
+    Time is taken from the `timestamp` passed to `process_frame`, so the same
+    logic runs on wall-clock capture times in the interactive app and on video
+    timestamps in headless mode. Confirmations are timed banners that stay on
+    screen while processing continues (optionally spoken through `tts_queue`).
+    With `display=False` no overlays are drawn; with `async_action=False` MoViNet runs inline on
+    every frame instead of in a worker (`action_worker`: 'thread', or 'process'
+    for a separate process started with the session so its model loads while
+    the earlier steps run). State transitions and step
+    completions are passed to `event_sink` as dicts. Sessions sharing one
+    MoViNet model (multi-camera serving) use `fork_action_recognizer=True` so
+    each keeps its own streaming state. With `adaptive_detection=True` YOLO
+    only runs on keyframes and boxes are tracked in between (KeyframeTracker);
+    the validation timers see a detection on every frame either way.
+    Every observation fed to the state machine is also passed to
+    `observation_sink`, so the session can be replayed later (`--replay`)
+    with other thresholds in `config`. A `recorder` (InferenceRecorder)
+    additionally keeps the raw boxes and MoViNet probabilities. With
+    `action_fps` MoViNet is fed at that rate of capture time, independent of
+    the machine load (ActionFrameScheduler).
+    """
+    def __init__(self, model_registry, torch_device, display=True, async_action=True, event_sink=None,
+                 fork_action_recognizer=False, tts_queue=None, announce_banners=BANNER_ANNOUNCE_TTS,
+                 adaptive_detection=ADAPTIVE_DETECTION, config=None, observation_sink=None, recorder=None,
+                 action_worker=ACTION_WORKER, action_fps=ACTION_TARGET_FPS):
+        self.model_registry = model_registry
+        self.torch_device = torch_device
+        self.display = display
+        self.async_action = async_action
+        self.fork_action_recognizer = fork_action_recognizer
+        self.observation_sink = observation_sink
+        self.recorder = recorder
+        self.machine = TireChangeStateMachine(config, event_sink)
+        self.started = False
+        self.completed = False  # All steps done; `finished` follows once the final banner expired
+        self.finished = False
+        self.finish_time = None
+        self.banners = BannerScheduler(tts_queue, announce_banners)
+        self.tracker = KeyframeTracker() if adaptive_detection else None
+
+        # Action recognition
+        self.action_started = False
+        self.action_error = None  # Why action recognition is unavailable (shown instead of the steps)
+        self.action_recognizer = None  # Inline recognizer ('thread' worker and synchronous mode)
+        self.action_worker = None
+        self.action_scheduler = ActionFrameScheduler(action_fps) if action_fps else None
+        if async_action and action_worker == 'process':
+            self.action_worker = ActionProcessWorker(ACTION_WEIGHTS_PATH, ACTION_CONFIG_PATH,
+                                                     return_probabilities=recorder is not None)
+
+        # Initial model (flat tire detection)
+        self.select_model('flat_tire', {FLAT_TIRE_CLASS_NAME})
+        print(f"INFO: Initial state: {self.state}")
+
+    @property
+    def state(self):
+        return self.machine.state
+
+    @property
+    def current_action_step(self):
+        return self.machine.current_action_step
+
+    def select_model(self, name, class_names):
+        self.model_name = name
+        self.model = self.model_registry.get(name)
+        self.labels = self.model.names
+        self.target_class_ids = class_ids_for_names(self.labels, class_names)
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def emit(self, timestamp, event, **fields):
+        self.machine.emit(timestamp, event, **fields)
+
+    def record(self, timestamp, kind, **fields):
+        if self.observation_sink is not None:
+            self.observation_sink({'timestamp': float(timestamp), 'state': self.state, 'kind': kind, **fields})
+
+    def show_message(self, frame, message, y_offset, **style):
+        if self.display:
+            with METRICS.span('overlay'):
+                display_message(frame, message, y_offset, **style)
+
+    def show_banner(self, now, message, duration_sec, y_offset, **style):
+        self.banners.show(now, message, duration_sec, y_offset, **style)
+
+    def apply_feedback(self, frame, now):
+        """Draws the state machine's status lines and banners and applies its MoViNet resets."""
+        for message, y_offset, style in self.machine.messages:
+            self.show_message(frame, message, y_offset, **style)
+        for message, duration_sec, y_offset, style in self.machine.banners:
+            self.show_banner(now, message, duration_sec, y_offset, **style)
+        if self.machine.reset_requested:
+            self.reset_action_states(self.machine.rollback_state_id)
+
+    def needs_detection(self):
+        """True if the next frame has to go through YOLO (always, unless boxes can be tracked)."""
+        return self.tracker is None or self.tracker.needs_keyframe()
+
+    def detect(self, frame):
+        if not self.needs_detection():
+            return self.tracker.propagate(frame)
+        with METRICS.span(f'yolo_{self.model_name}'):
+            results = self.model(frame, verbose=False, conf=DETECTION_CONFIDENCE_FLOOR, device=self.torch_device)
+            return self.register_keyframe(frame, self.filter_results(results))
+
+    def register_keyframe(self, frame, detections):
+        """Hands fresh YOLO detections to the tracker (if any) and returns them."""
+        if self.tracker is not None:
+            self.tracker.keyframe(frame, detections)
+        return detections
+
+    def filter_results(self, results):
+        """Keeps the detections of the classes the current state is looking for."""
+        return filter_detections(extract_detections(results), self.target_class_ids)
+
+    def process_frame(self, frame, timestamp, detections=None):
+        """Advances the state machine by one frame captured at `timestamp` (seconds).
+
+        `detections` can be passed when YOLO was already run by the caller (batched serving).
+        """
+        if not self.started:
+            self.started = True
+            self.emit(timestamp, 'session_started', state=self.state)
+
+        if self.completed:
+            if timestamp >= self.finish_time:
+                self.finished = True
+        elif self.state in (STATE_DETECTING_FLAT_TIRE, STATE_COLLECTING_TOOLS):
+            self.update_detection(frame, timestamp, detections if detections is not None else self.detect(frame))
+        elif self.state == STATE_ACTION_RECOGNITION:
+            self.update_action(frame, timestamp)
+
+        if self.display:
+            self.banners.draw(frame, timestamp)
+
+    # --- STATES: DETECTING_FLAT_TIRE / COLLECTING_TOOLS ---
+    def update_detection(self, frame, now, detections):
+        class_ids, confidences, _ = detections
+        observation = [(self.labels[classidx], conf)
+                       for classidx, conf in zip(class_ids.tolist(), confidences.tolist())]
+        self.record(now, 'detections', detections=observation, detection_floor=DETECTION_CONFIDENCE_FLOOR)
+        if self.recorder is not None:
+            self.recorder.write_detections(now, self.model_name, self.labels, detections)
+
+        previous_state = self.state
+        self.machine.observe_detections(now, observation)
+        if self.display:
+            self.draw_detections(frame, detections, previous_state)
+        self.apply_feedback(frame, now)
+
+        if previous_state == STATE_DETECTING_FLAT_TIRE and self.state == STATE_COLLECTING_TOOLS:
+            self.select_model('tools', REQUIRED_TOOLS_CLASSES)
+
+    def draw_detections(self, frame, detections, state):
+        class_ids, confidences, boxes = detections
+        if state == STATE_DETECTING_FLAT_TIRE:
+            if len(confidences) > 0:
+                # Draw bounding box of the first (highest confidence) flat tire
+                conf = confidences[0]
+                xyxy = boxes[0]
+                cv2.rectangle(frame, (xyxy[0], xyxy[1]),
+                             (xyxy[2], xyxy[3]), (0, 255, 0), 2)
+                cv2.putText(frame, f'{FLAT_TIRE_CLASS_NAME}: {conf:.2f}',
+                           (xyxy[0], xyxy[1] - 10),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            return
+
+        for classidx, conf, xyxy in zip(class_ids.tolist(), confidences.tolist(), boxes):
+            classname = self.labels[classidx]
+
+            # Draw bounding box
+            color_idx = classidx % 5
+            color = (31, 119, 180) if color_idx == 0 else \
+                    (255, 127, 14) if color_idx == 1 else \
+                    (44, 160, 44) if color_idx == 2 else \
+                    (214, 39, 40) if color_idx == 3 else \
+                    (148, 103, 189)
+            cv2.rectangle(frame, (xyxy[0], xyxy[1]), (xyxy[2], xyxy[3]), color, 2)
+            cv2.putText(frame, f'{classname}:{conf:.2f}', (xyxy[0], xyxy[1] - 10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+    # --- STATE: ACTION_RECOGNITION ---
+    def start_action_recognition(self):
+        print("INFO: Initializing action recognition system")
+        self.action_started = True
+        if self.action_scheduler is not None:
+            self.action_scheduler.reset()
+        if self.action_worker is None:  # The process worker was started with the session
+            self.action_recognizer = self.model_registry.get('action')
+            if self.fork_action_recognizer:
+                self.action_recognizer = self.action_recognizer.fork()
+            self.action_recognizer.reset_states()
+            if self.async_action:
+                self.action_worker = ActionThreadWorker(self.action_recognizer,
+                                                        return_probabilities=self.recorder is not None)
+        
+        print(f"Starting action validation for: {ACTION_STEPS[self.current_action_step]}")
+
+    def fail_action_recognition(self, now, error):
+        """Keeps the session running (and the error on screen) when MoViNet is not available."""
+        self.action_error = error
+        print(f"❌ Action recognition unavailable: {error}")
+        self.emit(now, 'action_unavailable', error=error)
+
+    @property
+    def action_class_names(self):
+        return self.action_worker.class_names if self.action_worker else self.action_recognizer.class_names
+
+    def reset_action_states(self, state_id=None):
+        """Resets the MoViNet states, or rolls them back to `state_id` if one is given."""
+        if self.action_worker is not None:
+            if state_id is not None:
+                self.action_worker.rollback(state_id)
+            else:
+                self.action_worker.reset()
+        elif self.action_recognizer is not None:
+            if state_id is not None:
+                self.action_recognizer.rollback(state_id)
+            else:
+                self.action_recognizer.reset_states()
+
+    def next_action_prediction(self, frame, now):
+        """Returns the newest MoViNet prediction, or None if none is ready yet."""
+        owed = self.action_scheduler.due(now) if self.action_scheduler is not None else 1
+        if not self.async_action:
+            prediction = None
+            if owed:
+                with METRICS.span('format_frame'):
+                    formatted_frame = self.action_recognizer.format_frame(frame)
+                for _ in range(owed):
+                    with METRICS.span('movinet_predict'):
+                        prediction = self.action_recognizer.predict_frame(formatted_frame, self.recorder is not None)
+            if self.action_scheduler is not None:
+                self.action_scheduler.feed(now, owed)
+            return prediction
+        
+        # Format and submit the frame once, to be run as often as it is owed, if the worker can take it
+        METRICS.set_gauge('movinet_input_queue_depth', self.action_worker.pending())
+        submitted = 0
+        if owed and self.action_worker.can_submit() and self.action_worker.submit(frame, owed):
+            submitted = owed
+        if submitted:
+            METRICS.increment('movinet_frames_submitted', submitted)
+        elif owed:
+            METRICS.increment('movinet_frames_skipped')
+        if self.action_scheduler is not None:
+            self.action_scheduler.feed(now, submitted)
+        
+        # Get latest prediction
+        return self.action_worker.poll()
+
+    def update_action(self, frame, now):
+        # Initialize action recognition on first entry
+        if not self.action_started:
+            try:
+                self.start_action_recognition()
+            except RuntimeError as e:  # MoViNet failed to load in the background
+                self.fail_action_recognition(now, str(e))
+        if self.action_error is None and getattr(self.action_worker, 'failed', False):
+            self.fail_action_recognition(now, "MoViNet worker process failed")
+        if self.action_error is not None:
+            self.show_message(frame, "Action recognition unavailable - see console",
+                              Y_OFFSET_MAIN_INSTRUCTION, color=(0, 0, 255))
+            return
+        
+        prediction = self.next_action_prediction(frame, now)
+        if self.recorder is not None:
+            self.recorder.write_action(now, self.action_class_names, prediction)
+        if prediction:
+            prediction = {'smoothed_prediction': prediction['smoothed_prediction'],
+                          'confidence': float(prediction['confidence']),
+                          'state_id': prediction.get('state_id')}
+        self.record(now, 'action', prediction=prediction)
+        
+        self.machine.observe_action(now, prediction)
+        self.apply_feedback(frame, now)
+        
+        if self.machine.completed:
+            self.completed = True
+            # Keep showing the final banner before finishing (headless runs finish immediately)
+            self.finish_time = now + 3.0 if self.display else now
+            self.finished = not self.display
+
+    def reset_action(self):
+        """Manually resets action recognition states ('r' key)."""
+        if self.action_started:
+            self.reset_action_states()
+            self.machine.action_validation_count = 0
+            print("Action recognition states reset")
+
+    def close(self):
+        # Stop the MoViNet worker if running
+        if self.action_worker is not None:
+            self.action_worker.close()
+
+# --- Startup Helpers ---
+def verify_devices():
+    """Prints which devices PyTorch and TensorFlow will use and returns the PyTorch device."""
+    print("--- Verifying Processing Devices ---")
+    # PyTorch GPU check
+    if torch.cuda.is_available():
+        print("✅ PyTorch: CUDA (GPU) available")
+        torch_device = "cuda"
+    else:
+        print("⚠️ PyTorch: Using CPU")
+        torch_device = "cpu"
     
-    # --- Model Paths ---
-    flat_tire_model_path = r"flatV2.pt"
-    tools_model_path = r"toolsV2.pt"
-    action_weights_path = r'Streaming\streaming_movinet_weights.h5'
-    action_config_path = r'Streaming\streaming_model_config.json'
+    # TensorFlow GPU check
+    gpus = tf.config.list_physical_devices('GPU')
+    if gpus:
+        try:
+            for gpu in gpus:
+                tf.config.experimental.set_memory_growth(gpu, True)
+            print("✅ TensorFlow: GPU available")
+        except RuntimeError as e:
+            print(f"⚠️ TensorFlow GPU config error: {e}")
+    else:
+        print("⚠️ TensorFlow: No GPU found, using CPU")
     
-    # Verify model paths
+    print("----------------------------------")
+    return torch_device
+
+def verify_model_paths():
     model_paths = [
-        flat_tire_model_path,
-        tools_model_path,
-        action_weights_path,
-        action_config_path
+        FLAT_TIRE_MODEL_PATH,
+        TOOLS_MODEL_PATH,
+        ACTION_WEIGHTS_PATH,
+        ACTION_CONFIG_PATH
     ]
     
     for path in model_paths:
         if not os.path.exists(path):
             print(f"ERROR: Model path not found: {path}")
             sys.exit(1)
+
+def build_model_registry(torch_device, load_action=True):
+    """Starts loading and warming up all models in the background.
+
+    `load_action=False` skips MoViNet when it runs in worker processes instead.
+    """
+    model_registry = ModelRegistry()
+    model_registry.register('flat_tire', lambda: load_detector('flat_tire'),
+                            lambda m: warmup_yolo(m, torch_device))
+    model_registry.register('tools', lambda: load_detector('tools'),
+                            lambda m: warmup_yolo(m, torch_device))
+    if load_action:
+        model_registry.register('action', lambda: load_action_recognizer(ACTION_WEIGHTS_PATH, ACTION_CONFIG_PATH),
+                                warmup_action_recognizer)
+    return model_registry.start()
+
+def start_models(load_action=True):
+    """Checks the devices and starts the model registry; returns (torch_device, model_registry)."""
+    torch_device = verify_devices()
+    return torch_device, build_model_registry(torch_device, load_action)
+
+def main_orchestrator(announce_banners=BANNER_ANNOUNCE_TTS, adaptive_detection=ADAPTIVE_DETECTION,
+                      observations_path=None, record_dir=None, action_worker=ACTION_WORKER,
+                      action_fps=ACTION_TARGET_FPS):
+    """Main function to run the integrated tire change assistant."""
+    verify_model_paths()
+    
+    # --- Staged Startup ---
+    # Frameworks are preloaded in the background per stage, ahead of the stage that needs them:
+    # YOLO while the input source is chosen, TensorFlow and audio for the assistant once it is.
+    # MoViNet's modules are imported by the registry (or only in the worker process). The device
+    # check and model loading run off the main thread too, so the input source can be chosen
+    # right away and state transitions never wait on model construction.
+    preload_modules(torch, YOLO, stage='detection')
+    startup_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    startup = startup_executor.submit(start_models, action_worker != 'process')
     
     # --- Input Source Selection ---
     print("\n🎯 Choose Input Source:")
@@ -409,6 +3172,7 @@ def main_orchestrator():
     else:
         print("ERROR: Invalid choice")
         sys.exit(1)
+    preload_modules(tf, vosk, sd, pyttsx3, stage='assistant')
     
     # --- Video Capture Setup ---
     print(f"\nINFO: Opening video source: {img_source}")
@@ -424,36 +3188,15 @@ def main_orchestrator():
     actual_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     print(f"INFO: Resolution set to: {actual_width}x{actual_height}")
     
-    # --- State Machine Initialization ---
-    app_state = STATE_DETECTING_FLAT_TIRE
-    print(f"INFO: Initial state: {app_state}")
-    
-    # Load initial model (flat tire detection)
-    model = YOLO(flat_tire_model_path, task='detect')
-    labels = model.names
-    
-    # --- State Variables ---
-    # Flat tire detection
-    flat_tire_validation_start_time = None
-    flat_tire_lost_temporarily_time = None
-    
-    # Tool collection (with simultaneous validation)
-    confirmed_tools = set()
-    tool_validation_timers = {tool: None for tool in REQUIRED_TOOLS_CLASSES}
-    tool_lost_timers = {tool: None for tool in REQUIRED_TOOLS_CLASSES}
-    tool_validation_status = {tool: False for tool in REQUIRED_TOOLS_CLASSES}
-    
-    # Action recognition
-    action_recognizer = None
-    movinet_input_queue = None
-    movinet_output_queue = None
-    movinet_thread = None
-    current_action_step = 0
-    action_validation_count = 0
-    action_validation_start_time = None
-    last_prediction_time = time.time()
-    low_confidence_frames = 0
-
+    # Live sources are drained in the background so the loop always sees the newest frame;
+    # video files are still read frame by frame.
+    if choice == '2':
+        frame_reader = SequentialFrameReader(cap).start()
+    else:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        frame_reader = LatestFrameReader(cap).start()
+        print("INFO: Using latest-frame capture reader")
+    
     # --- Initialize Intent Classifier ---
     try:
         tts_thread = TTSThread()
@@ -474,290 +3217,51 @@ def main_orchestrator():
     frame_rate_buffer = deque(maxlen=30)
     avg_frame_rate = 0
     
-    # --- Main Processing Loop ---
+    model_registry = None
+    observation_log = None
+    recorder = None
+    session = None
     try:
+        # --- State Machine Initialization ---
+        torch_device, model_registry = startup.result()
+        run_id = time.strftime('%Y%m%dT%H%M%S')
+        observation_log = EventLog(observations_path) if observations_path else None
+        recorder = (InferenceRecorder(os.path.join(record_dir, run_id), run=run_id, source=str(img_source))
+                    if record_dir else None)
+        session = TireChangeSession(model_registry, torch_device,
+                                    tts_queue=tts_thread.queue if tts_thread else None,
+                                    announce_banners=announce_banners,
+                                    adaptive_detection=adaptive_detection,
+                                    observation_sink=observation_log.bind(run=run_id) if observation_log else None,
+                                    recorder=recorder, action_worker=action_worker, action_fps=action_fps)
+        
+        # --- Main Processing Loop ---
         while True:
             loop_start_time = time.perf_counter()
             
             # Read frame
-            ret, frame = cap.read()
+            with METRICS.span('capture_read'):
+                ret, frame, timestamp = frame_reader.read()
             if not ret or frame is None:
-                print('INFO: End of video stream')
-                break
+                if frame_reader.ended:
+                    print('INFO: End of video stream')
+                    break
+                # A live camera stalled (e.g. network hiccup): keep waiting, 'q' still quits
+                print(f"⚠️ No frame from the camera for {frame_reader.read_timeout:.0f}s, still waiting...")
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    print("INFO: Quitting...")
+                    break
+                continue
+            METRICS.set_gauge('capture_frames_dropped', frame_reader.frames_dropped)
                 
             # Resize if needed
             if frame.shape[1] != 640 or frame.shape[0] != 480:
                 frame = cv2.resize(frame, (640, 480))
             
-            # --- STATE: DETECTING_FLAT_TIRE ---
-            if app_state == STATE_DETECTING_FLAT_TIRE:
-                display_message(frame, "STEP 1: Find the Flat Tire", 
-                               Y_OFFSET_STEP_TITLE, color=(200, 200, 200))
-                
-                # Run detection
-                results = model(frame, verbose=False, conf=TOOLS_CONFIDENCE_THRESHOLD, device=torch_device)
-                current_detections = results[0].boxes if results and results[0].boxes else []
-                
-                found_flat_tire = False
-                for det in current_detections:
-                    class_id = int(det.cls.item())
-                    class_name = labels.get(class_id, f"ID:{class_id}")
-                    
-                    if class_name == FLAT_TIRE_CLASS_NAME:
-                        found_flat_tire = True
-                        conf = det.conf.item()
-                        xyxy = det.xyxy.cpu().numpy().squeeze().astype(int)
-                        
-                        # Draw bounding box
-                        cv2.rectangle(frame, (xyxy[0], xyxy[1]), 
-                                     (xyxy[2], xyxy[3]), (0, 255, 0), 2)
-                        cv2.putText(frame, f'{class_name}: {conf:.2f}', 
-                                   (xyxy[0], xyxy[1] - 10), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                        break
-                
-                if found_flat_tire:
-                    # Reset lost timer if re-acquired
-                    if flat_tire_lost_temporarily_time is not None:
-                        flat_tire_lost_temporarily_time = None
-                    
-                    # Start validation timer if not already running
-                    if flat_tire_validation_start_time is None:
-                        flat_tire_validation_start_time = time.time()
-                    
-                    # Check validation duration
-                    elapsed = time.time() - flat_tire_validation_start_time
-                    if elapsed >= VALIDATION_DURATION_SEC:
-                        display_message(frame, "Flat Tire Confirmed!", 
-                                       Y_OFFSET_STATUS_VALIDATION, color=(0, 255, 0))
-                        cv2.imshow('Tire Assistant', frame)
-                        cv2.waitKey(1500)
-                        
-                        # Transition to next state
-                        app_state = STATE_COLLECTING_TOOLS
-                        confirmed_tools.clear()
-                        model = YOLO(tools_model_path, task='detect')
-                        labels = model.names
-                        print("INFO: Transitioned to COLLECTING_TOOLS state")
-                        
-                        # Reset tool timers
-                        for tool in REQUIRED_TOOLS_CLASSES:
-                            tool_validation_timers[tool] = None
-                            tool_lost_timers[tool] = None
-                    else:
-                        display_message(frame, 
-                                       f"Confirming Flat Tire... {VALIDATION_DURATION_SEC - elapsed:.1f}s", 
-                                       Y_OFFSET_STATUS_VALIDATION, color=(0, 255, 255))
-                else:
-                    # Handle temporary loss
-                    if flat_tire_validation_start_time is not None:
-                        if flat_tire_lost_temporarily_time is None:
-                            flat_tire_lost_temporarily_time = time.time()
-                        
-                        time_since_lost = time.time() - flat_tire_lost_temporarily_time
-                        if time_since_lost < GRACE_PERIOD_DURATION_SEC:
-                            display_message(frame, 
-                                           f"Searching... {GRACE_PERIOD_DURATION_SEC - time_since_lost:.1f}s", 
-                                           Y_OFFSET_STATUS_VALIDATION, color=(255, 200, 0))
-                        else:
-                            flat_tire_validation_start_time = None
-                            flat_tire_lost_temporarily_time = None
-                            display_message(frame, "Point camera at the tire", 
-                                           Y_OFFSET_MAIN_INSTRUCTION)
-                    else:
-                        display_message(frame, "Point camera at the tire", 
-                                       Y_OFFSET_MAIN_INSTRUCTION)
-            
-            # --- STATE: COLLECTING_TOOLS (SIMULTANEOUS VALIDATION) ---
-            elif app_state == STATE_COLLECTING_TOOLS:
-                display_message(frame, "STEP 2: Collect Required Tools", 
-                               Y_OFFSET_STEP_TITLE, color=(200, 200, 200))
-                
-                # Run detection
-                results = model(frame, verbose=False, conf=TOOLS_CONFIDENCE_THRESHOLD, device=torch_device)
-                current_yolo_detections = results[0].boxes if results and results[0].boxes else []
-                
-                detected_tools_in_frame_names = set()
-                for det in current_yolo_detections:
-                    classidx = int(det.cls.item())
-                    classname = labels.get(classidx, f"ID:{classidx}")
-                    if classname in REQUIRED_TOOLS_CLASSES:
-                        detected_tools_in_frame_names.add(classname)
-                        conf = det.conf.item()
-                        xyxy = det.xyxy.cpu().numpy().squeeze().astype(int)
-                        
-                        # Draw bounding box
-                        color_idx = classidx % 5
-                        color = (31, 119, 180) if color_idx == 0 else \
-                                (255, 127, 14) if color_idx == 1 else \
-                                (44, 160, 44) if color_idx == 2 else \
-                                (214, 39, 40) if color_idx == 3 else \
-                                (148, 103, 189)
-                        cv2.rectangle(frame, (xyxy[0], xyxy[1]), (xyxy[2], xyxy[3]), color, 2)
-                        cv2.putText(frame, f'{classname}:{conf:.2f}', (xyxy[0], xyxy[1] - 10), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                
-                # Check if all tools are collected
-                if confirmed_tools == REQUIRED_TOOLS_CLASSES:
-                    app_state = STATE_ACTION_RECOGNITION
-                    print("INFO: Transitioned to ACTION_RECOGNITION state")
-                    continue
-                
-                # Simultaneous validation for all tools
-                status_messages = []
-                for tool in REQUIRED_TOOLS_CLASSES:
-                    if tool in confirmed_tools:
-                        continue  # Skip already confirmed tools
-                        
-                    if tool in detected_tools_in_frame_names:
-                        # Tool detected in this frame
-                        if tool_validation_timers[tool] is None:
-                            # Start validation timer
-                            tool_validation_timers[tool] = time.time()
-                            tool_lost_timers[tool] = None
-                            status_messages.append(f"Found {tool}, validating...")
-                        else:
-                            # Continue validation
-                            elapsed = time.time() - tool_validation_timers[tool]
-                            if elapsed >= VALIDATION_DURATION_SEC:
-                                # Tool confirmed
-                                confirmed_tools.add(tool)
-                                tool_validation_timers[tool] = None
-                                display_message(frame, f"{tool} Confirmed!", 
-                                               Y_OFFSET_CONFIRMATION_MSG, color=(0, 255, 0))
-                                cv2.imshow('Tire Assistant', frame)
-                                cv2.waitKey(1000)
-                            else:
-                                status_messages.append(f"Validating {tool}: {VALIDATION_DURATION_SEC - elapsed:.1f}s")
-                    else:
-                        # Tool not detected
-                        if tool_validation_timers[tool] is not None:
-                            if tool_lost_timers[tool] is None:
-                                # Start lost timer
-                                tool_lost_timers[tool] = time.time()
-                            else:
-                                # Check grace period
-                                time_since_lost = time.time() - tool_lost_timers[tool]
-                                if time_since_lost >= GRACE_PERIOD_DURATION_SEC:
-                                    # Tool lost, reset validation
-                                    tool_validation_timers[tool] = None
-                                    tool_lost_timers[tool] = None
-                                    status_messages.append(f"{tool} validation reset")
-                                else:
-                                    status_messages.append(f"Searching {tool}: {GRACE_PERIOD_DURATION_SEC - time_since_lost:.1f}s")
-                
-                # Display status messages
-                if status_messages:
-                    display_message(frame, " | ".join(status_messages), 
-                                   Y_OFFSET_STATUS_VALIDATION, color=(0, 255, 255))
-                
-                # Display collected and needed tools
-                still_needed_tools = REQUIRED_TOOLS_CLASSES - confirmed_tools
-                if confirmed_tools:
-                    display_message(frame, f"Collected: {', '.join(sorted(list(confirmed_tools)))}", 
-                                   Y_OFFSET_COLLECTED_LIST, color=(100, 200, 100))
-                
-                if still_needed_tools:
-                    display_message(frame, f"Needed: {', '.join(sorted(list(still_needed_tools)))}", 
-                                   Y_OFFSET_NEEDED_LIST, color=(255, 180, 0))
-            
-            # --- STATE: ACTION_RECOGNITION ---
-            elif app_state == STATE_ACTION_RECOGNITION:
-                # Initialize action recognition on first entry
-                if action_recognizer is None:
-                    print("INFO: Initializing action recognition system")
-                    action_recognizer = RealTimeActionRecognizer(action_weights_path, action_config_path)
-                    
-                    # Setup async processing
-                    movinet_input_queue = queue.Queue(maxsize=1)
-                    movinet_output_queue = queue.Queue(maxsize=1)
-                    movinet_thread = threading.Thread(
-                        target=inference_thread,
-                        args=(action_recognizer, movinet_input_queue, movinet_output_queue)
-                    )
-                    movinet_thread.daemon = True
-                    movinet_thread.start()
-                    
-                    current_action_step = 0
-                    action_validation_count = 0
-                    action_validation_start_time = time.time()
-                    last_prediction_confidence = 0.0
-                    print(f"Starting action validation for: {ACTION_STEPS[current_action_step]}")
-                
-                # Display current step
-                step_title = f"STEP {current_action_step+3}: {ACTION_STEPS[current_action_step]}"
-                display_message(frame, step_title, Y_OFFSET_STEP_TITLE, color=(200, 200, 255))
-                
-                # Format and submit frame for processing
-                formatted_frame = action_recognizer.format_frame(frame)
-                if movinet_input_queue.empty():
-                    try:
-                        movinet_input_queue.put_nowait(formatted_frame)
-                    except queue.Full:
-                        pass
-                
-                # Get latest prediction
-                prediction = None
-                try:
-                    prediction = movinet_output_queue.get_nowait()
-                except queue.Empty:
-                    pass
-                
-                # Process prediction
-                if prediction:
-                    current_confidence = prediction['confidence']
-                    current_action = prediction['smoothed_prediction']
-                    
-                    # Check for significant confidence drop (≥0.05) for the current action
-                    if (last_prediction_confidence - current_confidence >= 0.05 and
-                        current_action == ACTION_STEPS[current_action_step]):
-                        action_recognizer.reset_states()
-                        print(f"Reset MoViNet: Confidence dropped by {last_prediction_confidence - current_confidence:.2f} for {current_action}")
-                    
-                    # Track confidence for next frame
-                    last_prediction_confidence = current_confidence
-                    
-                    # Display prediction info
-                    pred_text = f"Action: {current_action} ({current_confidence:.2f})"
-                    display_message(frame, pred_text, Y_OFFSET_MAIN_INSTRUCTION, 
-                                color=(255, 255, 0) if current_action == ACTION_STEPS[current_action_step] else (255, 100, 100))
-                    
-                    # Validate current step
-                    if current_action == ACTION_STEPS[current_action_step] and current_confidence >= ACTION_CONFIDENCE_THRESHOLD:
-                        action_validation_count += 1
-                        
-                        # Check if step is completed
-                        if action_validation_count >= ACTION_VALIDATION_FRAMES:
-                            display_message(frame, "Step Completed!", 
-                                        Y_OFFSET_CONFIRMATION_MSG, color=(0, 255, 0))
-                            cv2.imshow('Tire Assistant', frame)
-                            cv2.waitKey(1500)
-                            
-                            # Move to next step
-                            current_action_step += 1
-                            action_validation_count = 0
-                            
-                            # Check if all steps are completed
-                            if current_action_step >= len(ACTION_STEPS):
-                                display_message(frame, "ALL STEPS COMPLETED!", 
-                                            Y_OFFSET_MAIN_INSTRUCTION, 
-                                            color=(0, 255, 0), font_scale=1.0)
-                                cv2.imshow('Tire Assistant', frame)
-                                cv2.waitKey(3000)
-                                break
-                            
-                            # Reset states for new action
-                            action_recognizer.reset_states()
-                            last_prediction_confidence = 0.0
-                            print(f"Starting action validation for: {ACTION_STEPS[current_action_step]}")
-                    else:
-                        action_validation_count = max(0, action_validation_count - 1)
-                
-                # Display validation progress
-                progress_text = f"Validation: {action_validation_count}/{ACTION_VALIDATION_FRAMES}"
-                display_message(frame, progress_text, Y_OFFSET_ACTION_PROGRESS, 
-                            color=(0, 255, 255) if action_validation_count > 0 else (255, 165, 0))
-                
+            with METRICS.span(f'state_{session.state.lower()}'):
+                session.process_frame(frame, timestamp)
+            if session.finished:
+                break
             
             # --- FPS Calculation and Display ---
             loop_time = time.perf_counter() - loop_start_time
@@ -772,43 +3276,1020 @@ def main_orchestrator():
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, fps_color, 2)
             
             # Display frame
-            cv2.imshow('Tire Assistant', frame)
-            
-            # Handle keyboard input
-            key = cv2.waitKey(1) & 0xFF
+            with METRICS.span('imshow'):
+                cv2.imshow('Tire Assistant', frame)
+                
+                # Handle keyboard input
+                key = cv2.waitKey(1) & 0xFF
+            METRICS.observe('frame_total', (time.perf_counter() - loop_start_time) * 1000.0)
             if key == ord('q'):
                 print("INFO: Quitting...")
                 break
             elif key == ord('p'):
                 cv2.waitKey(-1)  # Pause
-            elif key == ord('r') and app_state == STATE_ACTION_RECOGNITION:
+            elif key == ord('r') and session.state == STATE_ACTION_RECOGNITION:
                 # Reset action recognition states
-                if action_recognizer:
-                    action_recognizer.reset_states()
-                    action_validation_count = 0
-                    print("Action recognition states reset")
+                session.reset_action()
     
     except KeyboardInterrupt:
         print("INFO: Process interrupted")
     finally:
         # Cleanup
         print("INFO: Releasing resources...")
-        cap.release()
+        capture_stats = frame_reader.stats()
+        frame_reader.release()
         cv2.destroyAllWindows()
+        startup_executor.shutdown(wait=False)
+        
+        if session is not None:
+            session.close()
+        if observation_log:
+            observation_log.close()
+        if recorder:
+            recorder.close()
+            print(f"INFO: Inference recording saved to {recorder.directory}")
+
+        if intent_classifier:
+            intent_classifier.stop()
+        if tts_thread:
+            tts_thread.stop()
+        
+        print(f"INFO: Average FPS: {avg_frame_rate:.1f}")
+        if model_registry is not None:
+            for name, timing in model_registry.report().items():
+                print(f"INFO: Model '{name}': load {timing['load_sec']:.2f}s, "
+                      f"warm-up {timing['warmup_sec']:.2f}s")
+        print(f"INFO: Frames captured: {capture_stats['frames_captured']}, "
+              f"dropped: {capture_stats['frames_dropped']}")
+        if session is not None and session.tracker is not None:
+            tracker_stats = session.tracker.stats()
+            print(f"INFO: YOLO keyframes: {tracker_stats['keyframes']}, "
+                  f"tracked frames: {tracker_stats['tracked_frames']}")
+        if session is not None and session.action_scheduler is not None:
+            action_stats = session.action_scheduler.stats()
+            print(f"INFO: MoViNet rate: {action_stats['achieved_fps']:.1f} FPS "
+                  f"(target {action_stats['target_fps']:g}), dropped: {action_stats['frames_dropped']}, "
+                  f"duplicated: {action_stats['frames_duplicated']}")
+        print("INFO: Program terminated")
+
+# --- Headless Batch Mode ---
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.m4v'}
+HEADLESS_EVENTS_PATH = 'events.jsonl'  # Event log of headless runs when --events-out is not given
+
+def expand_video_paths(paths):
+    """Expands directories into the video files they contain (sorted)."""
+    video_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            video_paths.extend(str(p) for p in sorted(Path(path).iterdir())
+                               if p.suffix.lower() in VIDEO_EXTENSIONS)
+        else:
+            video_paths.append(path)
+    return video_paths
+
+def process_recorded_video(video_path, model_registry, torch_device, event_log,
+                           adaptive_detection=ADAPTIVE_DETECTION, observation_sink=None, recorder=None,
+                           action_fps=ACTION_TARGET_FPS):
+    """Runs the full state machine over one video as fast as possible, on video time."""
+    video_sink = event_log.bind(video=video_path) if event_log else None
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"ERROR: Unable to open video: {video_path}")
+        if video_sink:
+            video_sink({'timestamp': 0.0, 'event': 'video_error', 'error': 'unable to open video'})
+        return None
+    
+    frame_reader = SequentialFrameReader(cap, use_video_time=True)
+    session = TireChangeSession(model_registry, torch_device, display=False,
+                                async_action=False, event_sink=video_sink,
+                                adaptive_detection=adaptive_detection,
+                                observation_sink=observation_sink, recorder=recorder, action_fps=action_fps)
+    start_time = time.perf_counter()
+    try:
+        while not session.finished:
+            ret, frame, timestamp = frame_reader.read()
+            if not ret or frame is None:
+                break
+            if frame.shape[1] != 640 or frame.shape[0] != 480:
+                frame = cv2.resize(frame, (640, 480))
+            session.process_frame(frame, timestamp)
+    finally:
+        session.close()
+        frame_reader.release()
+    
+    processing_time = time.perf_counter() - start_time
+    frames = frame_reader.frames_captured
+    summary = {
+        'frames': frames,
+        'video_duration_sec': round(frame_reader.timestamp or 0.0, 3),
+        'processing_sec': round(processing_time, 3),
+        'processing_fps': round(frames / processing_time, 2) if processing_time > 0 else 0.0,
+        'final_state': session.state,
+        'completed': session.finished,
+        'steps_completed': session.current_action_step
+    }
+    if session.tracker is not None:
+        summary['keyframe_ratio'] = round(session.tracker.stats()['keyframe_ratio'], 3)
+    if session.action_scheduler is not None and session.action_started:
+        summary['action_fps'] = round(session.action_scheduler.stats()['achieved_fps'], 2)
+    session.emit(frame_reader.timestamp or 0.0, 'video_finished', **summary)
+    print(f"INFO: {video_path}: {frames} frames in {processing_time:.1f}s "
+          f"({summary['processing_fps']:.1f} FPS), final state {session.state}")
+    return summary
+
+def run_headless(video_paths, events_path=HEADLESS_EVENTS_PATH, adaptive_detection=ADAPTIVE_DETECTION,
+                 observations_path=None, record_dir=None, action_fps=ACTION_TARGET_FPS):
+    """Processes recorded videos without UI, writing state transitions and step completions as JSONL."""
+    video_paths = expand_video_paths(video_paths)
+    if not video_paths:
+        print("ERROR: No video files to process")
+        sys.exit(1)
+    
+    torch_device = verify_devices()
+    verify_model_paths()
+    model_registry = build_model_registry(torch_device)
+    
+    event_log = EventLog(events_path)
+    observation_log = EventLog(observations_path) if observations_path else None
+    run_id = time.strftime('%Y%m%dT%H%M%S')
+    print(f"INFO: Processing {len(video_paths)} video(s), events -> {events_path}")
+    try:
+        for index, video_path in enumerate(video_paths):
+            observation_sink = observation_log.bind(run=run_id, video=video_path) if observation_log else None
+            recorder = (InferenceRecorder(os.path.join(record_dir, run_id, f"{index:04d}_{Path(video_path).stem}"),
+                                          run=run_id, video=video_path) if record_dir else None)
+            try:
+                process_recorded_video(video_path, model_registry, torch_device, event_log,
+                                       adaptive_detection, observation_sink, recorder, action_fps)
+            finally:
+                if recorder:
+                    recorder.close()
+    finally:
+        event_log.close()
+        if observation_log:
+            observation_log.close()
+
+def load_benchmark_frames(video_path=None, num_frames=30):
+    """Returns 640x480 BGR frames from a video file, or random frames if none is given."""
+    frames = []
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < num_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.resize(frame, (640, 480)))
+        cap.release()
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(num_frames)]
+    return frames
+
+# --- Multi-Camera Serving ---
+def open_frame_reader(source):
+    """Opens a capture source at 640x480; files are read sequentially, live sources latest-frame-wins."""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        return None
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    if isinstance(source, str) and os.path.exists(source):
+        return SequentialFrameReader(cap).start()
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return LatestFrameReader(cap).start()
+
+class MultiStreamServer:
+    """Serves several cameras (service bays) from one process with shared models.
 
+    Each stream keeps its own capture reader and TireChangeSession, so
+    validation timers, confirmed tools and MoViNet streaming states are
+    per stream, while the YOLO models and MoViNet weights are loaded once
+    (with the 'process' action worker, each stream's worker loads its own
+    copy of MoViNet). On every tick the newest frame of each stream is collected and all
+    frames whose sessions need the same YOLO model go through a single
+    batched call.
+    """
+    def __init__(self, sources, model_registry, torch_device, display=True, event_log=None,
+                 adaptive_detection=ADAPTIVE_DETECTION, observation_log=None, record_dir=None,
+                 action_worker=ACTION_WORKER, action_fps=ACTION_TARGET_FPS):
+        self.model_registry = model_registry
+        self.torch_device = torch_device
+        self.display = display
+        self.streams = []
+        run_id = time.strftime('%Y%m%dT%H%M%S')
+        for index, source in enumerate(sources):
+            reader = open_frame_reader(source)
+            if reader is None:
+                print(f"ERROR: Unable to open video source: {source}")
+                continue
+            name = f"bay{index + 1}"
+            event_sink = event_log.bind(stream=name, source=str(source)) if event_log else None
+            observation_sink = (observation_log.bind(run=run_id, stream=name, source=str(source))
+                                if observation_log else None)
+            recorder = (InferenceRecorder(os.path.join(record_dir, run_id, name), run=run_id, stream=name,
+                                          source=str(source)) if record_dir else None)
+            session = TireChangeSession(model_registry, torch_device, display=display,
+                                        event_sink=event_sink, fork_action_recognizer=True,
+                                        adaptive_detection=adaptive_detection,
+                                        observation_sink=observation_sink, recorder=recorder,
+                                        action_worker=action_worker, action_fps=action_fps)
+            self.streams.append({'name': name, 'source': source, 'reader': reader, 'session': session,
+                                 'recorder': recorder, 'active': True, 'frames': 0})
+            print(f"INFO: Stream {name}: {source}")
 
+    def active_streams(self):
+        return [stream for stream in self.streams if stream['active']]
+
+    def collect_frames(self):
+        """Returns (stream, frame, timestamp) for every stream that has a new frame."""
+        ready = []
+        for stream in self.active_streams():
+            ret, frame, timestamp = stream['reader'].read(timeout=0)
+            if not ret or frame is None:
+                if stream['reader'].ended:
+                    stream['active'] = False
+                    print(f"INFO: Stream {stream['name']} ended")
+                continue
+            if frame.shape[1] != 640 or frame.shape[0] != 480:
+                frame = cv2.resize(frame, (640, 480))
+            stream['frames'] += 1
+            ready.append((stream, frame, timestamp))
+        return ready
+
+    def tick(self):
+        """Processes the newest frame of every stream; returns False once all streams are done."""
+        ready = self.collect_frames()
+        if not ready:
+            if not self.active_streams():
+                return False
+            time.sleep(0.002)  # No new frames yet
+            return True
         
-        # Stop MoViNet thread if running
-        if movinet_thread and movinet_thread.is_alive():
-            movinet_input_queue.put(None)
-            movinet_thread.join(timeout=2.0)
+        # Group frames by the YOLO model their session currently needs
+        # (sessions tracking between keyframes skip YOLO and propagate their boxes)
+        batches = {}
+        detections = {}
+        for item in ready:
+            session = item[0]['session']
+            if (session.state in (STATE_DETECTING_FLAT_TIRE, STATE_COLLECTING_TOOLS)
+                    and session.needs_detection()):
+                batches.setdefault(session.model_name, []).append(item)
+        for model_name, items in batches.items():
+            model = self.model_registry.get(model_name)
+            METRICS.set_gauge(f'yolo_batch_size_{model_name}', len(items))
+            with METRICS.span(f'yolo_batch_{model_name}'):
+                results = model([frame for _, frame, _ in items], verbose=False,
+                                conf=DETECTION_CONFIDENCE_FLOOR, device=self.torch_device)
+            for (stream, frame, _), result in zip(items, results):
+                session = stream['session']
+                detections[stream['name']] = session.register_keyframe(frame, session.filter_results([result]))
+        
+        for stream, frame, timestamp in ready:
+            session = stream['session']
+            session.process_frame(frame, timestamp, detections.get(stream['name']))
+            if session.finished:
+                stream['active'] = False
+                print(f"INFO: Stream {stream['name']} completed all steps")
+            if self.display:
+                cv2.imshow(f"Tire Assistant - {stream['name']}", frame)
+        return True
+
+    def run(self):
+        start_time = time.perf_counter()
+        try:
+            while self.tick():
+                if self.display and cv2.waitKey(1) & 0xFF == ord('q'):
+                    print("INFO: Quitting...")
+                    break
+        except KeyboardInterrupt:
+            print("INFO: Process interrupted")
+        finally:
+            elapsed = time.perf_counter() - start_time
+            for stream in self.streams:
+                stream['session'].close()
+                stream['reader'].release()
+                if stream['recorder']:
+                    stream['recorder'].close()
+                fps = stream['frames'] / elapsed if elapsed > 0 else 0.0
+                print(f"INFO: Stream {stream['name']}: {stream['frames']} frames ({fps:.1f} FPS), "
+                      f"dropped {stream['reader'].frames_dropped}, final state {stream['session'].state}")
+                if stream['session'].action_scheduler is not None and stream['session'].action_started:
+                    print(f"INFO: Stream {stream['name']}: MoViNet "
+                          f"{stream['session'].action_scheduler.stats()['achieved_fps']:.1f} FPS")
+            if self.display:
+                cv2.destroyAllWindows()
+
+def run_multi_stream(sources, events_path=None, adaptive_detection=ADAPTIVE_DETECTION, observations_path=None,
+                     record_dir=None, action_worker=ACTION_WORKER, action_fps=ACTION_TARGET_FPS):
+    torch_device = verify_devices()
+    verify_model_paths()
+    model_registry = build_model_registry(torch_device, load_action=action_worker != 'process')
+    event_log = EventLog(events_path) if events_path else None
+    observation_log = EventLog(observations_path) if observations_path else None
+    try:
+        server = MultiStreamServer(sources, model_registry, torch_device, event_log=event_log,
+                                   adaptive_detection=adaptive_detection, observation_log=observation_log,
+                                   record_dir=record_dir, action_worker=action_worker, action_fps=action_fps)
+        if not server.streams:
+            print("ERROR: No stream could be opened")
+            sys.exit(1)
+        server.run()
+    finally:
+        if event_log:
+            event_log.close()
+        if observation_log:
+            observation_log.close()
+
+# --- Replay ---
+OBSERVATION_FIELDS = {'timestamp', 'state', 'kind', 'detections', 'prediction', 'detection_floor'}
+
+def load_observations(path):
+    """Reads an observation log and groups it into recorded sessions.
+
+    Observations are grouped by their context fields (run, video, stream),
+    in the order the sessions first appear in the file.
+    """
+    sessions = OrderedDict()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            observation = json.loads(line)
+            key = tuple(sorted((k, v) for k, v in observation.items() if k not in OBSERVATION_FIELDS))
+            sessions.setdefault(key, []).append(observation)
+    return sessions
+
+def replay_session(observations, config=None):
+    """Feeds recorded observations to a fresh TireChangeStateMachine and summarizes the outcome.
+
+    Observations only contain what the recorded session was looking for: if the
+    replayed machine is still validating tools when the recording already ran
+    MoViNet, those frames count as frames without tools (and detections
+    recorded after the replay moved on to the action steps are skipped).
+    Both cases are counted as `mismatched_observations`.
+    """
+    events = []
+    machine = TireChangeStateMachine(config, event_sink=events.append, verbose=False)
+    mismatched = 0
+    for observation in observations:
+        if machine.completed:
+            break
+        now = observation['timestamp']
+        if observation['kind'] == 'detections':
+            if machine.state == STATE_ACTION_RECOGNITION:
+                mismatched += 1
+                continue
+            machine.observe_detections(now, observation['detections'])
+        elif machine.state == STATE_ACTION_RECOGNITION:
+            machine.observe_action(now, observation['prediction'])
+        else:
+            mismatched += 1
+            machine.observe_detections(now, [])
+    
+    start_time = observations[0]['timestamp'] if observations else 0.0
+    completion = next((e['timestamp'] for e in events if e['event'] == 'session_completed'), None)
+    return {
+        'final_state': machine.state,
+        'completed': machine.completed,
+        'completion_sec': completion - start_time if completion is not None else None,
+        'steps_completed': machine.current_action_step,
+        'transitions': [(e['to_state'], round(e['timestamp'] - start_time, 3))
+                        for e in events if e['event'] == 'state_transition'],
+        'mismatched_observations': mismatched
+    }
+
+def parse_bool(value):
+    if value.strip().lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    if value.strip().lower() in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f"Invalid boolean '{value}' (use true or false)")
+
+def parse_replay_params(specs):
+    """Parses NAME=VALUE[,VALUE...] overrides of STATE_MACHINE_DEFAULTS into a parameter grid."""
+    grid = {}
+    for spec in specs or []:
+        name, separator, values = spec.partition('=')
+        name = name.strip().upper()
+        if not separator or name not in STATE_MACHINE_DEFAULTS:
+            raise ValueError(f"Invalid parameter '{spec}' (known: {', '.join(STATE_MACHINE_DEFAULTS)})")
+        default = STATE_MACHINE_DEFAULTS[name]
+        value_type = parse_bool if isinstance(default, bool) else type(default)
+        grid[name] = [value_type(value) for value in values.split(',')]
+    return grid
+
+def check_replay_params(sessions, param_grid):
+    """Rejects TOOLS_CONFIDENCE_THRESHOLD values below the confidence the detections were recorded at.
+
+    Weaker detections were never recorded, so such values would silently
+    replay like the recording floor itself.
+    """
+    floors = [observation['detection_floor'] for observations in sessions for observation in observations
+              if observation.get('detection_floor') is not None]
+    if not floors:
+        return
+    floor = max(floors)
+    too_low = [value for value in (param_grid or {}).get('TOOLS_CONFIDENCE_THRESHOLD', []) if value < floor]
+    if too_low:
+        raise ValueError(f"TOOLS_CONFIDENCE_THRESHOLD={', '.join(map(str, too_low))} is below the confidence "
+                         f"the detections were recorded at ({floor}); only values >= {floor} can be replayed")
+
+def run_replay(paths, param_grid=None):
+    """Replays observation logs (or recording directories) under every combination of the parameter grid."""
+    sources = []  # (path, observations) of every recorded session
+    for path in paths:
+        if os.path.isdir(path):
+            sources.extend((directory, list(InferenceRecording(directory).observations()))
+                           for directory in find_recordings(path))
+        else:
+            sources.extend((path, observations) for observations in load_observations(path).values())
+    # Recordings of videos that failed to open have no frames
+    empty = [path for path, observations in sources if not observations]
+    if empty:
+        print(f"⚠️ Skipping {len(empty)} empty recording(s): {', '.join(empty)}")
+    sessions = [observations for _, observations in sources if observations]
+    if not sessions:
+        print("ERROR: No observations to replay")
+        sys.exit(1)
+    try:
+        check_replay_params(sessions, param_grid)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    num_observations = sum(len(observations) for observations in sessions)
+    recorded_sec = sum(observations[-1]['timestamp'] - observations[0]['timestamp'] for observations in sessions)
+    
+    names = sorted(param_grid or {})
+    configs = [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+    print(f"INFO: Replaying {len(sessions)} session(s), {num_observations} observations, "
+          f"{len(configs)} configuration(s)")
+    
+    results = []
+    start_time = time.perf_counter()
+    for config in configs:
+        summaries = [replay_session(observations, config) for observations in sessions]
+        completion_times = [s['completion_sec'] for s in summaries if s['completed']]
+        result = {
+            'config': {**STATE_MACHINE_DEFAULTS, **config},
+            'sessions': summaries,
+            'completed': len(completion_times),
+            'median_completion_sec': float(np.median(completion_times)) if completion_times else None,
+            'mean_steps_completed': float(np.mean([s['steps_completed'] for s in summaries]))
+        }
+        results.append(result)
+        label = ", ".join(f"{k}={v}" for k, v in config.items()) or "defaults"
+        median = (f"{result['median_completion_sec']:.1f}s" if result['median_completion_sec'] is not None
+                  else "n/a")
+        print(f"{label}: completed {result['completed']}/{len(summaries)}, median time {median}, "
+              f"mean steps {result['mean_steps_completed']:.1f}/{len(ACTION_STEPS)}")
+    
+    elapsed = time.perf_counter() - start_time
+    speedup = recorded_sec * len(configs) / elapsed if elapsed > 0 else float('inf')
+    print(f"INFO: Replayed {recorded_sec * len(configs):.0f}s of recordings in {elapsed:.2f}s ({speedup:.0f}x real time)")
+    return results
+
+# --- Benchmark Suite ---
+BENCHMARK_UTTERANCES = [
+    "what do I do next",
+    "where should I place the jack",
+    "how tight should the lug nuts be",
+    "which tools do I need",
+    "the lug nut is stuck what should I do"
+]
+BENCHMARK_REGRESSION_THRESHOLD = 0.10  # Flag stages whose p50 latency grew by more than 10%
+
+def summarize_latencies(latencies_ms):
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    mean_ms = float(latencies.mean())
+    return {
+        'runs': int(latencies.size),
+        'mean_ms': mean_ms,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'throughput_per_sec': 1000.0 / mean_ms if mean_ms > 0 else 0.0
+    }
+
+def time_stage(fn, inputs, num_runs, num_warmup=3):
+    """Calls `fn` on the inputs (cycling) and returns latency statistics in milliseconds."""
+    for i in range(num_warmup):
+        fn(inputs[i % len(inputs)])
+    latencies = []
+    for i in range(num_runs):
+        item = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        fn(item)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return summarize_latencies(latencies)
+
+def benchmark_capture_decode(frames, video_path, num_runs):
+    """Times frame decoding: reading the video file, or JPEG decoding (MJPEG/IP camera) otherwise."""
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        def read_frame(_):
+            ret, _frame = cap.read()
+            if not ret:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        try:
+            return time_stage(read_frame, [None], num_runs)
+        finally:
+            cap.release()
+    encoded = [cv2.imencode('.jpg', frame)[1] for frame in frames]
+    return time_stage(lambda buffer: cv2.imdecode(buffer, cv2.IMREAD_COLOR), encoded, num_runs)
+
+def benchmark_overlays(frames, num_runs):
+    """Times the typical set of status overlays drawn on one frame."""
+    def draw_overlays(frame):
+        display_message(frame, "STEP 2: Collect Required Tools", Y_OFFSET_STEP_TITLE, color=(200, 200, 200))
+        display_message(frame, "Validating Car_Jack: 3.2s | Searching Wheel_Wrench: 1.1s",
+                        Y_OFFSET_STATUS_VALIDATION, color=(0, 255, 255))
+        display_message(frame, "Collected: Car_Jack", Y_OFFSET_COLLECTED_LIST, color=(100, 200, 100))
+        display_message(frame, "Needed: Wheel_Wrench", Y_OFFSET_NEEDED_LIST, color=(255, 180, 0))
+    return time_stage(draw_overlays, [frame.copy() for frame in frames], num_runs)
+
+def benchmark_vosk(audio_path, num_runs, block_size=AUDIO_BLOCK_SIZE):
+    """Times KaldiRecognizer.AcceptWaveform on microphone-sized blocks of a WAV file (or low-level noise)."""
+    vosk_model = vosk.Model(VOSK_MODEL_PATH)
+    recognizer = vosk.KaldiRecognizer(vosk_model, AUDIO_SAMPLE_RATE)
+    if audio_path:
+        with wave.open(audio_path, 'rb') as wav:
+            audio = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    else:
+        audio = np.random.default_rng(0).normal(0, 300, AUDIO_SAMPLE_RATE * 10).astype(np.int16)
+    blocks = [audio[i:i + block_size].tobytes() for i in range(0, len(audio) - block_size + 1, block_size)]
+    return time_stage(recognizer.AcceptWaveform, blocks, num_runs)
+
+def benchmark_end_to_end(model_registry, torch_device, frames, state, num_runs):
+    """Times TireChangeSession.process_frame (headless) with the session held in `state`."""
+    session = TireChangeSession(model_registry, torch_device, display=False, async_action=False)
+    if state == STATE_COLLECTING_TOOLS:
+        session.select_model('tools', REQUIRED_TOOLS_CLASSES)
+    session.machine.state = state
+    # A constant timestamp keeps every validation timer at zero, so the session never leaves `state`
+    return time_stage(lambda frame: session.process_frame(frame, 0.0), frames, num_runs)
+
+def run_benchmark_suite(video_path=None, audio_path=None, num_runs=100):
+    """Times each pipeline stage in isolation and end to end; returns a JSON-serializable report."""
+    frames = load_benchmark_frames(video_path)
+    torch_device = verify_devices()
+    model_registry = build_model_registry(torch_device)
+    
+    def action_recognizer():
+        return model_registry.get('action')
+    
+    def intent_classifier():
+        classifier = IntentClassifier(queue.Queue())
+        classifier.predict_normalized.cache_clear()
+        return classifier
+    
+    stages = [
+        ('capture_decode', lambda: benchmark_capture_decode(frames, video_path, num_runs)),
+        ('display_message', lambda: benchmark_overlays(frames, num_runs)),
+        ('yolo_flat_tire', lambda: time_stage(
+            lambda f: model_registry.get('flat_tire')(f, verbose=False, conf=TOOLS_CONFIDENCE_THRESHOLD,
+                                                      device=torch_device), frames, num_runs)),
+        ('yolo_tools', lambda: time_stage(
+            lambda f: model_registry.get('tools')(f, verbose=False, conf=TOOLS_CONFIDENCE_THRESHOLD,
+                                                  device=torch_device), frames, num_runs)),
+        ('format_frame', lambda: time_stage(action_recognizer().format_frame, frames, num_runs)),
+        ('predict_frame', lambda: time_stage(
+            action_recognizer().predict_frame,
+            [np.copy(action_recognizer().format_frame(f)) for f in frames], num_runs)),
+        ('predict_intent_uncached', lambda: time_stage(
+            (lambda c: lambda u: c._predict_normalized(c.preprocess_text(u)))(intent_classifier()),
+            BENCHMARK_UTTERANCES, num_runs)),
+        ('predict_intent_cached', lambda: time_stage(intent_classifier().predict_intent,
+                                                     BENCHMARK_UTTERANCES, num_runs)),
+        ('faq_retrieve', lambda: time_stage(intent_classifier().retrieval_index.query,
+                                            BENCHMARK_UTTERANCES, num_runs)),
+        ('vosk_accept_waveform', lambda: benchmark_vosk(audio_path, num_runs)),
+        ('end_to_end_flat_tire', lambda: benchmark_end_to_end(
+            model_registry, torch_device, frames, STATE_DETECTING_FLAT_TIRE, num_runs)),
+        ('end_to_end_tools', lambda: benchmark_end_to_end(
+            model_registry, torch_device, frames, STATE_COLLECTING_TOOLS, num_runs)),
+        ('end_to_end_action', lambda: benchmark_end_to_end(
+            model_registry, torch_device, frames, STATE_ACTION_RECOGNITION, num_runs)),
+    ]
+    
+    results = {}
+    print("--- Pipeline Benchmark ---")
+    for name, run_stage in stages:
+        try:
+            results[name] = run_stage()
+            stats = results[name]
+            print(f"{name:>24}: p50 {stats['p50_ms']:8.2f} ms | p95 {stats['p95_ms']:8.2f} ms | "
+                  f"p99 {stats['p99_ms']:8.2f} ms | {stats['throughput_per_sec']:8.1f}/s")
+        except Exception as e:
+            results[name] = {'error': str(e)}
+            print(f"{name:>24}: skipped ({e})")
+    
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': current_git_commit(),
+        'platform': sys.platform,
+        'torch_device': torch_device,
+        'detectors': copy.deepcopy(ACTIVE_DETECTOR_CONFIG),
+        'source': video_path or 'synthetic',
+        'stages': results,
+        'imports': {name: round(timing['seconds'], 3) for name, timing in IMPORT_TIMES.items()}
+    }
+
+def current_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare_benchmarks(report, baseline, threshold=BENCHMARK_REGRESSION_THRESHOLD):
+    """Prints the p50 change of every stage against a saved baseline; returns the regressed stages."""
+    regressions = []
+    print(f"--- Comparison with baseline ({baseline.get('commit')}, {baseline.get('created')}) ---")
+    for name, stats in report['stages'].items():
+        previous = baseline.get('stages', {}).get(name)
+        if 'p50_ms' not in stats or not previous or 'p50_ms' not in previous:
+            continue
+        change = (stats['p50_ms'] - previous['p50_ms']) / previous['p50_ms']
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  <-- REGRESSION"
+        print(f"{name:>24}: {previous['p50_ms']:8.2f} -> {stats['p50_ms']:8.2f} ms ({change:+.1%}){flag}")
+    for name, seconds in report.get('imports', {}).items():
+        previous = baseline.get('imports', {}).get(name)
+        if not previous:
+            continue
+        change = (seconds - previous) / previous
+        flag = ""
+        if change > threshold:
+            regressions.append(f"import {name}")
+            flag = "  <-- REGRESSION"
+        print(f"{'import ' + name:>24}: {previous:8.2f} -> {seconds:8.2f} s ({change:+.1%}){flag}")
+    return regressions
+
+# --- Resource Profile Tuning ---
+RESOURCE_WORKLOAD_RESULT_PREFIX = "RESOURCE_WORKLOAD_RESULT "
+
+def available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def candidate_resource_profiles(cpus=None):
+    """Framework defaults plus every torch/TensorFlow split of the CPUs, unpinned and pinned."""
+    cpus = cpus or available_cpus()
+    candidates = [{'name': 'framework-defaults'}]
+    for torch_threads in range(1, len(cpus)):
+        tf_threads = len(cpus) - torch_threads
+        split = {
+            'tf_intra_op_threads': tf_threads,
+            'tf_inter_op_threads': 1,
+            'torch_threads': torch_threads,
+            'cv2_threads': 1
+        }
+        yolo_cpus, movinet_cpus = cpus[:torch_threads], cpus[torch_threads:]
+        candidates.append({'name': f'torch{torch_threads}-tf{tf_threads}', **split})
+        candidates.append({'name': f'torch{torch_threads}-tf{tf_threads}-pinned', **split, 'affinity': {
+            'main': yolo_cpus, 'capture': yolo_cpus,
+            'movinet': movinet_cpus, 'intent': movinet_cpus, 'tts': movinet_cpus[-1:]
+        }})
+    return candidates
+
+def measure_concurrent_throughput(main_fn, background_fn, inputs, duration_sec, executor):
+    """Runs `main_fn` on this thread and `background_fn` on `executor` over the same window.
+
+    Both loops stop at the same deadline, so the two stages compete for the
+    CPUs the whole time. Returns their rates (calls per second).
+    """
+    deadline = time.perf_counter() + duration_sec
+    def throughput(fn):
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() < deadline:
+            fn(inputs[count % len(inputs)])
+            count += 1
+        return count / max(time.perf_counter() - start, 1e-9)
+    future = executor.submit(throughput, background_fn)
+    try:
+        main_rate = throughput(main_fn)
+    finally:
+        background_rate = future.result()
+    return main_rate, background_rate
+
+def run_resource_workload(video_path=None, duration_sec=10.0):
+    """Measures YOLO and MoViNet throughput under the active profile while Vosk is fed in real time.
+
+    YOLO runs on the main thread and, at the same time, MoViNet on a thread
+    pinned to the 'movinet' CPUs, which also runs the first TensorFlow op, so
+    TensorFlow's pools are placed like in the process worker. Both stages run
+    concurrently for `duration_sec`, so the score reflects them sharing the CPUs.
+    """
+    frames = load_benchmark_frames(video_path)
+    torch_device = "cuda" if torch.cuda.is_available() else "cpu"
+    movinet_executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=1, initializer=pin_current_thread, initargs=('movinet',))
+    def load_movinet():
+        recognizer = load_action_recognizer(ACTION_WEIGHTS_PATH, ACTION_CONFIG_PATH)
+        warmup_action_recognizer(recognizer)
+        return recognizer
+    recognizer = movinet_executor.submit(load_movinet).result()
+    yolo = load_detector('flat_tire')
+    warmup_yolo(yolo, torch_device)
+    
+    # Background speech recognition, paced like the microphone (AUDIO_BLOCK_SIZE blocks)
+    stop = threading.Event()
+    def feed_vosk():
+        pin_current_thread('intent')
+        recognizer_vosk = vosk.KaldiRecognizer(vosk.Model(VOSK_MODEL_PATH), AUDIO_SAMPLE_RATE)
+        block = np.random.default_rng(0).normal(0, 300, AUDIO_BLOCK_SIZE).astype(np.int16).tobytes()
+        block_sec = AUDIO_BLOCK_SIZE / AUDIO_SAMPLE_RATE
+        while not stop.is_set():
+            start = time.perf_counter()
+            recognizer_vosk.AcceptWaveform(block)
+            stop.wait(max(0.0, block_sec - (time.perf_counter() - start)))
+    vosk_thread = None
+    if os.path.exists(VOSK_MODEL_PATH):
+        vosk_thread = threading.Thread(target=feed_vosk, daemon=True)
+        vosk_thread.start()
+    
+    result = {}
+    try:
+        result['yolo_fps'], result['movinet_fps'] = measure_concurrent_throughput(
+            lambda f: yolo(f, verbose=False, conf=TOOLS_CONFIDENCE_THRESHOLD, device=torch_device),
+            lambda f: recognizer.predict_frame(recognizer.format_frame(f)),
+            frames, duration_sec, movinet_executor)
+    finally:
+        movinet_executor.shutdown()
+        stop.set()
+        if vosk_thread:
+            vosk_thread.join(timeout=2.0)
+    result['score'] = float(np.sqrt(result['yolo_fps'] * result['movinet_fps']))
+    return result
+
+def tune_resource_profiles(video_path=None, duration_sec=10.0, timeout_sec=600.0):
+    """Runs the workload once per candidate profile, each in a fresh process, and returns the best.
+
+    A fresh process is needed because TensorFlow and PyTorch thread pools can
+    only be sized before their first operation. Profiles are ranked by the
+    geometric mean of YOLO and MoViNet throughput.
+    """
+    results = []
+    print("--- Resource Profile Search ---")
+    for profile in candidate_resource_profiles():
+        command = [sys.executable, os.path.abspath(__file__), '--resource-profile', json.dumps(profile),
+                   '--resource-workload', '--resource-duration', str(duration_sec),
+                   '--yolo-backend', json.dumps(ACTIVE_DETECTOR_CONFIG)]
+        if video_path:
+            command += ['--video', video_path]
+        try:
+            completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout_sec)
+            lines = [line for line in completed.stdout.splitlines()
+                     if line.startswith(RESOURCE_WORKLOAD_RESULT_PREFIX)]
+            if not lines:
+                raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                                   else f"exit code {completed.returncode}")
+            result = json.loads(lines[-1][len(RESOURCE_WORKLOAD_RESULT_PREFIX):])
+        except Exception as e:
+            print(f"{profile['name']:>24}: failed ({e})")
+            continue
+        results.append((profile, result))
+        print(f"{profile['name']:>24}: YOLO {result['yolo_fps']:6.1f} FPS | "
+              f"MoViNet {result['movinet_fps']:6.1f} FPS | score {result['score']:6.1f}")
+    
+    if not results:
+        print("ERROR: No resource profile could be measured")
+        return None
+    best_profile, best_result = max(results, key=lambda item: item[1]['score'])
+    print(f"INFO: Best profile: {best_profile['name']} (score {best_result['score']:.1f})")
+    return best_profile
+
+# --- YOLO Backend Calibration ---
+def detection_agreement(reference, candidate, iou_threshold=CALIBRATION_IOU_THRESHOLD):
+    """F1 score of `candidate` detections against `reference` ones (same class, IoU above threshold)."""
+    reference_ids, _, reference_boxes = reference
+    candidate_ids, _, candidate_boxes = candidate
+    if len(reference_ids) == 0 and len(candidate_ids) == 0:
+        return 1.0
+    if len(reference_ids) == 0 or len(candidate_ids) == 0:
+        return 0.0
+    
+    a = reference_boxes[:, None, :].astype(np.float32)
+    b = candidate_boxes[None, :, :].astype(np.float32)
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    iou = intersection / np.maximum(area_a + area_b - intersection, 1e-6)
+    iou[reference_ids[:, None] != candidate_ids[None, :]] = 0.0
+    
+    # Greedy one-to-one matching, best overlaps first
+    matches = 0
+    while True:
+        r, c = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[r, c] < iou_threshold:
+            break
+        matches += 1
+        iou[r, :] = 0.0
+        iou[:, c] = 0.0
+    return 2.0 * matches / (len(reference_ids) + len(candidate_ids))
 
+def calibrate_yolo_backends(video_path=None, backends=YOLO_BACKENDS, imgsz_values=(YOLO_IMGSZ,),
+                            tolerance=CALIBRATION_TOLERANCE, num_runs=50):
+    """Times every backend/resolution per detector and picks the fastest one within `tolerance`.
 
-        intent_classifier.stop()
-        tts_thread.stop()
+    Accuracy is the mean per-frame agreement with the PyTorch model at
+    YOLO_IMGSZ on the validation clip. Returns a config for --yolo-backend.
+    """
+    if not video_path:
+        print("⚠️ Calibration without --video: random frames have no objects, so accuracy is not measured")
+    frames = load_benchmark_frames(video_path)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    
+    def run(detector, frame):
+        return detector(frame, verbose=False, conf=TOOLS_CONFIDENCE_THRESHOLD, device=device)
+    
+    config = {}
+    print("--- YOLO Backend Calibration ---")
+    for name, weights_path in DETECTOR_WEIGHTS.items():
+        reference_detector = load_yolo(weights_path, 'pytorch', YOLO_IMGSZ)
+        reference = [extract_detections(run(reference_detector, frame)) for frame in frames]
         
-        print(f"INFO: Average FPS: {avg_frame_rate:.1f}")
-        print("INFO: Program terminated")
+        candidates = []
+        for backend, imgsz in itertools.product(backends, imgsz_values):
+            try:
+                detector = load_yolo(weights_path, backend, imgsz)
+                warmup_yolo(detector, device)
+                stats = time_stage(lambda f: run(detector, f), frames, num_runs)
+                agreement = float(np.mean([detection_agreement(expected, extract_detections(run(detector, frame)))
+                                           for expected, frame in zip(reference, frames)]))
+            except Exception as e:
+                print(f"{name:>10} {backend:>10} @{imgsz:<5}: failed ({e})")
+                continue
+            accepted = agreement >= 1.0 - tolerance
+            candidates.append({'backend': backend, 'imgsz': imgsz, 'p50_ms': stats['p50_ms'],
+                               'agreement': agreement, 'accepted': accepted})
+            print(f"{name:>10} {backend:>10} @{imgsz:<5}: p50 {stats['p50_ms']:7.2f} ms | "
+                  f"agreement {agreement*100:5.1f}%{'' if accepted else ' (rejected)'}")
+        
+        accepted = [candidate for candidate in candidates if candidate['accepted']]
+        if not accepted:
+            print(f"⚠️ No backend within tolerance for '{name}', keeping PyTorch @{YOLO_IMGSZ}")
+            config[name] = {'backend': 'pytorch', 'imgsz': YOLO_IMGSZ}
+            continue
+        best = min(accepted, key=lambda candidate: candidate['p50_ms'])
+        config[name] = {'backend': best['backend'], 'imgsz': best['imgsz'],
+                        'p50_ms': best['p50_ms'], 'agreement': best['agreement']}
+        print(f"✅ {name}: {best['backend']} @{best['imgsz']} ({best['p50_ms']:.2f} ms)")
+    return config
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Intelligent Assistant for Tire Change")
+    parser.add_argument('--benchmark-preprocess', action='store_true',
+                        help="Compare the TensorFlow and NumPy MoViNet preprocessing paths and exit")
+    parser.add_argument('--benchmark-movinet', action='store_true',
+                        help="Compare compiled and predict_on_batch MoViNet streaming inference and exit")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Run the per-stage pipeline benchmark suite and exit")
+    parser.add_argument('--benchmark-runs', type=int, default=100,
+                        help="Timed runs per benchmark stage")
+    parser.add_argument('--benchmark-out', default=None,
+                        help="Save the benchmark report (JSON) to this file")
+    parser.add_argument('--benchmark-baseline', default=None,
+                        help="Compare the benchmark report with a previously saved JSON baseline")
+    parser.add_argument('--audio', default=None,
+                        help="16 kHz mono WAV file used for the Vosk benchmark (noise if omitted)")
+    parser.add_argument('--streams', nargs='+', metavar='SOURCE',
+                        help="Serve several cameras at once (webcam index, stream URL or video file)")
+    parser.add_argument('--headless', nargs='+', metavar='VIDEO',
+                        help="Process recorded videos (files or directories) without UI as fast as possible")
+    parser.add_argument('--events-out', default=None,
+                        help="JSONL log of state transitions and step completions (headless runs write "
+                             f"{HEADLESS_EVENTS_PATH} if omitted, multi-stream runs only when given)")
+    parser.add_argument('--observations-out', default=None,
+                        help="Log every detection/action observation (JSONL) so the session can be replayed")
+    parser.add_argument('--action-worker', choices=['thread', 'process'], default=ACTION_WORKER,
+                        help="Run MoViNet in a thread of this process or in a separate worker process")
+    parser.add_argument('--action-fps', type=float, default=ACTION_TARGET_FPS,
+                        help="Feed MoViNet at this rate of capture time, dropping or repeating frames "
+                             "(default: every frame the worker can take)")
+    parser.add_argument('--resource-profile', default=None,
+                        help="Thread budget profile: a built-in name (" + ", ".join(RESOURCE_PROFILES) +
+                             "), a JSON file or an inline JSON object")
+    parser.add_argument('--tune-resources', action='store_true',
+                        help="Search the thread split between PyTorch and TensorFlow (one process per candidate)")
+    parser.add_argument('--resource-out', default=None,
+                        help="Save the best profile found by --tune-resources (JSON)")
+    parser.add_argument('--resource-duration', type=float, default=10.0,
+                        help="Seconds of workload measured per candidate profile")
+    parser.add_argument('--resource-workload', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--yolo-backend', default=None,
+                        help="YOLO backend (" + ", ".join(YOLO_BACKENDS) + "), or a calibration result "
+                             "(JSON file or inline JSON) with settings per detector")
+    parser.add_argument('--yolo-imgsz', type=int, default=None,
+                        help=f"YOLO inference resolution (default: {YOLO_IMGSZ})")
+    parser.add_argument('--calibrate-yolo', action='store_true',
+                        help="Time every YOLO backend on --video and pick the fastest within the accuracy tolerance")
+    parser.add_argument('--calibration-imgsz', type=int, nargs='+', default=[YOLO_IMGSZ],
+                        help="Inference resolutions tried by --calibrate-yolo")
+    parser.add_argument('--calibration-tolerance', type=float, default=CALIBRATION_TOLERANCE,
+                        help="Max. loss in detection agreement accepted by --calibrate-yolo")
+    parser.add_argument('--yolo-out', default=None,
+                        help="Save the backends chosen by --calibrate-yolo (JSON, usable with --yolo-backend)")
+    parser.add_argument('--import-report', action='store_true',
+                        help="Print how long each dependency took to import when the program ends")
+    parser.add_argument('--build-tts-cache', action='store_true',
+                        help="Pre-render the greeting, fallback and FAQ answers to audio and exit")
+    parser.add_argument('--record-dir', default=None,
+                        help="Record per-frame detections and MoViNet probabilities (columnar) under this directory")
+    parser.add_argument('--replay', nargs='+', metavar='PATH',
+                        help="Replay observation logs or recording directories through the state machine "
+                             "without running any model")
+    parser.add_argument('--param', action='append', metavar='NAME=VALUE[,VALUE...]',
+                        help="Override a state machine threshold for --replay (several values form a sweep)")
+    parser.add_argument('--announce-banners', action='store_true',
+                        help="Also speak confirmation banners through text-to-speech")
+    parser.add_argument('--adaptive-detection', action='store_true',
+                        help="Run YOLO on keyframes only and track boxes with optical flow in between")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Periodically write stage latency metrics (Prometheus text format) to this file")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--video', default=None,
+                        help="Video file used for benchmark frames (random frames if omitted)")
+    return parser.parse_args()
 
 if __name__ == '__main__':
-    main_orchestrator()
\ No newline at end of file
+    args = parse_args()
+    if args.import_report:
+        atexit.register(print_import_report)
+    if args.resource_profile:
+        try:
+            apply_resource_profile(load_resource_profile(args.resource_profile))
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+    if args.yolo_backend or args.yolo_imgsz:
+        try:
+            configure_detectors(load_detector_config(args.yolo_backend, args.yolo_imgsz))
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+    if args.metrics_file or args.metrics_port:
+        METRICS.start_exporter(args.metrics_file, args.metrics_port)
+    if args.resource_workload:
+        print(RESOURCE_WORKLOAD_RESULT_PREFIX + json.dumps(run_resource_workload(args.video, args.resource_duration)))
+    elif args.tune_resources:
+        best_profile = tune_resource_profiles(args.video, args.resource_duration)
+        if best_profile is None:
+            sys.exit(1)
+        if args.resource_out:
+            with open(args.resource_out, 'w', encoding='utf-8') as f:
+                json.dump(best_profile, f, indent=2)
+            print(f"INFO: Best profile saved to {args.resource_out}")
+    elif args.calibrate_yolo:
+        detector_config = calibrate_yolo_backends(args.video, imgsz_values=args.calibration_imgsz,
+                                                  tolerance=args.calibration_tolerance,
+                                                  num_runs=args.benchmark_runs)
+        if args.yolo_out:
+            with open(args.yolo_out, 'w', encoding='utf-8') as f:
+                json.dump(detector_config, f, indent=2)
+            print(f"INFO: YOLO backends saved to {args.yolo_out}")
+    elif args.build_tts_cache:
+        build_tts_cache()
+    elif args.benchmark_preprocess:
+        benchmark_preprocessing(load_benchmark_frames(args.video))
+    elif args.benchmark_movinet:
+        benchmark_streaming_inference(RealTimeActionRecognizer(ACTION_WEIGHTS_PATH, ACTION_CONFIG_PATH),
+                                      load_benchmark_frames(args.video))
+    elif args.benchmark:
+        report = run_benchmark_suite(args.video, args.audio, args.benchmark_runs)
+        if args.benchmark_out:
+            with open(args.benchmark_out, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"INFO: Benchmark report saved to {args.benchmark_out}")
+        if args.benchmark_baseline:
+            with open(args.benchmark_baseline, 'r', encoding='utf-8') as f:
+                regressions = compare_benchmarks(report, json.load(f))
+            if regressions:
+                sys.exit(1)
+    elif args.replay:
+        try:
+            param_grid = parse_replay_params(args.param)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+        run_replay(args.replay, param_grid)
+    elif args.streams:
+        run_multi_stream(args.streams, args.events_out, args.adaptive_detection or ADAPTIVE_DETECTION,
+                         args.observations_out, args.record_dir, args.action_worker, args.action_fps)
+    elif args.headless:
+        run_headless(args.headless, args.events_out or HEADLESS_EVENTS_PATH, args.adaptive_detection or ADAPTIVE_DETECTION,
+                     args.observations_out, args.record_dir, args.action_fps)
+    else:
+        main_orchestrator(announce_banners=args.announce_banners or BANNER_ANNOUNCE_TTS,
+                          adaptive_detection=args.adaptive_detection or ADAPTIVE_DETECTION,
+                          observations_path=args.observations_out, record_dir=args.record_dir,
+                          action_worker=args.action_worker, action_fps=args.action_fps)
\ No newline at end of file
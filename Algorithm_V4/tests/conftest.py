@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ALGORITHM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ALGORITHM_DIR)
+
+
+@pytest.fixture(scope='session')
+def algo():
+    """The AlgoV4 module (NumPy and OpenCV are imported eagerly, everything else lazily)."""
+    pytest.importorskip('numpy')
+    pytest.importorskip('cv2')
+    import AlgoV4
+    return AlgoV4
+
+
+@pytest.fixture(scope='session')
+def faq_path():
+    return os.path.join(ALGORITHM_DIR, 'faq.json')
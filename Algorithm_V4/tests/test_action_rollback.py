@@ -0,0 +1,115 @@
+import queue
+from collections import deque
+
+CLASS_NAMES = ['loosen_bolts', 'lift_car_with_jack', 'remove_bolts']
+CLASS_SEQUENCE = [0, 0, 0, 1, 1, 1, 1, 1]  # Raw class of each streaming step
+
+
+class StubTensor:
+    def __init__(self, value):
+        self.value = value
+
+    def numpy(self):
+        return self.value
+
+
+def make_recognizer(algo, num_checkpoints=8):
+    """A RealTimeActionRecognizer whose streaming step is a stub: the state counts the steps run."""
+    np = algo.np
+
+    def streaming_step(image, states):
+        probabilities = np.full((1, len(CLASS_NAMES)), 0.1, dtype=np.float32)
+        probabilities[0, CLASS_SEQUENCE[states['step']]] = 0.8
+        return StubTensor(probabilities), {'step': states['step'] + 1}
+
+    recognizer = algo.RealTimeActionRecognizer.__new__(algo.RealTimeActionRecognizer)
+    recognizer.class_names = CLASS_NAMES
+    recognizer.num_classes = len(CLASS_NAMES)
+    recognizer.initial_states = {'step': 0}
+    recognizer.state_id = 0
+    recognizer.checkpoints = deque(maxlen=num_checkpoints)
+    recognizer.compiled_step = streaming_step
+    recognizer.smoother = algo.PredictionSmoother(len(CLASS_NAMES), window=3)
+    recognizer.reset_states()
+    return recognizer
+
+
+def run(algo, recognizer, num_steps):
+    frame = algo.np.zeros((4, 4, 3), dtype=algo.np.float32)
+    return [recognizer.predict_frame(frame) for _ in range(num_steps)]
+
+
+def test_rollback_restores_states_and_smoother(algo):
+    recognizer = make_recognizer(algo)
+    predictions = run(algo, recognizer, 5)
+    assert [p['state_id'] for p in predictions] == [1, 2, 3, 4, 5]
+    assert predictions[-1]['smoothed_prediction'] == 'lift_car_with_jack'
+
+    assert recognizer.rollback(3)
+    assert recognizer.states == {'step': 3}
+    assert [checkpoint[0] for checkpoint in recognizer.checkpoints] == [1, 2, 3]
+    assert recognizer.smoother.smoothed_class == 0
+
+    # The smoother window is back to three 'loosen_bolts', so one new step does not flip it
+    prediction = run(algo, recognizer, 1)[0]
+    assert prediction['state_id'] == 6  # Ids stay unique after a rollback
+    assert prediction['class_name'] == 'lift_car_with_jack'
+    assert prediction['smoothed_prediction'] == 'loosen_bolts'
+    assert recognizer.states == {'step': 4}
+
+
+def test_rollback_to_a_dropped_checkpoint_resets(algo):
+    recognizer = make_recognizer(algo, num_checkpoints=4)
+    run(algo, recognizer, 6)
+    assert [checkpoint[0] for checkpoint in recognizer.checkpoints] == [3, 4, 5, 6]
+    assert not recognizer.rollback(1)
+    assert recognizer.states == {'step': 0}
+    assert len(recognizer.checkpoints) == 0
+    assert recognizer.smoother.smoothed_class is None
+
+
+def test_thread_worker_applies_reset_and_rollback_in_order(algo):
+    recognizer = make_recognizer(algo)
+    recognizer.format_frame = lambda frame: frame
+    worker = algo.ActionThreadWorker(recognizer)
+    frame = algo.np.zeros((4, 4, 3), dtype=algo.np.float32)
+
+    def step():
+        assert worker.submit(frame)
+        return worker.output_queue.get(timeout=5.0)
+
+    try:
+        assert [step()['state_id'] for _ in range(3)] == [1, 2, 3]
+        worker.rollback(2)
+        prediction = step()
+        assert prediction['state_id'] == 4
+        assert recognizer.states == {'step': 3}  # Step 4 ran on the state saved after step 2
+
+        worker.reset()
+        step()
+        assert recognizer.states == {'step': 1}
+    finally:
+        worker.close()
+
+
+def test_thread_worker_resets_keep_smoother_counts_consistent(algo):
+    recognizer = make_recognizer(algo, num_checkpoints=4)
+    recognizer.format_frame = lambda frame: frame
+    recognizer.compiled_step = lambda image, states: (
+        StubTensor(algo.np.full((1, len(CLASS_NAMES)), 0.1, dtype=algo.np.float32)), states)
+    worker = algo.ActionThreadWorker(recognizer)
+    frame = algo.np.zeros((4, 4, 3), dtype=algo.np.float32)
+    for i in range(300):
+        while not worker.submit(frame):
+            worker.output_queue.get(timeout=5.0)
+        if i % 3 == 0:
+            worker.reset()
+    worker.input_queue.put(None)
+    while worker.thread.is_alive():  # Drain the predictions until the worker has run everything
+        try:
+            worker.output_queue.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    smoother = recognizer.smoother
+    assert smoother.counts.min() >= 0
+    assert smoother.counts.sum() == smoother.size
@@ -0,0 +1,95 @@
+import pytest
+
+
+def run(scheduler, capture_fps, duration_sec, start=0.0):
+    """Feeds every captured frame as often as the scheduler says; returns the counts fed."""
+    counts = []
+    for i in range(int(duration_sec * capture_fps)):
+        timestamp = start + i / capture_fps
+        count = scheduler.due(timestamp)
+        scheduler.feed(timestamp, count)
+        counts.append(count)
+    return counts
+
+
+def test_fast_capture_is_downsampled_to_the_target(algo):
+    scheduler = algo.ActionFrameScheduler(8)
+    counts = run(scheduler, 30, 10.0)
+    stats = scheduler.stats()
+    assert max(counts) == 1
+    assert stats['frames_fed'] + stats['frames_dropped'] == 300
+    assert stats['frames_fed'] == pytest.approx(80, abs=1)
+    assert stats['frames_duplicated'] == 0
+    assert stats['achieved_fps'] == pytest.approx(8, rel=0.02)
+    assert scheduler.achieved_fps() == pytest.approx(8, rel=0.05)
+
+
+def test_slow_capture_is_duplicated_up_to_the_target(algo):
+    scheduler = algo.ActionFrameScheduler(8)
+    counts = run(scheduler, 5, 10.0)
+    stats = scheduler.stats()
+    assert stats['frames_dropped'] == 0
+    assert stats['frames_duplicated'] == sum(counts) - len(counts) > 0
+    assert stats['achieved_fps'] == pytest.approx(8, rel=0.05)
+
+
+def test_frame_before_the_next_due_time_is_dropped(algo):
+    scheduler = algo.ActionFrameScheduler(8)
+    assert scheduler.due(0.0) == 1
+    scheduler.feed(0.0, 1)
+    assert scheduler.due(0.05) == 0
+    assert scheduler.due(0.125) == 1
+
+
+def test_backlog_is_capped_after_a_stall(algo):
+    scheduler = algo.ActionFrameScheduler(8, max_backlog=2)
+    scheduler.feed(0.0, scheduler.due(0.0))
+    assert scheduler.due(3.0) == 2
+    scheduler.feed(3.0, 1)  # Busy worker: only one could be fed
+    assert scheduler.due(3.01) == 1
+
+
+def test_reset_clears_the_schedule(algo):
+    scheduler = algo.ActionFrameScheduler(8)
+    run(scheduler, 30, 1.0)
+    scheduler.reset()
+    assert scheduler.stats()['frames_fed'] == 0
+    assert scheduler.achieved_fps() == 0.0
+    assert scheduler.due(100.0) == 1
+
+
+class CountingRecognizer:
+    """Stands in for RealTimeActionRecognizer; counts the streaming steps run."""
+    class_names = ['loosen_bolts']
+
+    def __init__(self):
+        self.steps = 0
+
+    def format_frame(self, frame):
+        return frame
+
+    def predict_frame(self, frame, return_probabilities=False):
+        self.steps += 1
+        return {'state_id': self.steps}
+
+
+def test_thread_worker_repeats_frames_of_slow_capture(algo):
+    recognizer = CountingRecognizer()
+    worker = algo.ActionThreadWorker(recognizer)
+    session = algo.TireChangeSession.__new__(algo.TireChangeSession)
+    session.async_action = True
+    session.action_worker = worker
+    session.action_scheduler = algo.ActionFrameScheduler(8)
+    frame = algo.np.zeros((4, 4, 3), dtype=algo.np.uint8)
+    try:
+        for i in range(20):  # 4 s captured at 5 FPS, each frame waits for the worker
+            prediction = session.next_action_prediction(frame, i / 5)
+            if prediction is None:  # Not polled yet, wait for it so the worker is free for the next frame
+                prediction = worker.output_queue.get(timeout=5.0)
+            assert prediction['state_id'] == recognizer.steps
+    finally:
+        worker.close()
+    stats = session.action_scheduler.stats()
+    assert stats['frames_duplicated'] > 0
+    assert recognizer.steps == stats['frames_fed']
+    assert stats['achieved_fps'] == pytest.approx(8, rel=0.1)
@@ -0,0 +1,29 @@
+import json
+import os
+
+import pytest
+
+
+class FailingContext:
+    """A spawn context whose processes cannot be created."""
+    def __init__(self, context):
+        self.context = context
+
+    def Pipe(self):
+        return self.context.Pipe()
+
+    def Process(self, *args, **kwargs):
+        raise OSError("cannot spawn")
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason="needs /dev/shm to list shared memory segments")
+def test_process_worker_unlinks_shared_memory_when_start_fails(algo, monkeypatch, tmp_path):
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({'class_names': ['loosen_bolts'], 'resolution': 8}))
+    get_context = algo.multiprocessing.get_context
+    monkeypatch.setattr(algo.multiprocessing, 'get_context', lambda method: FailingContext(get_context(method)))
+
+    segments = set(os.listdir('/dev/shm'))
+    with pytest.raises(OSError, match="cannot spawn"):
+        algo.ActionProcessWorker('unused.weights.h5', str(config_path))
+    assert set(os.listdir('/dev/shm')) == segments
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def index(algo, faq_path):
+    with open(faq_path, 'r', encoding='utf-8') as f:
+        faq_data = json.load(f)
+    classifier = algo.IntentClassifier.__new__(algo.IntentClassifier)
+    return algo.FAQRetrievalIndex(faq_data, classifier.preprocess_text)
+
+
+@pytest.mark.parametrize('question, faq_id', [
+    ("What should I do first when changing a tire?", 1),
+    ("Where do I place the jack?", 2),
+    ("How do I loosen the lug nuts?", 3),
+    ("How high should I lift the car?", 5),
+    ("How do I tighten the lug nuts correctly?", 9),
+    ("What if I don't have a jack?", 11),
+])
+def test_faq_questions_retrieve_themselves(index, question, faq_id):
+    entry, score = index.query(question)
+    assert entry['id'] == faq_id
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.parametrize('utterance, intent', [
+    ("where do I put the jack", 'Jack Placement'),
+    ("which tools do I need", 'Tool List'),
+    ("HOW do i loosen the lug nuts", 'Loosening Lug Nuts'),
+])
+def test_paraphrases_retrieve_their_intent(index, utterance, intent):
+    entry, score = index.query(utterance)
+    assert entry['intent'] == intent
+    assert 0.0 < score <= 1.0 + 1e-5
+
+
+def test_unknown_words_retrieve_nothing(index):
+    assert index.query("zyxwv qwerty") == (None, 0.0)
+    assert index.query("") == (None, 0.0)
+
+
+class StubRecognizer:
+    def __init__(self, partial):
+        self.partial = partial
+
+    def PartialResult(self):
+        return json.dumps({'partial': self.partial})
+
+
+def make_classifier(algo, index, partial, intent, probability):
+    classifier = algo.IntentClassifier.__new__(algo.IntentClassifier)
+    classifier.retrieval_index = index
+    classifier.intent_to_answer_map = {}
+    classifier.predict_intent = lambda text: (intent, probability)
+    classifier.recognizer = StubRecognizer(partial)
+    classifier.tts_queue = algo.queue.Queue()
+    classifier.partial_text = partial
+    classifier.partial_since = 0.0
+    classifier.speculative_answer = None
+    return classifier
+
+
+def test_low_probability_fallback_is_not_answered_speculatively(algo, index):
+    # Similar enough for the FAQ fallback, but below the fast path: the similarity must not pass as a probability
+    partial = "where do I put the jack"
+    entry, similarity = index.query(partial)
+    assert algo.FAQ_MATCH_MIN_SIMILARITY <= similarity < algo.FAQ_FAST_PATH_SIMILARITY
+    classifier = make_classifier(algo, index, partial, 'Tool List', 0.2)
+    assert classifier.respond(partial)[3] == "FAQ fallback"
+    classifier.handle_partial_result(10.0)
+    assert classifier.speculative_answer is None
+    assert classifier.tts_queue.empty()
+
+
+def test_verbatim_faq_question_is_answered_speculatively(algo, index):
+    partial = "Where do I place the jack?"
+    classifier = make_classifier(algo, index, partial, 'Tool List', 0.2)
+    classifier.handle_partial_result(10.0)
+    assert classifier.speculative_answer == index.query(partial)[0]['answer']
+    assert classifier.tts_queue.get_nowait() == classifier.speculative_answer
@@ -0,0 +1,36 @@
+import threading
+
+
+class StallingCapture:
+    """A live source that stalls until released, then delivers one frame and fails."""
+    def __init__(self, np):
+        self.frame = np.zeros((4, 4, 3), dtype=np.uint8)
+        self.resume = threading.Event()
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        if self.reads == 1:
+            self.resume.wait(timeout=5.0)
+            return True, self.frame
+        return False, None
+
+    def release(self):
+        self.resume.set()
+
+
+def test_latest_frame_reader_times_out_without_ending(algo):
+    capture = StallingCapture(algo.np)
+    reader = algo.LatestFrameReader(capture).start()
+    try:
+        assert reader.read(timeout=0.05) == (False, None, None)
+        assert not reader.ended  # A stall is not the end of the stream
+
+        capture.resume.set()
+        ret, frame, timestamp = reader.read(timeout=5.0)
+        assert ret and frame is capture.frame and timestamp is not None
+
+        assert reader.read(timeout=5.0) == (False, None, None)
+        assert reader.ended  # The failed read is
+    finally:
+        reader.release()
@@ -0,0 +1,57 @@
+import json
+import os
+
+import pytest
+
+from conftest import ALGORITHM_DIR
+
+MAX_LEN = 12
+UTTERANCES = [
+    "What should I do first when changing a tire?",
+    "how do i LOOSEN the lug nuts",
+    "Where's the spare? I can't find the jack, the wrench or anything else in this car at all!",
+    "completely unknown zyxwv words",
+    "",
+]
+
+
+def make_classifier(algo, tokenizer):
+    """An IntentClassifier with just the tokenizer part of the predictor (no models loaded)."""
+    classifier = algo.IntentClassifier.__new__(algo.IntentClassifier)
+    classifier.predictor = {'max_len': MAX_LEN, 'input_dtype': algo.np.int32,
+                            **classifier.build_vocabulary(tokenizer)}
+    return classifier
+
+
+def keras_sequence(tf, tokenizer, text):
+    sequence = tokenizer.texts_to_sequences([text])
+    return tf.keras.preprocessing.sequence.pad_sequences(sequence, maxlen=MAX_LEN, padding='post',
+                                                         truncating='post')
+
+
+@pytest.fixture(scope='module')
+def tf():
+    return pytest.importorskip('tensorflow')
+
+
+@pytest.fixture(scope='module')
+def tokenizers(tf):
+    with open(os.path.join(ALGORITHM_DIR, 'intent_model_bilstm_tf', 'tokenizer.json'), 'r', encoding='utf-8') as f:
+        shipped = tf.keras.preprocessing.text.tokenizer_from_json(f.read())
+    with open(os.path.join(ALGORITHM_DIR, 'faq.json'), 'r', encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f)]
+    limited = tf.keras.preprocessing.text.Tokenizer(num_words=20, oov_token='<UNK>')
+    limited.fit_on_texts(questions)
+    no_oov = tf.keras.preprocessing.text.Tokenizer(num_words=20)
+    no_oov.fit_on_texts(questions)
+    return {'shipped': shipped, 'num_words': limited, 'no_oov_token': no_oov}
+
+
+@pytest.mark.parametrize('name', ['shipped', 'num_words', 'no_oov_token'])
+@pytest.mark.parametrize('utterance', UTTERANCES)
+def test_text_to_sequence_matches_keras(algo, tf, tokenizers, name, utterance):
+    tokenizer = tokenizers[name]
+    classifier = make_classifier(algo, tokenizer)
+    processed = classifier.preprocess_text(utterance)
+    algo.np.testing.assert_array_equal(classifier.text_to_sequence(processed),
+                                       keras_sequence(tf, tokenizer, processed))
@@ -0,0 +1,64 @@
+import pytest
+
+BOX = [260, 180, 380, 300]
+
+
+@pytest.fixture(scope='module')
+def texture(algo):
+    """A smooth random grayscale texture (trackable everywhere), as a 480x640 BGR frame."""
+    np, cv2 = algo.np, algo.cv2
+    noise = np.random.default_rng(0).integers(0, 256, (480, 640)).astype(np.float32)
+    gray = cv2.normalize(cv2.GaussianBlur(noise, (0, 0), 3), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def shifted(algo, frame, dx, dy):
+    return algo.np.roll(frame, (dy, dx), axis=(0, 1))
+
+
+def detections(algo):
+    np = algo.np
+    return (np.array([1], dtype=np.int32), np.array([0.9], dtype=np.float32), np.array([BOX], dtype=np.int32))
+
+
+def test_box_follows_a_translation(algo, texture):
+    tracker = algo.KeyframeTracker()
+    assert tracker.needs_keyframe()
+    tracker.keyframe(texture, detections(algo))
+    class_ids, confidences, xyxy = tracker.propagate(shifted(algo, texture, 4, -3))
+    assert class_ids.tolist() == [1]
+    assert confidences.tolist() == pytest.approx([0.9])
+    assert xyxy[0].tolist() == pytest.approx([BOX[0] + 4, BOX[1] - 3, BOX[2] + 4, BOX[3] - 3], abs=1)
+    assert tracker.tracking_confidence > algo.TRACKING_MIN_CONFIDENCE
+    assert tracker.motion_px == pytest.approx(5.0, abs=0.5)
+
+
+def test_keyframe_is_needed_after_the_interval(algo, texture):
+    tracker = algo.KeyframeTracker(min_interval=2)
+    tracker.keyframe(texture, detections(algo))
+    tracker.propagate(texture)
+    assert not tracker.needs_keyframe()
+    tracker.propagate(texture)
+    assert tracker.needs_keyframe()
+    assert tracker.stats()['keyframe_ratio'] == pytest.approx(1 / 3)
+
+
+def test_interval_adapts_to_motion(algo, texture):
+    tracker = algo.KeyframeTracker(min_interval=2, max_interval=10)
+    tracker.keyframe(texture, detections(algo))
+    tracker.propagate(texture)  # Still scene: the interval grows by one
+    tracker.keyframe(texture, detections(algo))
+    assert tracker.interval == 3
+
+    tracker.interval = 8
+    tracker.propagate(shifted(algo, texture, 8, 0))  # Fast motion: the interval is halved
+    tracker.keyframe(shifted(algo, texture, 8, 0), detections(algo))
+    assert tracker.interval == 4
+
+
+def test_reset_forces_a_keyframe(algo, texture):
+    tracker = algo.KeyframeTracker()
+    tracker.keyframe(texture, detections(algo))
+    tracker.reset()
+    assert tracker.needs_keyframe()
+    assert len(tracker.detections[0]) == 0
@@ -0,0 +1,35 @@
+import threading
+
+
+def test_render_prometheus(algo):
+    metrics = algo.Metrics()
+    metrics.observe('yolo_inference', 3.0)
+    metrics.increment('movinet_frames_dropped', 2)
+    metrics.set_gauge('audio_queue_depth', 4)
+    text = metrics.render_prometheus()
+    prefix = algo.METRICS_PREFIX
+    assert f'{prefix}_stage_latency_ms_bucket{{stage="yolo_inference",le="5"}} 1' in text
+    assert f'{prefix}_stage_latency_ms_count{{stage="yolo_inference"}} 1' in text
+    assert f'{prefix}_movinet_frames_dropped_total 2' in text
+    assert f'{prefix}_audio_queue_depth 4' in text
+
+
+def test_render_while_gauges_are_created(algo):
+    metrics = algo.Metrics()
+    stop = threading.Event()
+
+    def create_gauges():
+        i = 0
+        while not stop.is_set():
+            # A bounded set of names, created and updated while the renders sort them
+            metrics.set_gauge(f'stream_{i % 64}_batch_size', i)
+            i += 1
+
+    writer = threading.Thread(target=create_gauges)
+    writer.start()
+    try:
+        for _ in range(200):
+            metrics.render_prometheus()
+    finally:
+        stop.set()
+        writer.join()
@@ -0,0 +1,72 @@
+import pytest
+
+
+def realistic_messages(algo):
+    """(message, y_offset, style) as drawn by the state machine, including overflowing lines."""
+    return [
+        ("STEP 1: Detect Flat Tire", algo.Y_OFFSET_STEP_TITLE, {'color': (200, 200, 255)}),
+        ("Validating Flat Tire: 3.2s", algo.Y_OFFSET_STATUS_VALIDATION, {'color': (0, 255, 255)}),
+        ("STEP 2: Collect Required Tools", algo.Y_OFFSET_STEP_TITLE, {'color': (200, 200, 200)}),
+        ("Validating Car_Jack: 3.2s | Searching Wheel_Wrench: 1.1s | Validating Spare: 0.4s",
+         algo.Y_OFFSET_STATUS_VALIDATION, {'color': (0, 255, 255)}),
+        ("Collected: Car_Jack", algo.Y_OFFSET_COLLECTED_LIST, {'color': (100, 200, 100)}),
+        ("Needed: Wheel_Wrench", algo.Y_OFFSET_NEEDED_LIST, {'color': (255, 180, 0)}),
+        ("Action: loosen_bolts (0.87)", algo.Y_OFFSET_MAIN_INSTRUCTION, {'color': (255, 255, 0)}),
+        ("Validation: 7/15", algo.Y_OFFSET_ACTION_PROGRESS, {'color': (0, 255, 255)}),
+        ("Step Completed!", algo.Y_OFFSET_CONFIRMATION_MSG, {'color': (0, 255, 0)}),
+        ("ALL STEPS COMPLETED!", algo.Y_OFFSET_CONFIRMATION_MSG, {'color': (0, 255, 0), 'font_scale': 1.0}),
+        ("FLAT TIRE CONFIRMED", algo.Y_OFFSET_MAIN_INSTRUCTION, {'color': (0, 255, 0), 'font_scale': 2.0,
+                                                                  'thickness': 3}),
+        ("Top", 5, {'color': (255, 255, 255)}),  # Box clamped to the top edge
+    ]
+
+
+@pytest.mark.parametrize('repeat', [1, 3])  # First draw renders the patch, later ones reuse it
+def test_overlay_compositor_matches_direct_drawing(algo, repeat):
+    np = algo.np
+    rng = np.random.default_rng(0)
+    defaults = {'color': (255, 255, 0), 'font_scale': 0.7, 'thickness': 2, 'bg_color': (0, 0, 0)}
+    compositor = algo.OverlayCompositor()
+    for message, y_offset, style in realistic_messages(algo):
+        style = {**defaults, **style}
+        for _ in range(repeat):
+            frame = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+            expected = frame.copy()
+            algo.draw_message_direct(expected, message, y_offset, **style)
+            compositor.draw(frame, message, y_offset, **style)
+            np.testing.assert_array_equal(frame, expected, err_msg=message)
+    assert compositor.hits == (repeat - 1) * len(realistic_messages(algo))
+
+
+def test_banner_and_status_line_are_both_visible(algo):
+    np = algo.np
+    machine = algo.TireChangeStateMachine(config={'VALIDATION_DURATION_SEC': 1.0}, verbose=False)
+    machine.state = algo.STATE_COLLECTING_TOOLS
+    banners = algo.BannerScheduler()
+    # Car_Jack is confirmed at t = 1.0 while Wheel_Wrench, seen later, is still being validated
+    machine.observe_detections(0.0, [('Car_Jack', 0.9)])
+    for now in (0.5, 1.0, 1.25):
+        machine.observe_detections(now, [('Car_Jack', 0.9), ('Wheel_Wrench', 0.9)])
+        for message, duration_sec, y_offset, style in machine.banners:
+            banners.show(now, message, duration_sec, y_offset, **style)
+
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    status_lines = [(message, y_offset, style) for message, y_offset, style in machine.messages
+                    if y_offset == algo.Y_OFFSET_STATUS_VALIDATION]
+    assert [message for message, _, _ in status_lines] == ["Validating Wheel_Wrench: 0.2s"]
+    for message, y_offset, style in machine.messages:
+        algo.display_message(frame, message, y_offset, **style)
+    banners.draw(frame, 1.25)
+    assert [banner['message'] for banner in banners.banners] == ["Car_Jack Confirmed!"]
+
+    # Each box must look exactly as if it were drawn alone
+    defaults = {'color': (255, 255, 0), 'font_scale': 0.7, 'thickness': 2, 'bg_color': (0, 0, 0)}
+    banner = banners.banners[0]
+    for message, y_offset, style in [status_lines[0], (banner['message'], banner['y_offset'], banner['style'])]:
+        style = {**defaults, **style}
+        alone = np.zeros_like(frame)
+        algo.draw_message_direct(alone, message, y_offset, **style)
+        (x, y, width, height), _, _, _ = algo.message_layout(
+            frame.shape, message, y_offset, style['font_scale'], style['thickness'])
+        np.testing.assert_array_equal(frame[y:y + height, x:x + width], alone[y:y + height, x:x + width],
+                                      err_msg=message)
@@ -0,0 +1,49 @@
+import pytest
+
+
+def one_hot(np, class_id, num_classes=3):
+    probabilities = np.zeros(num_classes, dtype=np.float32)
+    probabilities[class_id] = 1.0
+    return probabilities
+
+
+def feed(algo, smoother, class_ids):
+    return [smoother.update(class_id, one_hot(algo.np, class_id)) for class_id in class_ids]
+
+
+def test_vote_keeps_the_previous_winner_on_a_tie(algo):
+    smoother = algo.PredictionSmoother(3, window=5)
+    # 1, 1 | 0 (1 still leads) | 0 (2:2 tie, 1 kept although argmax picks 0) | 0 (0 leads)
+    assert feed(algo, smoother, [1, 1, 0, 0, 0]) == [1, 1, 1, 1, 0]
+
+
+def test_vote_window_forgets_old_predictions(algo):
+    smoother = algo.PredictionSmoother(3, window=3)
+    feed(algo, smoother, [0, 0, 0])
+    assert feed(algo, smoother, [2, 2, 2]) == [0, 2, 2]
+    assert smoother.counts.tolist() == [0, 0, 3]
+
+
+def test_ema_follows_probabilities(algo):
+    smoother = algo.PredictionSmoother(3, mode='ema', ema_alpha=0.5)
+    # EMA of class 1: 0 -> 0.5 (tie, lowest class wins) -> 0.75
+    assert feed(algo, smoother, [0, 1, 1]) == [0, 0, 1]
+    assert smoother.ema.tolist() == pytest.approx([0.25, 0.75, 0.0])
+
+
+def test_reset_and_snapshot(algo):
+    smoother = algo.PredictionSmoother(3, window=3)
+    feed(algo, smoother, [1, 1])
+    snapshot = smoother.snapshot()
+    feed(algo, smoother, [2, 2, 2])
+    smoother.restore(snapshot)
+    assert smoother.smoothed_class == 1
+    assert feed(algo, smoother, [2]) == [1]
+    smoother.reset()
+    assert smoother.smoothed_class is None
+    assert feed(algo, smoother, [2]) == [2]
+
+
+def test_unknown_mode_is_rejected(algo):
+    with pytest.raises(ValueError):
+        algo.PredictionSmoother(3, mode='median')
@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.mark.parametrize('resolution', [240, 172])  # 240 is the shipped streaming_model_config.json
+@pytest.mark.parametrize('shape', [(480, 640, 3), (720, 1280, 3), (481, 353, 3), (239, 321, 3),
+                                   (101, 77, 3), (240, 240, 3)])
+def test_frame_preprocessor_matches_tensorflow(algo, resolution, shape):
+    pytest.importorskip('tensorflow')
+    np = algo.np
+    frames = [np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8) for seed in range(3)]
+    # Same float32 operations in the same order as TensorFlow's kernels, so the output is bit-identical
+    assert algo.check_preprocessing_parity(frames, resolution=resolution) == 0.0
+
+def test_frame_preprocessor_letterbox_and_buffer_ring(algo):
+    np = algo.np
+    preprocessor = algo.FramePreprocessor(240, num_buffers=2)
+    frame = np.full((480, 640, 3), (255, 0, 0), dtype=np.uint8)  # Pure blue (BGR)
+
+    first = preprocessor(frame)
+    assert first.shape == (240, 240, 3) and first.dtype == np.float32
+    assert preprocessor.last_buffer == 0
+    # 640x480 -> 240x180 content, padded by 30 rows above and below
+    assert np.all(first[:30] == 0.0) and np.all(first[210:] == 0.0)
+    np.testing.assert_allclose(first[30:210], np.broadcast_to([0.0, 0.0, 1.0], (180, 240, 3)), atol=1e-6)
+
+    second = preprocessor(frame)
+    assert second is not first and preprocessor.last_buffer == 1
+    assert preprocessor(frame) is first  # The ring wraps around
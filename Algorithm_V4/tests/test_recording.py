@@ -0,0 +1,63 @@
+import pytest
+
+ACTION_CLASSES = ['loosen_bolts', 'jack_up_car', 'remove_wheel']
+TOOL_LABELS = {0: 'Car_Jack', 1: 'Wheel_Wrench'}
+
+
+def detections(np, class_ids, confidences):
+    boxes = np.array([[10 * i, 20 * i, 10 * i + 50, 20 * i + 60] for i in range(len(class_ids))],
+                     dtype=np.int32).reshape(-1, 4)
+    return np.array(class_ids, dtype=np.int32), np.array(confidences, dtype=np.float32), boxes
+
+
+def write_recording(algo, directory):
+    np = algo.np
+    recorder = algo.InferenceRecorder(str(directory), video='flat.mp4')
+    recorder.write_detections(0.0, 'tools', TOOL_LABELS, detections(np, [0, 1], [0.9, 0.75]))
+    recorder.write_detections(0.5, 'tools', TOOL_LABELS, detections(np, [], []))
+    recorder.write_action(1.0, ACTION_CLASSES, None)
+    recorder.write_action(1.5, ACTION_CLASSES, {'smoothed_prediction': 'jack_up_car', 'confidence': 0.8,
+                                                'all_probabilities': [0.1, 0.8, 0.1]})
+    recorder.close()
+
+
+def test_recording_round_trip(algo, tmp_path):
+    write_recording(algo, tmp_path)
+    recording = algo.InferenceRecording(str(tmp_path))
+    assert len(recording) == 4
+    assert recording.metadata == {'video': 'flat.mp4'}
+    assert recording.timestamps.tolist() == [0.0, 0.5, 1.0, 1.5]
+
+    boxes = recording.frame_detections(0)
+    assert boxes['class_id'].tolist() == [0, 1]
+    assert boxes['box'].tolist() == [[0, 0, 50, 60], [10, 20, 60, 80]]
+    assert len(recording.frame_detections(1)) == 0
+    assert recording.frame_probabilities(2) is None
+    assert recording.frame_probabilities(3).tolist() == pytest.approx([0.1, 0.8, 0.1], abs=1e-3)
+
+    observations = list(recording.observations())
+    assert [o['kind'] for o in observations] == ['detections', 'detections', 'action', 'action']
+    assert [name for name, _ in observations[0]['detections']] == ['Car_Jack', 'Wheel_Wrench']
+    assert observations[0]['detections'][1][1] == pytest.approx(0.75)
+    assert observations[0]['detection_floor'] == algo.DETECTION_CONFIDENCE_FLOOR
+    assert observations[1]['detections'] == []
+    assert observations[2]['prediction'] is None
+    assert observations[3]['prediction']['smoothed_prediction'] == 'jack_up_car'
+    assert observations[3]['prediction']['confidence'] == pytest.approx(0.8)
+
+
+def test_recording_cut_short_drops_incomplete_frames(algo, tmp_path):
+    write_recording(algo, tmp_path)
+    probabilities = tmp_path / 'probabilities.bin'
+    probabilities.write_bytes(probabilities.read_bytes()[:-2])  # Last vector only partially written
+    recording = algo.InferenceRecording(str(tmp_path))
+    assert len(recording) == 3
+
+
+def test_replay_skips_empty_recordings(algo, tmp_path):
+    write_recording(algo, tmp_path / 'recorded')
+    algo.InferenceRecorder(str(tmp_path / 'failed_to_open')).close()
+    assert algo.find_recordings(str(tmp_path)) == [str(tmp_path / 'failed_to_open'), str(tmp_path / 'recorded')]
+    results = algo.run_replay([str(tmp_path)])
+    assert len(results) == 1
+    assert len(results[0]['sessions']) == 1
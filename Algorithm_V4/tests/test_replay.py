@@ -0,0 +1,20 @@
+import pytest
+
+
+def detection_session(algo, floor):
+    observation = {'timestamp': 0.0, 'state': algo.STATE_DETECTING_FLAT_TIRE, 'kind': 'detections',
+                   'detections': [(algo.FLAT_TIRE_CLASS_NAME, 0.9)]}
+    if floor is not None:
+        observation['detection_floor'] = floor
+    return [observation]
+
+
+def test_replay_rejects_thresholds_below_the_recording_floor(algo):
+    sessions = [detection_session(algo, 0.6)]
+    algo.check_replay_params(sessions, {'TOOLS_CONFIDENCE_THRESHOLD': [0.6, 0.7]})
+    with pytest.raises(ValueError, match='0.4'):
+        algo.check_replay_params(sessions, {'TOOLS_CONFIDENCE_THRESHOLD': [0.4, 0.7]})
+
+
+def test_replay_accepts_any_threshold_without_a_recorded_floor(algo):
+    algo.check_replay_params([detection_session(algo, None)], {'TOOLS_CONFIDENCE_THRESHOLD': [0.1]})
@@ -0,0 +1,28 @@
+import concurrent.futures
+import threading
+import time
+
+
+def test_stages_are_measured_concurrently(algo):
+    lock = threading.Lock()
+    running = set()
+    overlapped = []
+
+    def stage(name):
+        def run(frame):
+            with lock:
+                running.add(name)
+                overlapped.append(len(running) == 2)
+            time.sleep(0.002)
+            with lock:
+                running.discard(name)
+        return run
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    try:
+        main_rate, background_rate = algo.measure_concurrent_throughput(
+            stage('yolo'), stage('movinet'), [None], 0.2, executor)
+    finally:
+        executor.shutdown()
+    assert main_rate > 0 and background_rate > 0
+    assert any(overlapped)  # Run one after the other, the stages would never be active at once
@@ -0,0 +1,175 @@
+import pytest
+
+FPS = 4  # Observation rate of the synthetic sessions (timestamps are exact binary fractions)
+
+
+def flat_tire(algo, confidence=0.9):
+    return [(algo.FLAT_TIRE_CLASS_NAME, confidence)]
+
+
+def tools(algo, confidence=0.9):
+    return [(tool, confidence) for tool in sorted(algo.REQUIRED_TOOLS_CLASSES)]
+
+
+def prediction(step, confidence=0.9):
+    return {'smoothed_prediction': step, 'confidence': confidence}
+
+
+def full_session(algo):
+    """Observations of a complete tire change: 5 s flat tire, 5 s tools, then every action step."""
+    observations = []
+    frame = 0
+
+    def add(kind, **fields):
+        nonlocal frame
+        observations.append({'timestamp': frame / FPS, 'kind': kind, **fields})
+        frame += 1
+
+    for _ in range(21):  # t = 0 .. 5.0
+        add('detections', detections=flat_tire(algo))
+    for _ in range(22):  # t = 5.25 .. 10.5
+        add('detections', detections=tools(algo))
+    for step in algo.ACTION_STEPS:
+        for _ in range(algo.ACTION_VALIDATION_FRAMES):
+            add('action', prediction=prediction(step))
+    return observations
+
+
+@pytest.fixture
+def machine(algo):
+    events = []
+    machine = algo.TireChangeStateMachine(event_sink=events.append, verbose=False)
+    machine.events = events
+    return machine
+
+
+def feed_detections(machine, start, end, detections):
+    """Observes `detections` at every frame time in [start, end]."""
+    for frame in range(int(start * FPS), int(end * FPS) + 1):
+        machine.observe_detections(frame / FPS, detections)
+
+
+def test_flat_tire_confirmed_after_validation_duration(algo, machine):
+    feed_detections(machine, 0.0, 4.75, flat_tire(algo))
+    assert machine.state == algo.STATE_DETECTING_FLAT_TIRE
+    machine.observe_detections(5.0, flat_tire(algo))
+    assert machine.state == algo.STATE_COLLECTING_TOOLS
+    assert machine.events[-1]['event'] == 'state_transition' and machine.events[-1]['timestamp'] == 5.0
+    assert [banner[0] for banner in machine.banners] == ["Flat Tire Confirmed!"]
+
+
+def test_flat_tire_survives_short_loss_within_grace_period(algo, machine):
+    feed_detections(machine, 0.0, 2.0, flat_tire(algo))
+    feed_detections(machine, 2.25, 4.0, [])  # 1.75 s < GRACE_PERIOD_DURATION_SEC
+    feed_detections(machine, 4.25, 5.0, flat_tire(algo))
+    assert machine.state == algo.STATE_COLLECTING_TOOLS
+
+
+def test_flat_tire_validation_restarts_after_grace_period(algo, machine):
+    feed_detections(machine, 0.0, 2.0, flat_tire(algo))
+    feed_detections(machine, 2.25, 5.0, [])  # 2.75 s > GRACE_PERIOD_DURATION_SEC
+    feed_detections(machine, 5.25, 10.0, flat_tire(algo))
+    assert machine.state == algo.STATE_DETECTING_FLAT_TIRE
+    machine.observe_detections(10.25, flat_tire(algo))
+    assert machine.state == algo.STATE_COLLECTING_TOOLS
+
+
+def test_detections_below_threshold_are_ignored(algo, machine):
+    feed_detections(machine, 0.0, 10.0, flat_tire(algo, confidence=algo.TOOLS_CONFIDENCE_THRESHOLD - 0.1))
+    assert machine.state == algo.STATE_DETECTING_FLAT_TIRE
+    assert machine.flat_tire_validation_start_time is None
+
+
+def test_unknown_config_key_is_rejected(algo):
+    with pytest.raises(ValueError, match='NOT_A_PARAMETER'):
+        algo.TireChangeStateMachine({'NOT_A_PARAMETER': 1})
+
+
+def test_full_session_completes_every_step(algo, machine):
+    step_resets = 0
+    for observation in full_session(algo):
+        if observation['kind'] == 'detections':
+            machine.observe_detections(observation['timestamp'], observation['detections'])
+        else:
+            machine.observe_action(observation['timestamp'], observation['prediction'])
+            step_resets += machine.reset_requested
+    names = [event['event'] for event in machine.events]
+    assert names.count('tool_confirmed') == len(algo.REQUIRED_TOOLS_CLASSES)
+    assert names.count('step_completed') == len(algo.ACTION_STEPS)
+    assert names[-1] == 'session_completed'
+    assert machine.completed
+    assert step_resets == len(algo.ACTION_STEPS) - 1  # MoViNet is reset between steps
+
+
+def test_wrong_action_decays_validation(algo, machine):
+    machine.state = algo.STATE_ACTION_RECOGNITION
+    for i in range(5):
+        machine.observe_action(float(i), prediction(algo.ACTION_STEPS[0]))
+    for i in range(5, 8):
+        machine.observe_action(float(i), prediction(algo.ACTION_STEPS[1]))
+    assert machine.action_validation_count == 2
+    assert machine.current_action_step == 0
+
+
+def test_replay_session_summary(algo):
+    summary = algo.replay_session(full_session(algo))
+    assert summary['completed']
+    assert summary['steps_completed'] == len(algo.ACTION_STEPS)
+    assert summary['transitions'] == [(algo.STATE_COLLECTING_TOOLS, 5.0), (algo.STATE_ACTION_RECOGNITION, 10.5)]
+    assert summary['mismatched_observations'] == 0
+
+
+def test_replay_session_with_shorter_validation(algo):
+    summary = algo.replay_session(full_session(algo), {'VALIDATION_DURATION_SEC': 4.0})
+    assert summary['completed']
+    assert summary['transitions'] == [(algo.STATE_COLLECTING_TOOLS, 4.0), (algo.STATE_ACTION_RECOGNITION, 9.5)]
+    assert summary['mismatched_observations'] == 4  # Tool detections recorded after t = 9.5
+
+
+def test_replay_session_with_longer_validation(algo):
+    summary = algo.replay_session(full_session(algo), {'VALIDATION_DURATION_SEC': 7.0})
+    assert not summary['completed']
+    assert summary['final_state'] == algo.STATE_DETECTING_FLAT_TIRE
+    assert summary['transitions'] == []
+    assert summary['mismatched_observations'] == len(algo.ACTION_STEPS) * algo.ACTION_VALIDATION_FRAMES
+
+
+def test_parse_replay_params(algo):
+    grid = algo.parse_replay_params(['validation_duration_sec=3,4', 'ACTION_VALIDATION_FRAMES=10'])
+    assert grid == {'VALIDATION_DURATION_SEC': [3.0, 4.0], 'ACTION_VALIDATION_FRAMES': [10]}
+    with pytest.raises(ValueError):
+        algo.parse_replay_params(['UNKNOWN=1'])
+
+
+def observe_dip(algo, rollback, dipped_confidence):
+    """Two confident predictions of the first step, then one `dipped_confidence` lower by >= the reset drop."""
+    machine = algo.TireChangeStateMachine({'ACTION_STATE_ROLLBACK': rollback}, verbose=False)
+    machine.state = algo.STATE_ACTION_RECOGNITION
+    step = algo.ACTION_STEPS[0]
+    for state_id in (1, 2):
+        machine.observe_action(float(state_id), {**prediction(step), 'state_id': state_id})
+    machine.observe_action(3.0, {**prediction(step, dipped_confidence), 'state_id': 3})
+    return machine
+
+
+@pytest.mark.parametrize('rollback', [True, False])
+def test_confident_dip(algo, rollback):
+    machine = observe_dip(algo, rollback, 0.8)
+    # With rollback, a still confident state is kept; without it, every dip resets MoViNet
+    assert machine.reset_requested == (not rollback)
+    assert machine.rollback_state_id is None
+    assert machine.action_validation_count == 3
+
+
+@pytest.mark.parametrize('rollback, state_id', [(True, 2), (False, None)])
+def test_unconfident_dip(algo, rollback, state_id):
+    machine = observe_dip(algo, rollback, 0.5)
+    assert machine.reset_requested
+    assert machine.rollback_state_id == state_id
+
+
+def test_parse_replay_bool_params(algo):
+    grid = algo.parse_replay_params(['action_state_rollback=true,0'])
+    assert grid == {'ACTION_STATE_ROLLBACK': [True, False]}
+    with pytest.raises(ValueError):
+        algo.parse_replay_params(['ACTION_STATE_ROLLBACK=maybe'])
@@ -0,0 +1,84 @@
+import math
+
+import pytest
+
+BLOCK_SEC = 0.1
+SAMPLE_RATE = 16000
+BLOCK_SIZE = int(BLOCK_SEC * SAMPLE_RATE)
+
+
+def tone(np, amplitude):
+    t = np.arange(BLOCK_SIZE) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 200 * t)).astype(np.int16).tobytes()
+
+
+def noise(np, std, seed):
+    return np.random.default_rng(seed).normal(0, std, BLOCK_SIZE).astype(np.int16).tobytes()
+
+
+@pytest.fixture
+def vad(algo):
+    return algo.EnergyVAD(BLOCK_SEC, hangover_sec=0.3, preroll_sec=0.2)
+
+
+def test_level_db(algo):
+    np = algo.np
+    assert algo.EnergyVAD.level_db(tone(np, 16384)) == pytest.approx(20 * math.log10(0.5 / math.sqrt(2)), abs=0.05)
+    assert algo.EnergyVAD.level_db(bytes(2 * BLOCK_SIZE)) < -150
+    assert algo.EnergyVAD.level_db(b'') < -150
+
+
+def test_silence_is_skipped(algo, vad):
+    for seed in range(10):
+        assert vad.process(noise(algo.np, 30, seed)) == ([], False)
+    assert not vad.active
+
+
+def test_speech_onset_includes_preroll(algo, vad):
+    np = algo.np
+    silence = [noise(np, 30, seed) for seed in range(5)]
+    for block in silence:
+        vad.process(block)
+    speech = tone(np, 8000)
+    blocks, ended = vad.process(speech)
+    assert blocks == silence[-2:] + [speech]  # preroll_sec=0.2: two blocks
+    assert not ended
+    assert vad.process(speech) == ([speech], False)
+
+
+def test_segment_ends_after_hangover(algo, vad):
+    np = algo.np
+    vad.process(noise(np, 30, 0))
+    vad.process(tone(np, 8000))
+    trailing = [noise(np, 30, seed) for seed in range(1, 6)]
+    results = [vad.process(block) for block in trailing]
+    assert results[:3] == [([block], False) for block in trailing[:3]]  # hangover_sec=0.3: three blocks
+    assert results[3] == ([], True)
+    assert results[4] == ([], False)
+    assert not vad.active
+
+
+def test_quiet_noise_after_digital_silence_is_not_speech(algo, vad):
+    # Far above the (digital silence) floor, but below VAD_MIN_DB
+    vad.process(bytes(2 * BLOCK_SIZE))
+    quiet = noise(algo.np, 30, 0)
+    assert algo.EnergyVAD.level_db(quiet) < algo.VAD_MIN_DB
+    assert vad.process(quiet) == ([], False)
+
+
+@pytest.mark.parametrize('first_block', ['quiet_room', 'digital_silence'])
+def test_gate_closes_when_steady_noise_gets_louder(algo, first_block):
+    np = algo.np
+    vad = algo.EnergyVAD(BLOCK_SEC, hangover_sec=0.3, noise_window_sec=2.0)
+    if first_block == 'digital_silence':
+        vad.process(bytes(2 * BLOCK_SIZE))
+    else:
+        for seed in range(10):
+            vad.process(noise(np, 30, seed))
+    loud = [noise(np, 400, seed) for seed in range(100, 160)]  # About -38 dBFS, e.g. a compressor
+    assert algo.EnergyVAD.level_db(loud[0]) > algo.VAD_MIN_DB
+    results = [vad.process(block) for block in loud]
+    ended = [i for i, (_, segment_ended) in enumerate(results) if segment_ended]
+    # Closes once the loud noise filled the 20-block window, plus the 3-block hangover
+    assert len(ended) == 1 and ended[0] <= 20 + 3
+    assert all(result == ([], False) for result in results[ended[0] + 1:])